@@ -7,5 +7,13 @@ source "$HOME/.local/bin/env"
 
 cd python || exit
 
-git clone https://github.com/sid-kap/housing-data-data ../housing-data-data
-uv run python -m housing_data.build_data --data-repo-path ../housing-data-data
+# Only download the files that the build reads (see housing_data.input_manifest)
+git clone --filter=blob:none --no-checkout --depth 1 https://github.com/sid-kap/housing-data-data ../housing-data-data
+uv run python -m housing_data.input_manifest --sparse-checkout-patterns |
+    git -C ../housing-data-data sparse-checkout set --no-cone --stdin
+git -C ../housing-data-data checkout
+
+# Vercel keeps .next/cache between deploys, so if neither the data nor the Python code changed
+# since the last deploy, build_data restores the previous outputs instead of rebuilding them.
+uv run python -m housing_data.build_data --data-repo-path ../housing-data-data \
+    --build-cache-dir ../.next/cache/housing-data-build
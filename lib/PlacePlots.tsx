@@ -5,10 +5,10 @@ import { useRouter } from "next/router"
 import PlotsTemplate from "lib/PlotsTemplate"
 import { makeOptions } from "lib/PlotsTemplate"
 import WindowSelectSearch from "lib/WindowSelectSearch"
-import { useFetch } from "lib/queries"
+import { fetchPlace, fetchPlaces, fetchTopPlaces } from "lib/placesSearch"
 import { scoreFnWithPopulation } from "lib/utils"
 
-// The schema for /places_list.json
+// The schema for /places_list.json (and the /places_search/ shards)
 type RawOption = {
   name: string
   path: string
@@ -39,24 +39,43 @@ export default function PlacePlots({
   setTitle: (string) => void
 }): JSX.Element {
   const router = useRouter()
-  const { data: placesList } = useFetch("/places_list.json")
+  const [topPlaces, setTopPlaces] = useState<RawOption[]>([])
   const [place, setPlace] = useState<Option | null>(null)
 
-  const [options, optionsMap] = useMemo(
-    () => makeOptions<RawOption, Option>(placesList ?? []),
-    [placesList]
-  )
+  useEffect(() => {
+    fetchTopPlaces<RawOption>().then(setTopPlaces)
+  }, [setTopPlaces])
 
   // When the page first loads, figure out which place we're at
   useEffect(() => {
-    if (optionsMap != null && path != null) {
-      const place = optionsMap.get(decodeURIComponent(path))
-      if (place) {
-        setPlace(place)
-        setTitle(place.name)
-      }
+    if (path != null) {
+      fetchPlace<RawOption>(decodeURIComponent(path)).then((rawPlace) => {
+        if (rawPlace) {
+          const [[place]] = makeOptions<RawOption, Option>([rawPlace])
+          setPlace(place)
+          setTitle(place.name)
+        }
+      })
     }
-  }, [optionsMap, path, setPlace, setTitle])
+  }, [path, setPlace, setTitle])
+
+  // The options shown before anything is typed: the most populous places,
+  // and the current place (so that the select can display it)
+  const options = useMemo(() => {
+    const [topOptions] = makeOptions<RawOption, Option>(topPlaces)
+    return place == null ||
+      topOptions.some(({ value }) => value === place.value)
+      ? topOptions
+      : [place, ...topOptions]
+  }, [topPlaces, place])
+
+  const getOptions = useCallback(
+    (input: string) =>
+      fetchPlaces<RawOption>(input).then(
+        (rawOptions) => makeOptions<RawOption, Option>(rawOptions)[0]
+      ),
+    []
+  )
 
   const onChange = useCallback(
     (newPath) => router.push("/places/" + newPath),
@@ -67,6 +86,7 @@ export default function PlacePlots({
       search
       onChange={onChange}
       options={options}
+      getOptions={getOptions}
       value={place?.value}
       fuzzysortOptions={fuzzysortOptions}
     />
@@ -1,4 +1,4 @@
-import { useEffect, useState } from "react"
+import { useEffect, useMemo, useState } from "react"
 
 import BarPlot from "lib/BarPlot"
 import { CurrentYearExtrapolationInfo } from "lib/projections"
@@ -9,6 +9,7 @@ import {
   usePreferHcdDataInput,
   useUnitsSelect,
 } from "lib/selects"
+import { addPerCapitaFields } from "lib/utils"
 
 interface Option {
   value: string
@@ -44,9 +45,10 @@ export default function PlotsTemplate({
   jsonRoot: string
   countyList?: JSX.Element
 }): JSX.Element {
-  const { data } = useFetch(
+  const { data: rawData } = useFetch(
     selected != null ? jsonRoot + selected.value + ".json" : null
   )
+  const data = useMemo(() => addPerCapitaFields(rawData), [rawData])
 
   const { selectedUnits, unitsSelect } = useUnitsSelect()
 
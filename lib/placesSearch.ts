@@ -0,0 +1,91 @@
+/**
+ * Search over the places_search/ shards written by python/housing_data/search_index.py, so that
+ * the place select doesn't have to download the whole /places_list.json.
+ */
+
+const SEARCH_ROOT = "/places_search/"
+
+const shardCache = new Map<string, Promise<any[]>>()
+
+function fetchJson(path: string): Promise<any> {
+  if (!shardCache.has(path)) {
+    shardCache.set(
+      path,
+      fetch(SEARCH_ROOT + path).then((res) => {
+        if (!res.ok) {
+          throw new Error(`Failed to fetch ${path}: ${res.status}`)
+        }
+        return res.json()
+      })
+    )
+  }
+  return shardCache.get(path)
+}
+
+// Same as normalize_names in search_index.py
+export function normalizeName(name: string): string {
+  return name
+    .normalize("NFKD")
+    .replace(/[^\x00-\x7f]/g, "")
+    .toLowerCase()
+    .replace(/[^a-z0-9]+/g, " ")
+    .trim()
+}
+
+/**
+ * Returns the shard with the longest key that is a prefix of the word, or null if there is none
+ * (i.e. no place has a word starting with the word's first two characters).
+ */
+function getShardKey(
+  index: Record<string, boolean>,
+  word: string
+): string | null {
+  for (let length = word.length; length >= 2; length--) {
+    if (word.slice(0, length) in index) {
+      return word.slice(0, length)
+    }
+  }
+  return null
+}
+
+export function fetchTopPlaces<T>(): Promise<T[]> {
+  return fetchJson("top.json")
+}
+
+/**
+ * Returns the rows (with the schema of /places_list.json) of the shard of the longest word of the
+ * input, for the select to fuzzy search. Before a word has two characters, returns the most
+ * populous places.
+ */
+export async function fetchPlaces<T>(input: string): Promise<T[]> {
+  const words = normalizeName(input).split(" ")
+  const word = words.reduce((a, b) => (b.length > a.length ? b : a), "")
+  if (word.length < 2) {
+    return fetchTopPlaces()
+  }
+
+  const index = await fetchJson("index.json")
+  const shard = getShardKey(index, word)
+  return shard == null ? [] : fetchJson(shard + ".json")
+}
+
+/**
+ * Returns the row of the place with the given path (e.g. "CA/San_Jose"), looked up in the shard of
+ * the first word of its name. Falls back to /places_list.json if it isn't there.
+ */
+export async function fetchPlace<T extends { path: string }>(
+  path: string
+): Promise<T | null> {
+  const name = normalizeName(path.slice(path.indexOf("/") + 1))
+  const place = (await fetchPlaces<T>(name.split(" ")[0])).find(
+    (row) => row.path === path
+  )
+  if (place) {
+    return place
+  }
+
+  const placesList: T[] = await fetch("/places_list.json").then((res) =>
+    res.json()
+  )
+  return placesList.find((row) => row.path === path) ?? null
+}
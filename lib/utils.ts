@@ -17,3 +17,31 @@ export function scoreFnWithPopulation(a) {
   if (max === -9007199254740991) return null
   return max + Math.log(a.obj.population + 1)
 }
+
+// Fields that have a "{field}_per_capita" counterpart, e.g. "5_plus_units_units" or "total_bldgs_hcd"
+const PER_CAPITA_BASE_FIELD = /_(units|bldgs|value)(_hcd)?$/
+
+/**
+ * Adds a "{field}_per_capita" field to each row for every numerical field that
+ * doesn't already have one, by dividing by the row's population.
+ *
+ * The JSON files only include the raw values when the data is built with
+ * --lazy-per-capita (see python/housing_data/build_data.py).
+ */
+export function addPerCapitaFields(rows) {
+  if (!Array.isArray(rows)) {
+    return rows
+  }
+  return rows.map((row) => {
+    const newRow = { ...row }
+    for (const [field, value] of Object.entries(row)) {
+      const perCapitaField = field + "_per_capita"
+      if (PER_CAPITA_BASE_FIELD.test(field) && !(perCapitaField in row)) {
+        // Population is 0 for a few places in some years, treat that like missing data
+        newRow[perCapitaField] =
+          value == null || !row.population ? null : value / row.population
+      }
+    }
+    return newRow
+  })
+}
@@ -19,7 +19,7 @@ import {
   usePerCapitaInput,
   usePreferHcdDataInput,
 } from "lib/selects"
-import { scoreFnWithPopulation } from "lib/utils"
+import { addPerCapitaFields, scoreFnWithPopulation } from "lib/utils"
 
 const MAX_YEAR = 2025
 
@@ -338,7 +338,9 @@ function selectedItemClassFn(item) {
 }
 
 function getData(path: string): object {
-  return window.fetch(path).then(async (res) => await res.json())
+  return window
+    .fetch(path)
+    .then(async (res) => addPerCapitaFields(await res.json()))
 }
 
 function combineDatas(datas) {
@@ -0,0 +1,97 @@
+"""
+Compares the per-place JSON payloads (`to_json(orient="records")`, what write_json_outputs
+writes today) with Arrow IPC streams (to_arrow_payload), in encode time, decode time,
+and bytes (raw and gzipped, since the static files are served compressed).
+
+Run after a build, from `python/`:
+
+    uv run python -m housing_data.benchmark_payloads --parquet ../public/places_annual.parquet
+"""
+
+import argparse
+import gzip
+import json
+import time
+from pathlib import Path
+from typing import Callable
+
+import pandas as pd
+import pyarrow as pa
+from housing_data.build_data_utils import PUBLIC_DIR, to_arrow_payload
+
+
+def encode_json(df: pd.DataFrame) -> bytes:
+    return df.to_json(orient="records").encode()
+
+
+def decode_json(payload: bytes) -> object:
+    return json.loads(payload)
+
+
+def decode_arrow(payload: bytes) -> object:
+    return pa.ipc.open_stream(payload).read_all()
+
+
+FORMATS: dict[
+    str, tuple[Callable[[pd.DataFrame], bytes], Callable[[bytes], object]]
+] = {
+    "json": (encode_json, decode_json),
+    "arrow": (to_arrow_payload, decode_arrow),
+}
+
+
+def benchmark(groups: list[pd.DataFrame]) -> pd.DataFrame:
+    rows = []
+    for format_name, (encode, decode) in FORMATS.items():
+        start = time.perf_counter()
+        payloads = [encode(group) for group in groups]
+        encode_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for payload in payloads:
+            decode(payload)
+        decode_seconds = time.perf_counter() - start
+
+        rows.append(
+            {
+                "format": format_name,
+                "encode_ms_per_file": 1000 * encode_seconds / len(groups),
+                "decode_ms_per_file": 1000 * decode_seconds / len(groups),
+                "mean_bytes": sum(len(p) for p in payloads) / len(groups),
+                "mean_gzip_bytes": sum(len(gzip.compress(p)) for p in payloads)
+                / len(groups),
+            }
+        )
+
+    return pd.DataFrame(rows).set_index("format")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--parquet",
+        type=Path,
+        default=PUBLIC_DIR / "places_annual.parquet",
+        help="One of the {geography}_annual.parquet files written by build_data.",
+    )
+    parser.add_argument(
+        "--num-places",
+        type=int,
+        default=1000,
+        help="Number of places (i.e. JSON files) to sample.",
+    )
+    args = parser.parse_args()
+
+    df = pd.read_parquet(args.parquet)
+    groups = [
+        group.reset_index(drop=True)
+        for _, group in df.groupby(["path_1", "path_2"], dropna=False)
+    ]
+    groups = groups[:: max(1, len(groups) // args.num_places)][: args.num_places]
+
+    print(f"Benchmarking {len(groups)} places from {args.parquet}")
+    print(benchmark(groups).round(3).to_string())
+
+
+if __name__ == "__main__":
+    main()
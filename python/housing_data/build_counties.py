@@ -8,17 +8,20 @@ from housing_data.build_data_utils import (
     get_state_abbrs,
     load_bps_all_years_plus_monthly,
 )
+from housing_data.rollup import rollup, sum_aggregations
 
 
 def load_counties(
     data_repo_path: Optional[Path],
     places_df: pd.DataFrame,
     population_df: pd.DataFrame,
+    engine: str = "pandas",
 ) -> pd.DataFrame:
     """
     :param population_df: A pre-loaded population df, so that we don't have to load it twice.
         Useful since county population data is used twice (here, and also in `load_places` for NYC boroughs,
         which show up in places also).
+    :param engine: "pandas" or "duckdb" (see impute_pre_1990_counties).
     """
     # The county data only goes back to 1990 :(
     # To get 1980 to 1990, we have to sum up the cities + unincorporated areas in each county
@@ -26,7 +29,7 @@ def load_counties(
         data_repo_path, "county", start_year=1990
     )
 
-    imputed_counties_df = impute_pre_1990_counties(counties_df, places_df)
+    imputed_counties_df = impute_pre_1990_counties(counties_df, places_df, engine)
     counties_df = pd.concat([counties_df, imputed_counties_df])
 
     # If the county name is fucked up in some years,
@@ -64,17 +67,26 @@ def load_counties(
 
 
 def impute_pre_1990_counties(
-    counties_df: pd.DataFrame, places_df: pd.DataFrame
+    counties_df: pd.DataFrame, places_df: pd.DataFrame, engine: str = "pandas"
 ) -> pd.DataFrame:
-    summed_places_df = (
-        places_df.groupby(["county_code", "state_code", "year"])[
-            get_numerical_columns(DataSource.BPS, totals=True)
-        ]
-        .sum()
-        .reset_index()
-    )
+    """
+    :param engine: "pandas", or "duckdb" to aggregate the places with DuckDB (see housing_data.duckdb_engine).
+    """
+    levels = {"counties": ["county_code", "state_code", "year"]}
+    aggregations = sum_aggregations(get_numerical_columns(DataSource.BPS, totals=True))
+
+    # Only the years before the county data starts
+    if engine == "duckdb":
+        from housing_data import duckdb_engine
+
+        imputed_counties_df = duckdb_engine.rollup(
+            places_df, levels, aggregations, where="year < '1990'"
+        )["counties"]
+    else:
+        imputed_counties_df = rollup(
+            places_df[places_df["year"] < "1990"], levels, aggregations
+        )["counties"]
 
-    imputed_counties_df = summed_places_df[summed_places_df["year"] < "1990"].copy()
     imputed_counties_df["imputed"] = True
     imputed_counties_df = imputed_counties_df.rename(
         columns={"county_code": "fips_county", "state_code": "fips_state"}
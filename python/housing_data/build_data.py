@@ -1,62 +1,249 @@
 import argparse
+from functools import partial
 from pathlib import Path
+from typing import Optional
 
 import pandas as pd
 from housing_data.build_counties import load_counties
 from housing_data.build_data_utils import (
+    BPS_DIR,
+    CA_HCD_DIR,
+    CACHE_DIR,
+    CANADA_BPER_DIR,
+    CANADA_CROSSWALK_DIR,
+    CANADA_POPULATION_DIR,
     COUNTY_POPULATION_DIR,
+    CROSSWALK_DIR,
+    PLACE_POPULATION_DIR,
     PUBLIC_DIR,
+    RAW_DATA_DIR,
+    STATE_POPULATION_DIR,
     DataSource,
     add_per_capita_columns,
-    write_list_json,
-    write_to_json_directory,
+    write_annual_parquet,
+    write_json_outputs,
+)
+from housing_data.build_fingerprint import (
+    get_build_fingerprint,
+    restore_build_outputs,
+    save_build_outputs,
 )
 from housing_data.build_metros import load_metros
-from housing_data.build_places import load_places
+from housing_data.build_places import (
+    combine_region_places,
+    load_place_populations,
+    load_region_places,
+)
 from housing_data.build_states import load_states
-from housing_data.california_hcd_data import load_california_hcd_data
+from housing_data.building_permits_survey import REGIONS, Region
+from housing_data.california_hcd_data import (
+    aggregate_projects,
+    load_projects,
+    write_project_store,
+)
 from housing_data.canada_bper import load_canada_bper
 from housing_data.county_population import get_county_population_estimates
+from housing_data.data_source import open_data_repo
+from housing_data.derived_metrics import with_derived_metrics
+from housing_data.pipeline import Stage, run_pipeline
+from housing_data.rankings import write_ranking_tables
+from housing_data.search_index import write_search_index
 
 
 def main() -> None:
     parser = argparse.ArgumentParser()
     parser.add_argument(
         "--data-repo-path",
-        help="Use data from the given data repo path rather than pulling directly from the Census website.",
+        help="Use data from the given data repo path rather than pulling directly from the Census website. "
+        "Can also be a .zip or .tar.zst archive of the data repo (see housing_data.data_source).",
+    )
+    parser.add_argument(
+        "--partition-parquet-by-state",
+        action="store_true",
+        help="Also write places and counties Parquet files partitioned by state, e.g. "
+        "public/places_annual_by_state/path_1=CA/part-0.parquet.",
+    )
+    parser.add_argument(
+        "--lazy-per-capita",
+        action="store_true",
+        help="Don't write the {col}_per_capita columns. They are just {col} / population, so readers "
+        "compute them on demand (see build_data_utils.with_per_capita_columns, and addPerCapitaFields "
+        "in the front-end).",
+    )
+    parser.add_argument(
+        "--arrow-payloads",
+        action="store_true",
+        help="Also write each place's data as an Arrow IPC stream next to its JSON file "
+        "(see housing_data.benchmark_payloads for a comparison with JSON).",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of stages to run in parallel (defaults to the number of CPUs). "
+        "With --jobs 1, stages run in the main process.",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Re-run every stage, even if its output is cached (see housing_data.pipeline).",
+    )
+    parser.add_argument(
+        "--only",
+        nargs="+",
+        choices=list(TARGET_STAGES),
+        help="Only rebuild the outputs of the given geographies (e.g. --only metros), reusing the cached "
+        "stages upstream of them when possible. --only canada also rewrites the JSON files of every "
+        "geography, since they have the Canada rows.",
+    )
+    parser.add_argument(
+        "--skip",
+        nargs="+",
+        choices=list(TARGET_STAGES),
+        default=[],
+        help="Don't rebuild the outputs of the given geographies. With --skip canada, Canada isn't loaded: "
+        "the Canada rows of the JSON files are the ones cached by the last build (which fails if there "
+        "are none).",
+    )
+    parser.add_argument(
+        "--dtype-backend",
+        choices=["numpy_nullable", "pyarrow"],
+        help="Read the BPS place files, and pass the frames between stages, with nullable or Arrow-backed "
+        "dtypes (e.g. string[pyarrow] instead of object columns of Python strings), which takes much less "
+        "memory.",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=["pandas", "duckdb"],
+        default="pandas",
+        help="Run the metro and pre-1990 county aggregations, and the list files' latest populations, "
+        "with pandas or with DuckDB (multithreaded, and spills to disk). duckdb needs the optional "
+        "duckdb dependency.",
+    )
+    parser.add_argument(
+        "--build-cache-dir",
+        type=Path,
+        help="If the inputs (data repo, Python code, LATEST_MONTH and options) are the same as in the build "
+        "saved in this directory, restore its outputs instead of building. Otherwise, build and save the "
+        "outputs there (see housing_data.build_fingerprint).",
     )
     args = parser.parse_args()
     print("Args:", args)
-    data_repo_path: Path = Path(args.data_repo_path)
 
     # Make sure the public/ directory exists
     PUBLIC_DIR.mkdir(parents=True, exist_ok=True)
 
-    states_df = load_states(data_repo_path)
+    data_repo_path = open_data_repo(args.data_repo_path)
+    options = {
+        "data_repo_path": data_repo_path,
+        "partition_parquet_by_state": args.partition_parquet_by_state,
+        "lazy_per_capita": args.lazy_per_capita,
+        "arrow_payloads": args.arrow_payloads,
+        "engine": args.engine,
+        "dtype_backend": args.dtype_backend,
+    }
+    targets = get_targets(args.only, args.skip)
+    reuse_stages = get_reuse_stages(args.skip)
+
+    if args.build_cache_dir is not None:
+        fingerprint = get_build_fingerprint(
+            data_repo_path,
+            {
+                **{k: v for k, v in options.items() if k != "data_repo_path"},
+                "targets": targets,
+                "reuse_stages": reuse_stages,
+            },
+        )
+        if not args.no_cache and restore_build_outputs(
+            args.build_cache_dir, fingerprint, get_build_output_files()
+        ):
+            print(
+                f"Inputs haven't changed, restored the outputs from {args.build_cache_dir}"
+            )
+            return
+
+    run_pipeline(
+        LOAD_STAGES + get_write_stages(),
+        options=options,
+        targets=targets,
+        max_workers=args.jobs,
+        use_cache=not args.no_cache,
+        dtype_backend=args.dtype_backend,
+        reuse_stages=reuse_stages,
+    )
+
+    if args.build_cache_dir is not None:
+        save_build_outputs(args.build_cache_dir, fingerprint, get_build_output_files())
 
+
+def load_county_population(data_repo_path: Path) -> pd.DataFrame:
     print("Loading county population data...")
-    county_population_df = get_county_population_estimates(
+    return get_county_population_estimates(
         data_path=data_repo_path / COUNTY_POPULATION_DIR,
         data_repo_path=data_repo_path,
     )
 
-    raw_places_df, places_df = load_places(data_repo_path, county_population_df)
-    counties_df = load_counties(data_repo_path, raw_places_df, county_population_df)
 
-    (
-        california_places_df,
-        california_counties_df,
-        california_states_df,
-    ) = load_california_hcd_data(data_repo_path)
+def load_place_populations_stage(
+    county_population_df: pd.DataFrame, data_repo_path: Path
+) -> pd.DataFrame:
+    return load_place_populations(data_repo_path, county_population_df)
+
+
+def load_region_places_stage(
+    region: Region,
+    place_populations_df: pd.DataFrame,
+    data_repo_path: Path,
+    dtype_backend: Optional[str],
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    return load_region_places(
+        data_repo_path, region, place_populations_df, dtype_backend
+    )
+
+
+def load_counties_stage(
+    raw_places_df: pd.DataFrame,
+    county_population_df: pd.DataFrame,
+    data_repo_path: Path,
+    engine: str,
+) -> pd.DataFrame:
+    return load_counties(data_repo_path, raw_places_df, county_population_df, engine)
+
+
+def load_ca_hcd_stage(
+    data_repo_path: Path,
+) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    Returns the CA HCD places, counties and state tables, and the project rows they're built from.
+    """
+    projects_df = load_projects(data_repo_path)
+    return (*aggregate_projects(projects_df, data_repo_path), projects_df)
+
 
+# The CA HCD projects behind the HCD numbers, for looking into them with
+# california_hcd_data.load_jurisdiction_projects. Not deployed, since the site doesn't use it.
+CA_HCD_PROJECTS_DIR = CACHE_DIR / "ca_hcd_projects"
+
+
+def write_ca_hcd_projects(projects_df: pd.DataFrame) -> None:
+    write_project_store(projects_df, CA_HCD_PROJECTS_DIR)
+
+
+def add_ca_hcd_to_places(
+    places_df: pd.DataFrame, california_places_df: pd.DataFrame
+) -> pd.DataFrame:
     # For California rows, add HCD columns for units and buildings (not available for value)
-    places_df = places_df.merge(
+    return places_df.merge(
         california_places_df.assign(has_ca_hcd_data=True),
         on=["place_or_county_code", "state_code", "year"],
         how="left",
     )
 
-    counties_df = counties_df.merge(
+
+def add_ca_hcd_to_counties(
+    counties_df: pd.DataFrame, california_counties_df: pd.DataFrame
+) -> pd.DataFrame:
+    return counties_df.merge(
         california_counties_df.assign(state_code=6, has_ca_hcd_data=True).astype(
             {"county_code": "Int64", "state_code": "Int64"}
         ),
@@ -64,9 +251,11 @@ def main() -> None:
         how="left",
     )
 
-    metros_df = load_metros(data_repo_path, counties_df)
 
-    states_df = states_df.merge(
+def add_ca_hcd_to_states(
+    states_df: pd.DataFrame, california_states_df: pd.DataFrame
+) -> pd.DataFrame:
+    return states_df.merge(
         california_states_df.assign(has_ca_hcd_data=True).astype(
             {"state_code": "Int64"}
         ),
@@ -74,64 +263,325 @@ def main() -> None:
         how="left",
     )
 
-    add_per_capita_columns(places_df, [DataSource.BPS, DataSource.CA_HCD])
-    add_per_capita_columns(counties_df, [DataSource.BPS, DataSource.CA_HCD])
-    add_per_capita_columns(metros_df, [DataSource.BPS, DataSource.CA_HCD])
-    add_per_capita_columns(states_df, [DataSource.BPS, DataSource.CA_HCD])
 
-    places_df.to_parquet(PUBLIC_DIR / "places_annual.parquet")
-    counties_df.to_parquet(PUBLIC_DIR / "counties_annual.parquet")
-    metros_df.to_parquet(PUBLIC_DIR / "metros_annual.parquet")
-    states_df.to_parquet(PUBLIC_DIR / "states_annual.parquet")
+def load_metros_stage(
+    counties_df: pd.DataFrame, data_repo_path: Path, engine: str
+) -> pd.DataFrame:
+    return load_metros(data_repo_path, counties_df, engine)
 
-    (
-        canada_places_df,
-        canada_counties_df,
-        canada_metros_df,
-        canada_states_df,
-    ) = load_canada_bper(data_repo_path)
 
-    generate_json(
-        pd.concat([places_df, canada_places_df]),
-        pd.concat([counties_df, canada_counties_df]),
-        pd.concat([metros_df, canada_metros_df]),
-        pd.concat([states_df, canada_states_df]),
-    )
+# Options for write_json_outputs, for each geography
+JSON_OPTIONS: dict[str, dict] = {
+    "places": {},
+    "metros": {
+        "unhashable_columns": ["county_names"],  # can't merge on a list-valued column
+        "extra_columns": ["metro_type", "county_names"],
+        "detail_drop_columns": ["county_names"],
+    },
+    "counties": {},
+    "states": {},
+}
 
 
-def generate_json(
-    places_df: pd.DataFrame,
-    counties_df: pd.DataFrame,
-    metros_df: pd.DataFrame,
-    states_df: pd.DataFrame,
+def write_outputs(
+    geography: str,
+    df: pd.DataFrame,
+    canada_df: Optional[pd.DataFrame] = None,
+    *,
+    lazy_per_capita: bool,
+    partition_parquet_by_state: bool,
+    arrow_payloads: bool,
+    engine: str,
 ) -> None:
-    # Places
-    write_list_json(places_df, PUBLIC_DIR / "places_list.json")
-    write_to_json_directory(places_df, PUBLIC_DIR / "places_data")
+    """
+    Writes public/{geography}_annual.parquet (US only), and the JSON files for the US and Canada rows,
+    after adding the per capita columns and the derived metrics (see housing_data.derived_metrics).
+    Also writes the ranking tables and ranks (see housing_data.rankings).
+    """
+    if not lazy_per_capita:
+        # df is the stage's input (possibly memory-mapped and read-only), so add the columns to a
+        # shallow copy, which shares df's arrays without changing df
+        df = df.copy(deep=False)
+        add_per_capita_columns(df, [DataSource.BPS, DataSource.CA_HCD])
+    df = with_derived_metrics(df, per_capitas=not lazy_per_capita)
+    if canada_df is not None:
+        canada_df = with_derived_metrics(canada_df, per_capitas=not lazy_per_capita)
+    write_ranking_tables(df, PUBLIC_DIR / f"{geography}_rankings")
 
-    # Metros
-    write_list_json(
-        metros_df,
-        PUBLIC_DIR / "metros_list.json",
-        unhashable_columns=["county_names"],  # can't merge on a list-valued column
-        extra_columns=["metro_type", "county_names"],
+    write_annual_parquet(
+        df,
+        PUBLIC_DIR / f"{geography}_annual.parquet",
+        partition_by_state=partition_parquet_by_state
+        and geography in ["places", "counties"],
     )
-    write_to_json_directory(
-        metros_df.drop(columns=["county_names"]), PUBLIC_DIR / "metros_data"
+
+    list_df = write_json_outputs(
+        [df] if canada_df is None else [df, canada_df],
+        PUBLIC_DIR / f"{geography}_list.json",
+        PUBLIC_DIR / f"{geography}_data",
+        write_arrow=arrow_payloads,
+        engine=engine,
+        **JSON_OPTIONS[geography],
     )
 
-    # Counties
-    write_list_json(
-        counties_df.drop(columns=["state_code"]).rename(
-            columns={"fips_state": "state_code"}
+    if geography == "places":
+        write_search_index(list_df, PUBLIC_DIR / "places_search")
+
+
+def get_output_files(geography: str) -> list[Path]:
+    """
+    Returns the files and directories in public/ that write_outputs always writes for the geography.
+    """
+    files = [
+        PUBLIC_DIR / f"{geography}_annual.parquet",
+        PUBLIC_DIR / f"{geography}_list.json",
+        PUBLIC_DIR / f"{geography}_data",
+        PUBLIC_DIR / f"{geography}_rankings",
+    ]
+    if geography == "places":
+        files.append(PUBLIC_DIR / "places_search")
+    return files
+
+
+PLACES_WITHOUT_POPULATION_PATH = PUBLIC_DIR / "places_annual_without_population.parquet"
+
+
+def write_places_without_population(raw_places_df: pd.DataFrame) -> None:
+    raw_places_df.to_parquet(PLACES_WITHOUT_POPULATION_PATH)
+
+
+CANADA_GEOGRAPHIES = ["places", "counties", "metros", "states"]
+
+
+def get_canada_output_files() -> list[Path]:
+    return [
+        PUBLIC_DIR / f"canada_{geography}_annual.parquet"
+        for geography in CANADA_GEOGRAPHIES
+    ]
+
+
+def get_build_output_files() -> list[Path]:
+    """
+    Returns all the files and directories in public/ that the build writes (which, unlike the rest of
+    public/, are saved and restored with --build-cache-dir).
+    """
+    files = [PLACES_WITHOUT_POPULATION_PATH] + get_canada_output_files()
+    for geography in ["places", "counties", "metros", "states"]:
+        parquet_path = PUBLIC_DIR / f"{geography}_annual.parquet"
+        files += get_output_files(geography) + [
+            # With --partition-parquet-by-state
+            parquet_path.with_name(parquet_path.stem + "_by_state")
+        ]
+    return files
+
+
+def write_canada_outputs(*canada_dfs: pd.DataFrame) -> None:
+    """
+    Writes public/canada_{geography}_annual.parquet for each of CANADA_GEOGRAPHIES.
+    (The Canada rows of the JSON files are written by write_outputs.)
+    """
+    for path, canada_df in zip(get_canada_output_files(), canada_dfs):
+        write_annual_parquet(canada_df, path)
+
+
+WRITE_OPTIONS = [
+    "lazy_per_capita",
+    "partition_parquet_by_state",
+    "arrow_payloads",
+    "engine",
+]
+
+LOAD_STAGES = [
+    Stage(
+        "states",
+        load_states,
+        modules=["build_states"],
+        data_paths=[BPS_DIR, STATE_POPULATION_DIR],
+        options=["data_repo_path"],
+    ),
+    Stage(
+        "county_population",
+        load_county_population,
+        modules=["county_population"],
+        data_paths=[COUNTY_POPULATION_DIR, CROSSWALK_DIR],
+        options=["data_repo_path"],
+    ),
+    Stage(
+        "place_population",
+        load_place_populations_stage,
+        inputs=["county_population"],
+        modules=["build_places"],
+        data_paths=[PLACE_POPULATION_DIR],
+        local_paths=[RAW_DATA_DIR],
+        options=["data_repo_path"],
+    ),
+    # The places are loaded one region at a time, in parallel (see load_region_places)
+    *[
+        Stage(
+            f"places_{region}",
+            partial(load_region_places_stage, region),
+            inputs=["place_population"],
+            outputs=[f"raw_places_{region}", f"places_{region}"],
+            modules=["build_places"],
+            data_paths=[BPS_DIR],
+            options=["data_repo_path", "dtype_backend"],
+        )
+        for region in REGIONS
+    ],
+    Stage(
+        "places",
+        combine_region_places,
+        inputs=[
+            f"{prefix}_{region}"
+            for region in REGIONS
+            for prefix in ["raw_places", "places"]
+        ],
+        outputs=["raw_places", "places"],
+        modules=["build_places"],
+    ),
+    Stage(
+        "counties",
+        load_counties_stage,
+        inputs=["raw_places", "county_population"],
+        modules=["build_counties"],
+        data_paths=[BPS_DIR],
+        options=["data_repo_path", "engine"],
+    ),
+    Stage(
+        "ca_hcd",
+        load_ca_hcd_stage,
+        outputs=[
+            "ca_hcd_places",
+            "ca_hcd_counties",
+            "ca_hcd_states",
+            "ca_hcd_projects",
+        ],
+        modules=["california_hcd_data"],
+        data_paths=[CA_HCD_DIR, CROSSWALK_DIR],
+        options=["data_repo_path"],
+    ),
+    Stage(
+        "canada",
+        load_canada_bper,
+        outputs=[f"canada_{geography}" for geography in CANADA_GEOGRAPHIES],
+        modules=["canada_bper"],
+        data_paths=[CANADA_BPER_DIR, CANADA_CROSSWALK_DIR, CANADA_POPULATION_DIR],
+        options=["data_repo_path", "lazy_per_capita"],
+    ),
+    Stage(
+        "places_with_ca_hcd",
+        add_ca_hcd_to_places,
+        inputs=["places", "ca_hcd_places"],
+    ),
+    Stage(
+        "counties_with_ca_hcd",
+        add_ca_hcd_to_counties,
+        inputs=["counties", "ca_hcd_counties"],
+    ),
+    Stage(
+        "states_with_ca_hcd",
+        add_ca_hcd_to_states,
+        inputs=["states", "ca_hcd_states"],
+    ),
+    Stage(
+        "metros",
+        load_metros_stage,
+        inputs=["counties_with_ca_hcd"],
+        modules=["build_metros"],
+        data_paths=[CROSSWALK_DIR],
+        options=["data_repo_path", "engine"],
+    ),
+]
+
+
+def get_write_stages() -> list[Stage]:
+    return [
+        Stage(
+            f"write_{geography}",
+            partial(write_outputs, geography),
+            inputs=[input_name, f"canada_{geography}"],
+            modules=[
+                "build_data_utils",
+                "search_index",
+                "derived_metrics",
+                "rankings",
+            ],
+            options=WRITE_OPTIONS,
+            output=True,
+            files=get_output_files(geography),
+        )
+        for geography, input_name in [
+            ("places", "places_with_ca_hcd"),
+            ("counties", "counties_with_ca_hcd"),
+            ("metros", "metros"),
+            ("states", "states_with_ca_hcd"),
+        ]
+    ] + [
+        Stage(
+            "write_places_without_population",
+            write_places_without_population,
+            inputs=["raw_places"],
+            output=True,
+            files=[PLACES_WITHOUT_POPULATION_PATH],
         ),
-        PUBLIC_DIR / "counties_list.json",
-    )
-    write_to_json_directory(counties_df, PUBLIC_DIR / "counties_data")
+        Stage(
+            "write_canada",
+            write_canada_outputs,
+            inputs=[f"canada_{geography}" for geography in CANADA_GEOGRAPHIES],
+            modules=["build_data_utils"],
+            output=True,
+            files=get_canada_output_files(),
+        ),
+        Stage(
+            "write_ca_hcd_projects",
+            write_ca_hcd_projects,
+            inputs=["ca_hcd_projects"],
+            modules=["california_hcd_data"],
+            output=True,
+            files=[CA_HCD_PROJECTS_DIR],
+        ),
+    ]
+
+
+# The stages that build each geography's public/ outputs, for --only and --skip.
+# ca_hcd_projects is the CA HCD project store in CA_HCD_PROJECTS_DIR.
+TARGET_STAGES = {
+    "places": ["write_places", "write_places_without_population"],
+    "counties": ["write_counties"],
+    "metros": ["write_metros"],
+    "states": ["write_states"],
+    "canada": ["write_canada"],
+    "ca_hcd_projects": ["write_ca_hcd_projects"],
+}
+
+
+# The load stages that --skip doesn't run. The Canada rows of the JSON files are then the cached
+# ones from the last build, so that --skip canada doesn't need to load Canada.
+SKIP_REUSE_STAGES = {"canada": ["canada"]}
+
+
+def get_targets(only: Optional[list[str]], skip: list[str]) -> list[str]:
+    """
+    Returns the names of the stages to build for the --only and --skip arguments.
+    """
+    targets = [
+        stage
+        for name in only or TARGET_STAGES
+        if name not in skip
+        for stage in TARGET_STAGES[name]
+    ]
+    if only and "canada" in only:
+        # Every geography's JSON files have the Canada rows
+        targets += [
+            f"write_{geography}"
+            for geography in CANADA_GEOGRAPHIES
+            if geography not in skip
+        ]
+    return list(dict.fromkeys(targets))
+
 
-    # States
-    write_list_json(states_df, PUBLIC_DIR / "states_list.json")
-    write_to_json_directory(states_df, PUBLIC_DIR / "states_data")
+def get_reuse_stages(skip: list[str]) -> list[str]:
+    return [stage for name in skip for stage in SKIP_REUSE_STAGES.get(name, [])]
 
 
 if __name__ == "__main__":
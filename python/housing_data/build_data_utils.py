@@ -4,6 +4,8 @@ from pathlib import Path
 from typing import Optional
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import us
 from housing_data import building_permits_survey as bps
 from tqdm import tqdm
@@ -69,11 +71,19 @@ def get_numerical_columns(
 
 PUBLIC_DIR = Path("../public")
 
+# Faster-to-read copies of raw inputs (see file_cache.py). Safe to delete.
+CACHE_DIR = Path("../.cache")
+
+# Inputs that are checked into this repo rather than the data repo (the 1980 populations)
+RAW_DATA_DIR = Path("../raw_data")
+
 # Paths relative to the housing-data-data repo
 BPS_DIR = Path("data", "bps")
 STATE_POPULATION_DIR = Path("data", "population", "state")
 COUNTY_POPULATION_DIR = Path("data", "population", "county")
 PLACE_POPULATION_DIR = Path("data", "population", "place")
+CROSSWALK_DIR = Path("data", "crosswalk")
+CA_HCD_DIR = Path("data", "apr")
 
 CANADA_BPER_DIR = Path("manual_data", "canada-bper")
 CANADA_CROSSWALK_DIR = Path("data", "canada-crosswalk")
@@ -84,85 +94,229 @@ LATEST_MONTH = (2026, 1)
 LAST_YEAR_ANNUAL_DATA_RELEASED = False
 
 
-def write_to_json_directory(df: pd.DataFrame, path: Path) -> None:
-    if path.exists():
-        shutil.rmtree(path)
-    path.mkdir()
-
-    for (json_dir, json_name), group in tqdm(
-        df.groupby(["path_1", "path_2"], dropna=False)
-    ):
-        sub_path = path / json_dir if not pd.isnull(json_dir) else path
-        sub_path.mkdir(exist_ok=True)
-
-        # Don't bloat non-California JSON files with columns that are all null
-        ca_only_columns = {
-            col
-            for col, is_all_null in group[
-                # doesn't matter if we pass projected=True here, since projected columns
-                # aren't present in CA HCD data. But just passing for consistency.
-                get_numerical_columns(
-                    DataSource.CA_HCD, totals=True, projected=True, per_capitas=True
-                )
-            ]
-            .isnull()
-            .all()
-            .items()
-            if is_all_null
-        }
-        if ca_only_columns:
-            group = group.drop(columns=ca_only_columns)
-
-        group.reset_index(drop=True).to_json(
-            sub_path / f"{json_name}.json", orient="records"
-        )
-
-
 # Columns to write to the "{geography}_list.json" file.
 # We also add "population" and "has_ca_hcd_data", but those require more
 # complicated aggregations because they have different values for different years.
 LIST_COLUMNS = ["name", "path_1", "path_2", "alt_name"]
 
 
-def write_list_json(
-    df: pd.DataFrame,
-    output_path: Path,
+def write_json_outputs(
+    dfs: list[pd.DataFrame],
+    list_path: Path,
+    directory_path: Path,
     unhashable_columns: Optional[list[str]] = None,
     extra_columns: Optional[list[str]] = None,
-) -> None:
+    detail_drop_columns: Optional[list[str]] = None,
+    write_arrow: bool = False,
+    engine: str = "pandas",
+) -> pd.DataFrame:
     """
     Writes the /public/{geography}_list.json file, which is a list of places
-    at that level. This is used by the select search.
-
-    :param unhashable_columns: Columns to not include in calls to drop_duplicates, merge, etc. because
-        they would cause "[type] is not hashable" errors.
+    at that level (used by the select search), and the /public/{geography}_data/
+    directory, which has one JSON file per place.
+
+    Both are produced from a single (path_1, path_2) groupby of each df: each group is a
+    row of the list file (picked out by position rather than by deduplicating and merging
+    copies of df) and one JSON file.
+
+    Returns the rows that were written to the list file, so that they can be reused
+    (e.g. by the search index).
+
+    :param dfs: The rows to write, e.g. [us_df, canada_df]. The output is the same as for
+        `pd.concat(dfs)` (every JSON file has the union of the columns), without copying
+        the frames into one. The frames shouldn't share any (path_1, path_2).
+    :param unhashable_columns: Columns to not sort the list file by, because they would cause
+        "[type] is not hashable" errors.
+    :param detail_drop_columns: Columns to leave out of the per-place JSON files.
+    :param write_arrow: Also write each place's rows as an Arrow IPC stream next to its JSON file
+        ({path}.arrow, see to_arrow_payload).
+    :param engine: "pandas", or "duckdb" to find each list row's latest population with DuckDB
+        (see housing_data.duckdb_engine).
     """
     columns = LIST_COLUMNS + (extra_columns or [])
     keys = list(set(columns) - set(unhashable_columns or []))
-    subset_df = df[columns].copy().drop_duplicates(subset=keys)
 
-    # Refers to both the path of the json file (https://housingdata.app/places_data/{path}.json)
-    # and the URL path (https://housingdata.app/places/{path})
-    subset_df["path"] = (subset_df["path_1"] + "/").fillna("") + subset_df["path_2"]
+    if directory_path.exists():
+        shutil.rmtree(directory_path)
+    directory_path.mkdir()
+
+    all_columns = list(dict.fromkeys(col for df in dfs for col in df.columns))
+
+    # doesn't matter if we pass projected=True here, since projected columns
+    # aren't present in CA HCD data. But just passing for consistency.
+    ca_hcd_columns = [
+        col
+        for col in get_numerical_columns(
+            DataSource.CA_HCD, totals=True, projected=True, per_capitas=True
+        )
+        # The per capita columns are missing with --lazy-per-capita
+        if col in all_columns
+    ]
+
+    list_dfs = []
+    for df in dfs:
+        # Each (path_1, path_2) is both a row of the list file and a JSON file
+        groups = df.groupby(["path_1", "path_2"], sort=False, dropna=False)
+        list_dfs.append(_get_list_rows(df, columns, groups.ngroup(), engine))
+
+        for (json_dir, json_name), group in tqdm(groups):
+            sub_path = (
+                directory_path / json_dir if not pd.isnull(json_dir) else directory_path
+            )
+            sub_path.mkdir(exist_ok=True)
+
+            if len(group.columns) < len(all_columns):
+                group = group.reindex(columns=all_columns)
+
+            # Don't bloat non-California JSON files with columns that are all null
+            ca_only_columns = {
+                col
+                for col, is_all_null in group[ca_hcd_columns].isnull().all().items()
+                if is_all_null
+            }
+            drop_columns = ca_only_columns | set(detail_drop_columns or [])
+            if drop_columns:
+                group = group.drop(
+                    columns=[col for col in group.columns if col in drop_columns]
+                )
+
+            group = group.reset_index(drop=True)
+            group.to_json(sub_path / f"{json_name}.json", orient="records")
+            if write_arrow:
+                (sub_path / f"{json_name}.arrow").write_bytes(to_arrow_payload(group))
+
+    list_df = pd.concat(list_dfs, ignore_index=True)
+    list_df = list_df.sort_values(keys)
+    list_df = list_df.drop(columns=["path_1", "path_2"])
+    list_df.to_json(list_path, orient="records")
+
+    return list_df
+
+
+def _get_list_rows(
+    df: pd.DataFrame,
+    columns: list[str],
+    list_row_ids: pd.Series,
+    engine: str = "pandas",
+) -> pd.DataFrame:
+    """
+    Returns the rows of the list file for df (except for the path column).
 
-    # Add population column
-    latest_populations = (
-        df[keys + ["year", "population"]]
-        .sort_values("year")
-        .drop_duplicates(subset=keys, keep="last")
+    :param list_row_ids: The list row of each row of df, numbered in order of first appearance
+        (i.e. the ngroup() of a sort=False groupby).
+    """
+    # Each list row takes its attributes from its first row in df and its population from
+    # its row with the latest year.
+    rows_df = pd.DataFrame(
+        {
+            "list_row_id": list_row_ids,
+            "year": df["year"],
+            "population": df["population"],
+        }
     )
-    latest_populations["population"] = (
-        latest_populations["population"].fillna(0).astype(int)
+    if engine == "duckdb":
+        from housing_data import duckdb_engine
+
+        latest_rows = duckdb_engine.get_latest_rows(rows_df)
+    else:
+        latest_rows = (
+            rows_df.sort_values("year")
+            .drop_duplicates(subset="list_row_id", keep="last")
+            .sort_values("list_row_id")
+        )
+
+    list_df = df.loc[~list_row_ids.duplicated().to_numpy(), columns].reset_index(
+        drop=True
     )
-    subset_df = subset_df.merge(latest_populations, on=keys, how="left")
 
-    # Add column indicating whether the place has CA HCD data
-    has_ca_hcd_data = df.groupby("name")["has_ca_hcd_data"].any().reset_index()
-    subset_df = subset_df.merge(has_ca_hcd_data, on="name", how="left")
+    # Refers to both the path of the json file (https://housingdata.app/places_data/{path}.json)
+    # and the URL path (https://housingdata.app/places/{path})
+    list_df["path"] = (list_df["path_1"] + "/").fillna("") + list_df["path_2"]
+    list_df["year"] = latest_rows["year"].to_numpy()
+    list_df["population"] = latest_rows["population"].fillna(0).astype(int).to_numpy()
+
+    # Add column indicating whether the place has CA HCD data (never true for Canada)
+    if "has_ca_hcd_data" in df.columns:
+        list_df["has_ca_hcd_data"] = (
+            df["has_ca_hcd_data"]
+            .groupby(list_row_ids.to_numpy())
+            .any()
+            .astype(bool)
+            .to_numpy()
+        )
+    else:
+        list_df["has_ca_hcd_data"] = False
 
-    subset_df = subset_df.sort_values(keys)
-    subset_df = subset_df.drop(columns=["path_1", "path_2"])
-    subset_df.to_json(output_path, orient="records")
+    return list_df
+
+
+def to_arrow_payload(df: pd.DataFrame) -> bytes:
+    """
+    Serializes df as an Arrow IPC stream, a binary alternative to the per-place JSON files.
+    Numeric columns are stored as typed arrays, so readers (e.g. `tableFromIPC` in apache-arrow)
+    don't need to parse any numbers.
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+# The published *_annual.parquet files are sorted by these columns, so that a reader filtering
+# on a state or a place only needs the row groups whose min/max statistics cover it.
+PARQUET_SORT_COLUMNS = ["path_1", "path_2", "year"]
+
+# Small enough that a single place's rows fall in one or two row groups, big enough
+# that the footer (and the number of HTTP range requests for a full scan) stays small.
+PARQUET_ROW_GROUP_SIZE = 64 * 1024
+
+PARQUET_WRITE_OPTIONS = {
+    "compression": "zstd",
+    "row_group_size": PARQUET_ROW_GROUP_SIZE,
+    "write_statistics": True,
+    "write_page_index": True,
+}
+
+
+def write_annual_parquet(
+    df: pd.DataFrame, path: Path, partition_by_state: bool = False
+) -> None:
+    """
+    Writes one of the published {geography}_annual.parquet files, laid out for remote
+    readers (e.g. `pd.read_parquet(url, filters=[("path_1", "==", "CA")])`): rows sorted by
+    PARQUET_SORT_COLUMNS, zstd compression, dictionary-encoded string columns, and
+    column statistics plus a page index so that filters can skip row groups and pages.
+
+    :param partition_by_state: Also write a Hive-partitioned copy at {path stem}_by_state/path_1={state}/,
+        so that readers can fetch a single state's file.
+    """
+    df = df.sort_values(PARQUET_SORT_COLUMNS, kind="stable").reset_index(drop=True)
+
+    # Dictionary encoding only pays off for the (low-cardinality) string columns, not the measures
+    string_columns = [
+        col for col in df.columns if pd.api.types.infer_dtype(df[col]) == "string"
+    ]
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    pq.write_table(table, path, use_dictionary=string_columns, **PARQUET_WRITE_OPTIONS)
+
+    if partition_by_state:
+        partitioned_path = path.with_name(path.stem + "_by_state")
+        if partitioned_path.exists():
+            shutil.rmtree(partitioned_path)
+
+        for state, state_df in df.groupby("path_1"):
+            state_path = partitioned_path / f"path_1={state}"
+            state_path.mkdir(parents=True)
+            pq.write_table(
+                pa.Table.from_pandas(
+                    state_df.drop(columns=["path_1"]), preserve_index=False
+                ),
+                state_path / "part-0.parquet",
+                use_dictionary=[col for col in string_columns if col != "path_1"],
+                **PARQUET_WRITE_OPTIONS,
+            )
 
 
 def add_per_capita_columns(df: pd.DataFrame, data_sources: list[DataSource]) -> None:
@@ -178,6 +332,28 @@ def add_per_capita_columns(df: pd.DataFrame, data_sources: list[DataSource]) ->
         df[col + "_per_capita"] = df[col] / population
 
 
+def with_per_capita_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns a copy of df with a "{col}_per_capita" column for every numerical column
+    that doesn't already have one.
+
+    This is for reading outputs that were built with --lazy-per-capita, which only contain
+    the raw values plus population, e.g.
+    `with_per_capita_columns(pd.read_parquet("places_annual.parquet"))`.
+    """
+    population = df["population"].replace({0: pd.NA})
+
+    cols = sorted(
+        {
+            col
+            for data_source in DataSource
+            for col in get_numerical_columns(data_source, totals=True, projected=True)
+            if col in df.columns and col + "_per_capita" not in df.columns
+        }
+    )
+    return df.assign(**{col + "_per_capita": df[col] / population for col in cols})
+
+
 def get_state_abbrs(state_codes: pd.Series) -> pd.Series:
     """
     :param state_codes: state_codes: pd.Series of int
@@ -194,12 +370,24 @@ def get_state_abbrs(state_codes: pd.Series) -> pd.Series:
     return state_codes.astype(str).str.zfill(2).map(fips_to_abbr)
 
 
+def get_last_full_year() -> int:
+    """
+    Returns the last year with annual BPS data.
+    E.g. in early 2022, this will be 2020.
+    In mid/late-2022 (after the annual 2021 data is released) this will be 2021.
+    """
+    return (
+        LATEST_MONTH[0] - 1 if LAST_YEAR_ANNUAL_DATA_RELEASED else LATEST_MONTH[0] - 2
+    )
+
+
 def load_bps_all_years_plus_monthly(
     data_repo_path: Optional[Path],
     scale: bps.Scale,
     region: Optional[bps.Region] = None,
     start_year: int = 1980,
     extrapolate_rest_of_year: bool = True,
+    dtype_backend: Optional[str] = None,
 ) -> pd.DataFrame:
     """
     Loads the annual data from 1980 to the latest full year available, plus the year-to-date data for the current
@@ -207,16 +395,14 @@ def load_bps_all_years_plus_monthly(
 
     Adds columns "year" and "month" to identify when the data came from.
     ("month" will only be present for the final (incomplete) year.)
+
+    :param dtype_backend: See bps.read_bps_formatted_csv.
     """
     data_path = data_repo_path / BPS_DIR if data_repo_path else None
 
     dfs = []
 
-    # E.g. in early 2022, this will be 2020.
-    # In mid/late-2022 (after the annual 2021 data is released) this will be 2021.
-    last_full_year = (
-        LATEST_MONTH[0] - 1 if LAST_YEAR_ANNUAL_DATA_RELEASED else LATEST_MONTH[0] - 2
-    )
+    last_full_year = get_last_full_year()
 
     for year in range(start_year, last_full_year + 1):
         data = bps.load_data(
@@ -226,6 +412,7 @@ def load_bps_all_years_plus_monthly(
             month=None,
             region=region,
             data_path=data_path,
+            dtype_backend=dtype_backend,
         ).assign(year=str(year), month=None)
         add_total_columns(data, DataSource.BPS)
         dfs.append(data)
@@ -239,6 +426,7 @@ def load_bps_all_years_plus_monthly(
             month=12,
             region=region,
             data_path=data_path,
+            dtype_backend=dtype_backend,
         ).assign(year=str(last_full_year + 1))
         add_total_columns(last_year_data, DataSource.BPS)
         dfs.append(last_year_data)
@@ -250,6 +438,7 @@ def load_bps_all_years_plus_monthly(
         month=LATEST_MONTH[1],
         region=region,
         data_path=data_path,
+        dtype_backend=dtype_backend,
     ).assign(year=str(LATEST_MONTH[0]), month=LATEST_MONTH[1])
     add_total_columns(current_year_data, DataSource.BPS)
 
@@ -261,6 +450,28 @@ def load_bps_all_years_plus_monthly(
     return pd.concat(dfs)
 
 
+def get_bps_data_paths(
+    scale: bps.Scale, region: Optional[bps.Region] = None, start_year: int = 1980
+) -> list[Path]:
+    """
+    Returns the paths (relative to the data repo) of the files that load_bps_all_years_plus_monthly reads.
+    """
+    last_full_year = get_last_full_year()
+
+    # (time_scale, year, month) of each file, same as in load_bps_all_years_plus_monthly
+    files: list[tuple[bps.TimeScale, int, Optional[int]]] = [
+        ("annual", year, None) for year in range(start_year, last_full_year + 1)
+    ]
+    if not LAST_YEAR_ANNUAL_DATA_RELEASED:
+        files.append(("monthly_year_to_date", last_full_year + 1, 12))
+    files.append(("monthly_year_to_date", LATEST_MONTH[0], LATEST_MONTH[1]))
+
+    return [
+        BPS_DIR / bps.get_data_path(scale, time_scale, year, month, region)
+        for time_scale, year, month in files
+    ]
+
+
 def add_total_columns(df: pd.DataFrame, data_source: DataSource) -> None:
     for suffix in SUFFIXES[data_source]:
         cols = [
@@ -0,0 +1,163 @@
+"""
+Skips the whole build when none of its inputs changed since a previous build, by restoring
+that build's outputs instead.
+
+The fingerprint of a build hashes:
+- the data repo's files (or its archive, see data_source.py),
+- the housing_data package (its version, source files, and locked dependencies) and the repo's
+  raw_data/ files,
+- LATEST_MONTH,
+- the build options.
+
+After a build, build_data saves its outputs in public/ (but not the other files there, e.g. the
+favicons) and the fingerprint in the build cache directory. On Vercel that's a subdirectory of
+.next/cache, which Vercel keeps between deploys, so deploys that only change the front-end don't
+rebuild the data.
+"""
+
+import hashlib
+import json
+import shutil
+import subprocess
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+from housing_data import __version__
+from housing_data.build_data_utils import LATEST_MONTH, PUBLIC_DIR
+from housing_data.data_source import DataPath
+from housing_data.file_cache import file_digest
+
+PACKAGE_DIR = Path(__file__).parent
+PROJECT_DIR = PACKAGE_DIR.parent
+# The repo root, which has raw_data/ (see build_data_utils.RAW_DATA_DIR)
+REPO_DIR = PROJECT_DIR.parent
+
+
+def _git_tree_hash(repo_path: Path) -> Optional[str]:
+    """
+    Returns the hash of the checked out tree, which git computes from the hashes of all the files,
+    or None if repo_path isn't a git repo or has uncommitted changes.
+    """
+    try:
+        status = subprocess.run(
+            ["git", "-C", str(repo_path), "status", "--porcelain"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        if status.strip():
+            return None
+        return subprocess.run(
+            ["git", "-C", str(repo_path), "rev-parse", "HEAD^{tree}"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (FileNotFoundError, subprocess.CalledProcessError):
+        return None
+
+
+def hash_data_repo(data_repo: DataPath) -> str:
+    if data_repo.store.archive_path is not None:
+        return file_digest(data_repo.store.archive_path)
+
+    data_repo_path = data_repo.store.root
+    tree_hash = _git_tree_hash(data_repo_path)
+    if tree_hash is not None:
+        return tree_hash
+
+    # Not a (clean) git checkout, so hash the files ourselves
+    hash_obj = hashlib.sha256()
+    for path in sorted(data_repo_path.rglob("*")):
+        if path.is_file() and ".git" not in path.relative_to(data_repo_path).parts:
+            hash_obj.update(str(path.relative_to(data_repo_path)).encode())
+            hash_obj.update(file_digest(path).encode())
+    return hash_obj.hexdigest()
+
+
+def hash_package() -> str:
+    hash_obj = hashlib.sha256(__version__.encode())
+    paths = (
+        sorted(PACKAGE_DIR.glob("*.py"))
+        + [
+            PROJECT_DIR / "pyproject.toml",
+            PROJECT_DIR / "uv.lock",
+        ]
+        + sorted(path for path in (REPO_DIR / "raw_data").rglob("*") if path.is_file())
+    )
+    for path in paths:
+        if path.exists():
+            hash_obj.update(str(path.relative_to(REPO_DIR)).encode())
+            hash_obj.update(file_digest(path).encode())
+    return hash_obj.hexdigest()
+
+
+def get_build_fingerprint(data_repo: DataPath, options: dict[str, Any]) -> str:
+    """
+    :param data_repo: See data_source.open_data_repo.
+    :param options: The build options (other than the data repo path) that change the outputs.
+    """
+    fingerprint = {
+        "data": hash_data_repo(data_repo),
+        "package": hash_package(),
+        "latest_month": LATEST_MONTH,
+        "options": options,
+    }
+    return hashlib.sha256(
+        json.dumps(fingerprint, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def _copy_output(source: Path, destination: Path) -> None:
+    if destination.is_dir():
+        shutil.rmtree(destination)
+    if source.is_dir():
+        shutil.copytree(source, destination)
+    else:
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(source, destination)
+
+
+def restore_build_outputs(
+    build_cache_dir: Path, fingerprint: str, output_paths: Iterable[Path]
+) -> bool:
+    """
+    Copies the outputs of the cached build to public/, if it has the given fingerprint.
+    Returns whether it did.
+
+    :param output_paths: The files and directories in public/ that the build writes.
+    """
+    fingerprint_path = build_cache_dir / "fingerprint"
+    if (
+        not fingerprint_path.exists()
+        or fingerprint_path.read_text().strip() != fingerprint
+    ):
+        return False
+
+    for path in output_paths:
+        cached_path = build_cache_dir / "public" / path.relative_to(PUBLIC_DIR)
+        if cached_path.exists():
+            _copy_output(cached_path, path)
+    return True
+
+
+def save_build_outputs(
+    build_cache_dir: Path, fingerprint: str, output_paths: Iterable[Path]
+) -> None:
+    """
+    :param output_paths: The files and directories in public/ that the build writes. (Only those are
+        saved, so that restoring them doesn't overwrite the other files in public/.)
+    """
+    fingerprint_path = build_cache_dir / "fingerprint"
+    # Remove the fingerprint first, so that an interrupted copy is never restored
+    fingerprint_path.unlink(missing_ok=True)
+
+    outputs_path = build_cache_dir / "public"
+    if outputs_path.exists():
+        shutil.rmtree(outputs_path)
+    outputs_path.mkdir(parents=True)
+    for path in output_paths:
+        if path.exists():
+            _copy_output(path, outputs_path / path.relative_to(PUBLIC_DIR))
+
+    fingerprint_path.write_text(fingerprint)
@@ -1,11 +1,19 @@
 from pathlib import Path
 
 import pandas as pd
-from housing_data.build_data_utils import DataSource, get_numerical_columns
+from housing_data.build_data_utils import (
+    CROSSWALK_DIR,
+    DataSource,
+    get_numerical_columns,
+)
+from housing_data.rollup import rollup
+
+# Relative to the data repo
+METRO_CROSSWALK_PATH = CROSSWALK_DIR / "cbsa2fipsxw_2023.csv"
 
 
 def load_crosswalk_df(data_repo_path: Path) -> pd.DataFrame:
-    crosswalk_df = pd.read_csv(data_repo_path / "data/crosswalk/cbsa2fipsxw_2023.csv")
+    crosswalk_df = pd.read_csv(data_repo_path / METRO_CROSSWALK_PATH)
 
     # Drop the μSAs, no one cares about them.
     # Most of them are just one county anyway, so showing the combined metro stats doesn't
@@ -38,50 +46,80 @@ def load_crosswalk_df(data_repo_path: Path) -> pd.DataFrame:
     return crosswalk_df
 
 
+def get_metro_membership(
+    crosswalk_df: pd.DataFrame, counties_df: pd.DataFrame
+) -> pd.DataFrame:
+    """
+    Returns one row per metro and year, with the columns metro_type, metro_name, year,
+    num_counties (the number of counties in the metro, per the crosswalk) and county_names
+    (the names of the metro's counties that have a row in counties_df that year, in crosswalk order).
+
+    Both metro types are done at once, rather than in each of the MSA and CSA passes.
+    """
+    metro_counties_df = pd.concat(
+        [
+            crosswalk_df[["fips_state", "fips_county", f"{metro_type}_name"]]
+            .rename(columns={f"{metro_type}_name": "metro_name"})
+            .assign(metro_type=metro_type)
+            for metro_type in ["msa", "csa"]
+        ]
+    ).dropna(subset=["metro_name"])
+
+    num_counties = (
+        metro_counties_df.groupby(["metro_type", "metro_name"])
+        .size()
+        .reset_index(name="num_counties")
+    )
+
+    # An inner merge keeps the order of the crosswalk
+    county_years_df = metro_counties_df.merge(
+        counties_df[["fips_state", "fips_county", "year", "name"]],
+        on=["fips_state", "fips_county"],
+        how="inner",
+    )
+    county_names = (
+        county_years_df.groupby(["metro_type", "metro_name", "year"])["name"]
+        .agg(list)
+        .reset_index(name="county_names")
+    )
+
+    return county_names.merge(num_counties, on=["metro_type", "metro_name"])
+
+
 def combine_metro_rows(
-    df: pd.DataFrame, metro_type: str, crosswalk_df: pd.DataFrame
+    df: pd.DataFrame, metro_type: str, membership_df: pd.DataFrame
 ) -> pd.DataFrame:
     """
+    :param df: The metro_type level of the rollup of the county rows (see load_metros).
     :param metro_type: 'msa' or 'csa'
+    :param membership_df: See get_metro_membership.
     """
     assert metro_type in ["msa", "csa"]
 
     metro_col = f"{metro_type}_name"
 
     if metro_type == "msa":
-        other_metro_col = "csa_name"
         metro_name_suffix = "MSA"
     elif metro_type == "csa":
-        other_metro_col = "msa_name"
         metro_name_suffix = "CSA"
     else:
         raise ValueError(f"Unknown metro_type: {metro_type}")
 
-    combined_df = (
-        df.drop(columns=[other_metro_col])
-        .groupby([metro_col, "year"])
-        .agg(**get_aggregate_functions())
-        .reset_index()
-        .rename(columns={metro_col: "metro_name"})
-        .assign(metro_type=metro_type)
+    combined_df = df.rename(columns={metro_col: "metro_name"}).assign(
+        metro_type=metro_type
     )
 
     combined_df["metro_name_with_suffix"] = combined_df["metro_name"].str.replace(
         ",", " " + metro_name_suffix + ","
     )
 
+    combined_df = combined_df.merge(
+        membership_df, on=["metro_type", "metro_name", "year"], how="inner"
+    )
+
     # Only keep a metros in 2021 if all of its counties were observed.
     # Most counties are actually not observed (yet) in 2021, because lots of cities are only surveyed
     # yearly, not monthly.
-    num_counties_in_each_metro = (
-        crosswalk_df.groupby(metro_col)
-        .size()
-        .reset_index(name="num_counties")
-        .rename(columns={metro_col: "metro_name"})
-    )
-    combined_df = combined_df.merge(
-        num_counties_in_each_metro, on="metro_name", how="left"
-    )
 
     combined_df = combined_df[
         (combined_df["year"] != "2021")
@@ -93,34 +131,52 @@ def combine_metro_rows(
     return combined_df
 
 
-def get_aggregate_functions() -> dict[str, pd.NamedAgg]:
+def get_aggregate_functions() -> dict[str, tuple[str, str]]:
     return {
-        col: pd.NamedAgg(column=col, aggfunc="sum")
+        col: (col, "sum")
         for col in set(
             get_numerical_columns(DataSource.BPS, totals=True, projected=True)
             + get_numerical_columns(DataSource.CA_HCD, totals=True, projected=True)
         )
     } | {
-        "county_names": pd.NamedAgg(
-            column="name", aggfunc=lambda counties: counties.tolist()
-        ),
-        "population": pd.NamedAgg(column="population", aggfunc="sum"),
+        "population": ("population", "sum"),
         # So that we can check if all the counties in a metro were observed in that year
-        "num_observed_counties": pd.NamedAgg(column="name", aggfunc="count"),
+        "num_observed_counties": ("name", "count"),
         # If any county has CA HCD data, then the combined metro has CA HCD data
-        "has_ca_hcd_data": pd.NamedAgg(column="has_ca_hcd_data", aggfunc="max"),
+        "has_ca_hcd_data": ("has_ca_hcd_data", "max"),
     }
 
 
-def load_metros(data_repo_path: Path, counties_df: pd.DataFrame) -> pd.DataFrame:
+def load_metros(
+    data_repo_path: Path, counties_df: pd.DataFrame, engine: str = "pandas"
+) -> pd.DataFrame:
+    """
+    :param engine: "pandas", or "duckdb" to join the counties to the crosswalk and aggregate them
+        with DuckDB (see housing_data.duckdb_engine).
+    """
     crosswalk_df = load_crosswalk_df(data_repo_path)
 
-    merged_df = crosswalk_df.merge(
-        counties_df, on=["fips_state", "fips_county"], how="left"
-    ).drop(columns=["fips_state", "fips_county"])
+    levels = {"msa": ["msa_name", "year"], "csa": ["csa_name", "year"]}
+    if engine == "duckdb":
+        from housing_data import duckdb_engine
+
+        rollups = duckdb_engine.rollup_left_join(
+            crosswalk_df,
+            counties_df,
+            ["fips_state", "fips_county"],
+            levels,
+            get_aggregate_functions(),
+        )
+    else:
+        merged_df = crosswalk_df.merge(
+            counties_df, on=["fips_state", "fips_county"], how="left"
+        ).drop(columns=["fips_state", "fips_county"])
+
+        rollups = rollup(merged_df, levels, get_aggregate_functions())
+    membership_df = get_metro_membership(crosswalk_df, counties_df)
 
-    msas_df = combine_metro_rows(merged_df, "msa", crosswalk_df)
-    csas_df = combine_metro_rows(merged_df, "csa", crosswalk_df)
+    msas_df = combine_metro_rows(rollups["msa"], "msa", membership_df)
+    csas_df = combine_metro_rows(rollups["csa"], "csa", membership_df)
 
     metros_df = pd.concat([msas_df, csas_df])
 
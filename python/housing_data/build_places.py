@@ -5,13 +5,12 @@ import pandas as pd
 from housing_data import place_population
 from housing_data.build_data_utils import (
     PLACE_POPULATION_DIR,
-    PUBLIC_DIR,
     DataSource,
     get_numerical_columns,
     get_state_abbrs,
     load_bps_all_years_plus_monthly,
 )
-from housing_data.building_permits_survey import REGIONS
+from housing_data.building_permits_survey import REGIONS, Region
 
 
 def make_bps_fips_mapping(
@@ -218,9 +217,9 @@ def add_alt_names(raw_places_df: pd.DataFrame) -> None:
     nyc_rows = (raw_places_df["place_name"] == "New York City") & (
         raw_places_df["state_code"] == 36
     )
-    raw_places_df.loc[
-        nyc_rows, "alt_name"
-    ] = "Manhattan Bronx Brooklyn Queens Staten Island"
+    raw_places_df.loc[nyc_rows, "alt_name"] = (
+        "Manhattan Bronx Brooklyn Queens Staten Island"
+    )
 
 
 def get_place_name_spellings(
@@ -245,7 +244,8 @@ def get_place_name_spellings(
             for place_type in place_types:
                 mapping[(place_name, place_type, state_code)] = (
                     f"{place_name} {place_type}"
-                    if place_type is not None
+                    # <NA> rather than None with pyarrow strings
+                    if not pd.isna(place_type)
                     else place_name
                 )
 
@@ -295,29 +295,60 @@ def get_name_spelling(places_df: pd.DataFrame) -> pd.Series:
 
 
 def load_places(
-    data_repo_path: Path, counties_population_df: pd.DataFrame = None
+    data_repo_path: Path,
+    counties_population_df: pd.DataFrame = None,
+    dtype_backend: Optional[str] = None,
 ) -> tuple[pd.DataFrame, pd.DataFrame]:
-    raw_places_df = pd.concat(
-        [
-            load_bps_all_years_plus_monthly(data_repo_path, "place", region=region)
-            for region in REGIONS
-        ]
+    """
+    Loads all the regions, one after the other.
+    (build_data runs load_region_places for each region in parallel instead, see its LOAD_STAGES.)
+    """
+    place_populations_df = load_place_populations(
+        data_repo_path, counties_population_df
     )
 
-    nyc_rows = _make_nyc_rows(raw_places_df)
-    raw_places_df = pd.concat([raw_places_df, nyc_rows])
+    region_dfs = [
+        load_region_places(data_repo_path, region, place_populations_df, dtype_backend)
+        for region in REGIONS
+    ]
 
-    add_alt_names(raw_places_df)
+    return combine_region_places(*[df for dfs in region_dfs for df in dfs])
 
-    raw_places_df.to_parquet(PUBLIC_DIR / "places_annual_without_population.parquet")
 
+def load_place_populations(
+    data_repo_path: Path, counties_population_df: pd.DataFrame = None
+) -> pd.DataFrame:
     place_populations_df = place_population.get_place_population_estimates(
         data_path=data_repo_path / PLACE_POPULATION_DIR
     )
-    place_populations_df = fix_nyc_boroughs_population(
-        place_populations_df, counties_population_df
+    return fix_nyc_boroughs_population(place_populations_df, counties_population_df)
+
+
+def load_region_places(
+    data_repo_path: Path,
+    region: Region,
+    place_populations_df: pd.DataFrame,
+    dtype_backend: Optional[str] = None,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Returns the raw places (without population) and the places for one of the BPS regions.
+
+    :param dtype_backend: Reads the BPS files with that dtype backend (see bps.read_bps_formatted_csv).
+
+    Everything here (NYC rows, alt names, FIPS codes, population and name spellings) only depends on
+    the rows of the same state, and a state is in only one region, so the regions can be loaded
+    separately and concatenated (see combine_region_places).
+    """
+    raw_places_df = load_bps_all_years_plus_monthly(
+        data_repo_path, "place", region=region, dtype_backend=dtype_backend
     )
 
+    if (raw_places_df["state_code"] == 36).any():
+        nyc_rows = _make_nyc_rows(raw_places_df)
+        raw_places_df = pd.concat([raw_places_df, nyc_rows])
+
+    add_alt_names(raw_places_df)
+
     places_df = add_place_population_data(raw_places_df, place_populations_df)
 
     name = get_name_spelling(places_df)
@@ -334,3 +365,16 @@ def load_places(
     places_df = places_df[not_null_rows]
 
     return raw_places_df, places_df
+
+
+def combine_region_places(
+    *region_dfs: pd.DataFrame,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    :param region_dfs: The outputs of load_region_places for each region, flattened, i.e.
+        raw_places_df_1, places_df_1, raw_places_df_2, places_df_2, ...
+    """
+    raw_places_df = pd.concat(region_dfs[0::2])
+    places_df = pd.concat(region_dfs[1::2])
+
+    return raw_places_df, places_df
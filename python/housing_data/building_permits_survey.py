@@ -198,11 +198,17 @@ def get_data_path(
 
 
 def read_bps_formatted_csv(
-    csv_contents: str, scale: Scale, year: int, region: Optional[Region] = None
+    csv_contents: str,
+    scale: Scale,
+    year: int,
+    region: Optional[Region] = None,
+    dtype_backend: Optional[str] = None,
 ) -> pd.DataFrame:
     """
     Given the contents of a CSV file from the BPS dataset, parses it as a DataFrame.
     Takes into account several quirks in the way they format their files.
+
+    :param dtype_backend: Same as the dtype_backend argument of pd.read_csv, e.g. "pyarrow".
     """
     result = (
         csv_contents
@@ -219,7 +225,12 @@ def read_bps_formatted_csv(
     line = csv_handle.readline()
     assert line.strip() == ""
 
-    df = pd.read_csv(csv_handle, header=None, index_col=False)
+    df = pd.read_csv(
+        csv_handle,
+        header=None,
+        index_col=False,
+        **({"dtype_backend": dtype_backend} if dtype_backend is not None else {}),
+    )
 
     if scale == "county" and year >= 1990 and year <= 1998:
         df.columns = _fix_column_names_old_county_level(header_row_1, header_row_2)
@@ -240,10 +251,12 @@ def load_data(
     region: Optional[Region] = None,
     data_path: Optional[Path] = None,
     drop_useless_fields: bool = True,
+    dtype_backend: Optional[str] = None,
 ) -> pd.DataFrame:
     """
     :param region: Only required if scale is 'place'
     :param month: Only required if time_scale is 'monthly_current' or 'monthly_year_to_date'
+    :param dtype_backend: See read_bps_formatted_csv.
     """
     path = get_data_path(scale, time_scale, year, month, region)
     if data_path is None:
@@ -254,7 +267,7 @@ def load_data(
     if ERROR_STRING in text:
         raise ValueError(f"Path {path} is not valid")
 
-    df = read_bps_formatted_csv(text, scale, year, region)
+    df = read_bps_formatted_csv(text, scale, year, region, dtype_backend)
 
     if scale == "state":
         state_cleanup(df)
@@ -400,12 +413,14 @@ def parse_number_column(col: pd.Series) -> pd.Series:
     """
     col = col.copy()
 
-    if col.dtype == object:
+    # object, or string[pyarrow] with the pyarrow dtype backend
+    if pd.api.types.is_string_dtype(col.dtype):
         # in 'survey_date' in some files
         col = col.str.rstrip("\x1a")
 
-        space_or_empty = col.str.isspace() | (col.str.len() == 0)
-        col.loc[space_or_empty] = None
+        # The .str methods return <NA> rather than False for nulls with pyarrow strings
+        space_or_empty = (col.str.isspace() | (col.str.len() == 0)).fillna(False)
+        col.loc[space_or_empty.astype(bool)] = None
 
         # For some malformed zipcodes, like '49098____  '
         col = col.str.rstrip("_ ")
@@ -445,7 +460,7 @@ def place_cleanup(df: pd.DataFrame, year: int) -> pd.DataFrame:
 
     for col in NUMBER_COLS_TO_PARSE:
         if col in df.columns:
-            if col == "zip_code" and df[col].dtype == object:
+            if col == "zip_code" and pd.api.types.is_string_dtype(df[col].dtype):
                 # Sometimes there are spaces between the first 5 and next 3-4 digits (e.g. "83650 012")
                 df[col] = df[col].str.replace(" ", "")
 
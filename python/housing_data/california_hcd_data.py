@@ -9,14 +9,21 @@ Because of SB 35 triggers based on the amount of housing permitted, cities have
 a greater incentive to report this data correctly.
 """
 
+import shutil
 from functools import lru_cache
 from pathlib import Path
-from typing import Literal, Optional
+from typing import Optional
 
 import numpy as np
 import pandas as pd
-from housing_data.build_data_utils import DataSource, add_total_columns
-from housing_data.fips_crosswalk import load_fips_crosswalk
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from housing_data.build_data_utils import CA_HCD_DIR, DataSource, add_total_columns
+from housing_data.fips_crosswalk import FIPS_CROSSWALK_PATH, load_fips_crosswalk
+
+# Relative to the data repo
+TABLE_A2_PATH = CA_HCD_DIR / "tablea2.csv.gz"
 
 BUILDING_PERMIT_COLUMNS = [
     "BP_VLOW_INCOME_DR",
@@ -29,17 +36,110 @@ BUILDING_PERMIT_COLUMNS = [
 ]
 
 
+# The only columns of Table A2 that we use. The file has dozens more.
+PROJECT_COLUMNS = [
+    "JURIS_NAME",
+    "CNTY_NAME",
+    "YEAR",
+    "UNIT_CAT",
+    "BP_ISSUE_DT1",
+    "CO_ISSUE_DT1",
+] + BUILDING_PERMIT_COLUMNS
+
+# Columns that identify a project, kept (if present in the file) only so that the project
+# store can answer drilldown questions like "which projects make up Oakland's 2023 5+ units".
+PROJECT_DETAIL_COLUMNS = ["JURS_TRACKING_ID", "PROJECT_NAME", "STREET_ADDRESS", "APN"]
+
+# Read everything as strings: several of these columns mix ints and strings across
+# rows (e.g. "2020-08-02" in a units column), so letting pandas infer a dtype per chunk
+# would give inconsistent types. The numeric columns are coerced in _filter_projects.
+PROJECT_DTYPES = {col: str for col in PROJECT_COLUMNS + PROJECT_DETAIL_COLUMNS}
+
+CHUNK_SIZE = 100_000
+
+
 def load_california_hcd_data(
     data_path: Path,
 ) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
-    df = pd.read_csv(data_path / "data/apr/tablea2.csv.gz")
+    return aggregate_projects(load_projects(data_path), data_path)
+
+
+def aggregate_projects(
+    df: pd.DataFrame, data_path: Path
+) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    Returns the places, counties and state tables of the project rows (as returned by load_projects).
+    """
+    # Pivot the projects once, to one row per jurisdiction and year. The county and state
+    # tables are then sums of the jurisdiction rows (which include the unincorporated
+    # "<name> COUNTY" jurisdictions, so every project is counted in its CNTY_NAME).
+    # The projects with a null JURIS_NAME or CNTY_NAME are kept in their own rows, which
+    # only count towards the state (and the county, if CNTY_NAME isn't null).
+    wide_df = _pivot_to_jurisdictions(df)
+
+    places_df = _add_place_codes(
+        wide_df.dropna(subset=["JURIS_NAME", "CNTY_NAME"]), data_path
+    )
+    counties_df = _add_county_codes(_roll_up(wide_df, ["CNTY_NAME", "year"]), data_path)
+    state_df = _roll_up(wide_df, ["year"])
+    state_df["state_code"] = 6  # California
+
+    return places_df, counties_df, state_df
+
+
+def get_input_paths() -> list[Path]:
+    """
+    Returns the paths (relative to the data repo) of the files read by load_projects and aggregate_projects.
+    """
+    return [TABLE_A2_PATH, FIPS_CROSSWALK_PATH]
+
+
+def load_projects(data_path: Path) -> pd.DataFrame:
+    """
+    Returns one row per permitted project in Table A2, with the columns JURIS_NAME, CNTY_NAME,
+    year, building_type and units, followed by the raw columns that describe the project
+    (UNIT_CAT, BP_ISSUE_DT1, the BUILDING_PERMIT_COLUMNS and whichever PROJECT_DETAIL_COLUMNS
+    are in the file).
+
+    Table A2 is read in chunks, and each chunk is reduced to the projects we keep before
+    the next one is parsed, so memory stays proportional to the output rather than to the
+    (fast-growing) raw file.
+    """
+    chunks = pd.read_csv(
+        data_path / TABLE_A2_PATH,
+        usecols=lambda col: col in PROJECT_COLUMNS or col in PROJECT_DETAIL_COLUMNS,
+        dtype=PROJECT_DTYPES,
+        chunksize=CHUNK_SIZE,
+    )
+    df = pd.concat([_filter_projects(chunk) for chunk in chunks], ignore_index=True)
+
+    assert (
+        df["building_type"].isnull().sum() < 60
+    ), f"{df['building_type'].isnull().sum()} is not less than 60"
+    df = df[df["building_type"].notnull()]
+
+    # Drop rows where YEAR is not parseable as an int
+    df = df.rename(columns={"YEAR": "year"})
+    df["year"] = pd.to_numeric(df["year"], errors="coerce").replace({np.nan: None})
+    df = df.dropna(subset=["year"])
+    df["year"] = df["year"].astype(int).astype(str)
+
+    # Filter to years with complete data.
+    # (Different cities' APRs come online in Table A2 at different times, but all
+    # cities' data for the previous year isn't available until around July.)
+    df = df[df["year"] <= "2024"]
+
+    first_cols = ["JURIS_NAME", "CNTY_NAME", "year", "building_type", "units"]
+    return df[first_cols + [col for col in df.columns if col not in first_cols]]
 
+
+def _filter_projects(df: pd.DataFrame) -> pd.DataFrame:
     # BPS doesn't include mobile homes, so we shouldn't include them here either
     df = df[df["UNIT_CAT"] != "MH"].copy()
 
     # These columns are a mix of string and ints.
     # They also have some string values that can't be parsed as numbers (e.g. "2020-08-02")
-    for col in ["BP_ABOVE_MOD_INCOME", "BP_VLOW_INCOME_NDR", "BP_LOW_INCOME_DR"]:
+    for col in BUILDING_PERMIT_COLUMNS:
         df[col] = pd.to_numeric(df[col], errors="coerce")
 
     df["units"] = df[BUILDING_PERMIT_COLUMNS].sum(axis="columns")
@@ -78,53 +178,78 @@ def load_california_hcd_data(
         None,
     )
 
-    assert (
-        df["building_type"].isnull().sum() < 60
-    ), f"{df['building_type'].isnull().sum()} is not less than 60"
-    df = df[df["building_type"].notnull()]
+    return df.drop(columns=["CO_ISSUE_DT1"])
 
-    # Drop rows where YEAR is not parseable as an int
-    df = df.rename(columns={"YEAR": "year"})
-    df["year"] = pd.to_numeric(df["year"], errors="coerce").replace({np.nan: None})
-    df = df.dropna(subset=["year"])
-    df["year"] = df["year"].astype(int).astype(str)
 
-    # Filter to years with complete data.
-    # (Different cities' APRs come online in Table A2 at different times, but all
-    # cities' data for the previous year isn't available until around July.)
-    df = df[df["year"] <= "2024"]
+# The partitions of the project store. (The names are URL-encoded in the directory names, and
+# the years are strings like in the rest of the build, rather than the ints that pyarrow would infer.)
+PROJECT_STORE_PARTITIONING = ds.partitioning(
+    pa.schema([("JURIS_NAME", pa.string()), ("year", pa.string())]), flavor="hive"
+)
 
-    places_df = _aggregate_to_geography(df, "place", data_path)
-    counties_df = _aggregate_to_geography(df, "county", data_path)
-    state_df = _aggregate_to_geography(df, "state", data_path)
 
-    return places_df, counties_df, state_df
+def write_project_store(df: pd.DataFrame, path: Path) -> None:
+    """
+    Writes the project rows (as returned by load_projects) as a Parquet dataset partitioned by
+    jurisdiction and year (path/JURIS_NAME=<name>/year=<year>/...).
+    Use load_jurisdiction_projects to read it.
+    """
+    if path.exists():
+        shutil.rmtree(path)
+
+    table = pa.Table.from_pandas(
+        df.sort_values(["JURIS_NAME", "year"], kind="stable"), preserve_index=False
+    )
+    pq.write_to_dataset(table, path, partitioning=PROJECT_STORE_PARTITIONING)
 
 
-def _aggregate_to_geography(
-    df: pd.DataFrame,
-    level: Literal["place", "county", "state"],
-    data_path: Optional[Path],
+def load_jurisdiction_projects(
+    path: Path,
+    juris_name: str,
+    year: Optional[str] = None,
+    building_type: Optional[str] = None,
 ) -> pd.DataFrame:
+    """
+    Returns the projects behind a jurisdiction's HCD numbers from the store written by
+    write_project_store, e.g. `load_jurisdiction_projects(path, "OAKLAND", "2023", "5_plus_units")`.
+    Only the jurisdiction's partitions (of the year, if given) are read.
+
+    :param juris_name: The (upper case) JURIS_NAME, e.g. "OAKLAND" or "ALAMEDA COUNTY".
+    """
+    filters = [("JURIS_NAME", "==", juris_name)]
+    if year is not None:
+        filters.append(("year", "==", year))
+    if building_type is not None:
+        filters.append(("building_type", "==", building_type))
+
+    df = pd.read_parquet(path, filters=filters, partitioning=PROJECT_STORE_PARTITIONING)
+    # The partition columns are read as categoricals
+    df = df.astype({"JURIS_NAME": str, "year": str})
+
+    return df.sort_values("year", kind="stable").reset_index(drop=True)
+
+
+def _pivot_to_jurisdictions(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns one row per (JURIS_NAME, CNTY_NAME, year), with columns
+    {building_type}_{units,bldgs}_hcd and the total_* columns. JURIS_NAME and CNTY_NAME
+    may be null.
+    """
     # Sum 1 for every row in the APRs dataset, since we have 1 row per project/building.
     # (Technically this might not be true if a project has multiple buildings, e.g. a townhouse
     # subdivision or something. But no one looks at the buildings charts anyways 🤷‍♂️)
-    df["bldgs"] = 1
-
-    if level == "place":
-        index_cols = ["JURIS_NAME", "CNTY_NAME", "year"]
-    elif level == "county":
-        index_cols = ["CNTY_NAME", "year"]
-    elif level == "state":
-        index_cols = ["year"]
-
-    wide_df = df.pivot_table(
-        index=index_cols,
-        columns="building_type",
-        values=["units", "bldgs"],
-        fill_value=0,
-        aggfunc="sum",
-    ).reset_index()
+    # Not a pivot_table, which would drop the projects with a null JURIS_NAME or CNTY_NAME.
+    wide_df = (
+        df.assign(bldgs=1)
+        .groupby(
+            ["JURIS_NAME", "CNTY_NAME", "year", "building_type"],
+            dropna=False,
+            observed=True,
+        )[["bldgs", "units"]]
+        .sum()
+        .unstack("building_type", fill_value=0)
+        .reset_index()
+    )
 
     wide_df.columns = [
         f"{level_1}_{level_0}_hcd" if level_1 else level_0
@@ -133,34 +258,49 @@ def _aggregate_to_geography(
 
     add_total_columns(wide_df, DataSource.CA_HCD)
 
-    if level == "place":
-        # Confirm that we can drop county because in California, a city can't span multiple counties
-        assert (wide_df[["JURIS_NAME", "year"]].value_counts() == 1).all()
-        wide_df = wide_df.drop(columns=["CNTY_NAME"])
-    if level == "place":
-        old_wide_df = wide_df
-        # Add place_or_county_code
-        wide_df = wide_df.merge(
-            _load_fips_crosswalk(data_path), left_on="JURIS_NAME", right_on="name"
-        ).drop(columns=["name", "county_code"])
-        if len(old_wide_df) != len(wide_df):
-            dropped_cities = set(old_wide_df["JURIS_NAME"]) - set(wide_df["JURIS_NAME"])
-            added_cities = set(wide_df["JURIS_NAME"]) - set(old_wide_df["JURIS_NAME"])
-            raise ValueError(
-                f"wide_df had {len(old_wide_df)} rows before merge and {len(wide_df)} rows after merge. "
-                f"{dropped_cities=} {added_cities=}"
-            )
-    elif level == "county":
-        # Add county_code
-        old_rows = len(wide_df)
-        wide_df["name"] = wide_df["CNTY_NAME"].str.upper() + " COUNTY"
-        wide_df = wide_df.merge(_load_fips_crosswalk(data_path), on="name").drop(
-            columns=["CNTY_NAME", "name", "place_or_county_code"]
+    return wide_df
+
+
+def _roll_up(wide_df: pd.DataFrame, index_cols: list[str]) -> pd.DataFrame:
+    """
+    Sums the jurisdiction-level table up to a coarser level (county or state).
+    Rows with a null value in index_cols are left out.
+    """
+    value_cols = [
+        col for col in wide_df.columns if col not in ["JURIS_NAME", "CNTY_NAME", "year"]
+    ]
+    return wide_df.groupby(index_cols, as_index=False)[value_cols].sum()
+
+
+def _add_place_codes(wide_df: pd.DataFrame, data_path: Optional[Path]) -> pd.DataFrame:
+    # Confirm that we can drop county because in California, a city can't span multiple counties
+    assert (wide_df[["JURIS_NAME", "year"]].value_counts() == 1).all()
+    old_wide_df = wide_df.drop(columns=["CNTY_NAME"])
+
+    # Add place_or_county_code
+    wide_df = old_wide_df.merge(
+        _load_fips_crosswalk(data_path), left_on="JURIS_NAME", right_on="name"
+    ).drop(columns=["name", "county_code"])
+    if len(old_wide_df) != len(wide_df):
+        dropped_cities = set(old_wide_df["JURIS_NAME"]) - set(wide_df["JURIS_NAME"])
+        added_cities = set(wide_df["JURIS_NAME"]) - set(old_wide_df["JURIS_NAME"])
+        raise ValueError(
+            f"wide_df had {len(old_wide_df)} rows before merge and {len(wide_df)} rows after merge. "
+            f"{dropped_cities=} {added_cities=}"
         )
-        new_rows = len(wide_df)
-        assert old_rows == new_rows, f"{old_rows=} != {new_rows=}"
-    elif level == "state":
-        wide_df["state_code"] = 6  # California
+
+    return wide_df
+
+
+def _add_county_codes(wide_df: pd.DataFrame, data_path: Optional[Path]) -> pd.DataFrame:
+    # Add county_code
+    old_rows = len(wide_df)
+    wide_df["name"] = wide_df["CNTY_NAME"].str.upper() + " COUNTY"
+    wide_df = wide_df.merge(_load_fips_crosswalk(data_path), on="name").drop(
+        columns=["CNTY_NAME", "name", "place_or_county_code"]
+    )
+    new_rows = len(wide_df)
+    assert old_rows == new_rows, f"{old_rows=} != {new_rows=}"
 
     return wide_df
 
@@ -7,8 +7,13 @@ from housing_data.build_data_utils import (
     DataSource,
     add_per_capita_columns,
 )
-from housing_data.canada_crosswalk import load_crosswalk
-from housing_data.canada_population import load_populations
+from housing_data.canada_crosswalk import CROSSWALK_FILES, load_crosswalk
+from housing_data.canada_population import POPULATION_PATH, load_populations
+from housing_data.file_cache import read_excel_cached
+from housing_data.rollup import rollup, sum_aggregations
+
+# Relative to the data repo
+BPER_PATH = CANADA_BPER_DIR / "Case1091138_revised.xlsx"
 
 _UNITS_CATEGORIES = {
     1: "1_unit",
@@ -78,7 +83,13 @@ def _add_alt_names(df: pd.DataFrame) -> None:
     df["alt_name"] = alt_names
 
 
-def load_canada_bper(data_repo_path: Path) -> pd.DataFrame:
+def load_canada_bper(
+    data_repo_path: Path, lazy_per_capita: bool = False
+) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    :param lazy_per_capita: Don't add the "{col}_per_capita" columns
+        (see the --lazy-per-capita option in build_data).
+    """
     df = load_raw_bper(data_repo_path)
     fix_montreal(df)
 
@@ -86,29 +97,48 @@ def load_canada_bper(data_repo_path: Path) -> pd.DataFrame:
     df = df.merge(load_populations(data_repo_path), how="left", on=["year", "SGC"])
     df = df.drop(columns=["SGC"])
 
+    value_columns = [col for col in df.select_dtypes("number").columns if col != "year"]
+    rollups = rollup(df, ROLLUP_LEVELS, sum_aggregations(value_columns))
+
     places_df = load_places(df)
-    counties_df = aggregate_to_counties(df)
-    metros_df = aggregate_to_metros(df)
-    states_df = aggregate_to_states(df)
+    counties_df = add_county_names(rollups["counties"])
+    metros_df = add_metro_names(rollups["metros"])
+    states_df = add_state_names(rollups["states"])
 
-    places_df.to_parquet("../public/canada_places_annual.parquet")
-    counties_df.to_parquet("../public/canada_counties_annual.parquet")
-    metros_df.to_parquet("../public/canada_metros_annual.parquet")
-    states_df.to_parquet("../public/canada_states_annual.parquet")
+    if not lazy_per_capita:
+        for output_df in [places_df, counties_df, metros_df, states_df]:
+            add_per_capita_columns(output_df, [DataSource.CANADA])
 
     return places_df, counties_df, metros_df, states_df
 
 
+def get_input_paths() -> list[Path]:
+    """
+    Returns the paths (relative to the data repo) of the files read by load_canada_bper.
+    """
+    return [
+        BPER_PATH,
+        *[CANADA_CROSSWALK_DIR / file_name for file_name in CROSSWALK_FILES],
+        POPULATION_PATH,
+    ]
+
+
 def load_raw_bper(data_repo_path: Path) -> pd.DataFrame:
-    file_path = data_repo_path / CANADA_BPER_DIR / "Case1091138_revised.xlsx"
+    file_path = data_repo_path / BPER_PATH
 
-    old_df = pd.read_excel(file_path, sheet_name=0, skiprows=2)
+    # The SGC columns mix numbers and strings (e.g. "2466A..."), which can't be cached as
+    # Parquet, so read them as strings. (The SGC header is on the wrong column in the old sheet.)
+    old_df = read_excel_cached(
+        file_path, sheet_name=0, skiprows=2, dtype={"Municipality Name": str}
+    )
     old_df = old_df.rename(
         columns={"SGC": "Municipality Name", "Municipality Name": "SGC"}
     )
     old_df["SGC"] = old_df["SGC"].astype(str).apply(_fix_old_sgc)
 
-    recent_df = pd.read_excel(file_path, sheet_name=1, skiprows=2)
+    recent_df = read_excel_cached(
+        file_path, sheet_name=1, skiprows=2, dtype={"SGC": str}
+    )
     recent_df["SGC"] = recent_df["SGC"].astype(str)
 
     df = pd.concat([old_df, recent_df])
@@ -124,11 +154,25 @@ def fix_montreal(df: pd.DataFrame) -> None:
     ] = "2466023"
 
 
-def pivot_and_add_geos(df: pd.DataFrame, data_repo_path: Path) -> pd.DataFrame:
-    df = df.merge(
-        load_crosswalk(data_repo_path / CANADA_CROSSWALK_DIR), how="left", on="SGC"
-    )
+# Levels that the places are rolled up to (see rollup.py)
+ROLLUP_LEVELS = {
+    "counties": ["census_division", "year", "province_abbr"],
+    "metros": ["metro", "year", "metro_province_abbr"],
+    "states": ["province", "year"],
+}
 
+# The geography attributes of each place (SGC), from the crosswalk
+GEO_COLUMNS = [
+    "place_name",
+    "province",
+    "province_abbr",
+    "census_division",
+    "metro",
+    "metro_province_abbr",
+]
+
+
+def pivot_and_add_geos(df: pd.DataFrame, data_repo_path: Path) -> pd.DataFrame:
     df["units"] = df["UnitsCategory"].map(UNITS_CATEGORIES)
     df = df.drop(columns=["UnitsCategory"])
 
@@ -140,24 +184,31 @@ def pivot_and_add_geos(df: pd.DataFrame, data_repo_path: Path) -> pd.DataFrame:
     # 92 duplicate rows
     df = df.drop_duplicates()
 
-    ids = [
-        "SGC",
-        "place_name",
-        "province",
-        "province_abbr",
-        "year",
-        "census_division",
-        "metro",
-        "metro_province_abbr",
-    ]
-
     df = (
         pd.pivot_table(
-            df, index=ids, columns="units", values="UnitsCreated", aggfunc="sum"
+            df,
+            index=["SGC", "year"],
+            columns="units",
+            values="UnitsCreated",
+            aggfunc="sum",
         )
         .fillna(0)
         .reset_index()
     )
+    units_columns = [col for col in df.columns if col not in ["SGC", "year"]]
+
+    # Join the geography attributes once per place, rather than onto every raw row.
+    # This drops places that are missing from the crosswalk or have any missing attribute
+    # (e.g. places outside of a metro), same as when the attributes were part of the pivot index.
+    crosswalk_df = load_crosswalk(data_repo_path / CANADA_CROSSWALK_DIR)
+    crosswalk_df = crosswalk_df[["SGC"] + GEO_COLUMNS].dropna()
+    df = df.merge(crosswalk_df, on="SGC")
+
+    df = df[
+        ["SGC", "place_name", "province", "province_abbr", "year"]
+        + ["census_division", "metro", "metro_province_abbr"]
+        + units_columns
+    ]
     df["total_units"] = sum(df[col] for col in set(UNITS_CATEGORIES.values()))
 
     return df
@@ -178,15 +229,11 @@ def load_places(df: pd.DataFrame) -> pd.DataFrame:
     df["year"] = df["year"].astype(str)
     df = df.drop(columns=["province"])
 
-    add_per_capita_columns(df, [DataSource.CANADA])
     _add_alt_names(df)
     return df
 
 
-def aggregate_to_counties(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.groupby(["census_division", "year", "province_abbr"], as_index=False).sum()
-    add_per_capita_columns(df, [DataSource.CANADA])
-
+def add_county_names(df: pd.DataFrame) -> pd.DataFrame:
     df["path_1"] = df["province_abbr"]
     df["path_2"] = df["census_division"].str.replace(r"[ /\-\.]+", "_", regex=True)
     df["name"] = df["census_division"] + ", " + df["province_abbr"]
@@ -196,14 +243,7 @@ def aggregate_to_counties(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def aggregate_to_metros(df: pd.DataFrame) -> pd.DataFrame:
-    df = (
-        df.drop(columns=["place_name", "province_abbr", "province"])
-        .groupby(["metro", "year", "metro_province_abbr"], as_index=False)
-        .sum(numeric_only=True)
-    )
-    add_per_capita_columns(df, [DataSource.CANADA])
-
+def add_metro_names(df: pd.DataFrame) -> pd.DataFrame:
     metro = df["metro"].str.replace(" - ", "–")
     df["path_1"] = None
     df["path_2"] = (
@@ -222,14 +262,7 @@ def aggregate_to_metros(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def aggregate_to_states(df: pd.DataFrame) -> pd.DataFrame:
-    df = (
-        df.drop(columns=["path_1", "path_2"])
-        .groupby(["province", "year"], as_index=False)
-        .sum(numeric_only=True)
-    )
-    add_per_capita_columns(df, [DataSource.CANADA])
-
+def add_state_names(df: pd.DataFrame) -> pd.DataFrame:
     df["path_1"] = None
     df["path_2"] = df["province"].str.replace(" ", "_")
     df["name"] = df["province"]
@@ -2,6 +2,13 @@ from pathlib import Path
 
 import pandas as pd
 
+# The files in CANADA_CROSSWALK_DIR
+CSD_FILE = "CSD.csv"
+CD_FILE = "CD.csv"
+PROVINCE_FILE = "PR.csv"
+CMA_FILE = "CMA_CA.csv"
+CROSSWALK_FILES = [CSD_FILE, CD_FILE, PROVINCE_FILE, CMA_FILE]
+
 PROVINCE_ABBREVIATIONS = {
     "Newfoundland and Labrador": "NL",
     "Prince Edward Island": "PE",
@@ -111,16 +118,16 @@ def load_crosswalk(data_path: Path) -> pd.DataFrame:
     - metro_province_abbr
     """
     # equivalent of place/city
-    csd_df = pd.read_csv(data_path / "CSD.csv", encoding="latin1")
+    csd_df = pd.read_csv(data_path / CSD_FILE, encoding="latin1")
 
     # roughly equivalent to county
-    cd_df = pd.read_csv(data_path / "CD.csv", encoding="latin1")
+    cd_df = pd.read_csv(data_path / CD_FILE, encoding="latin1")
 
     # equivalent of state
-    province_df = pd.read_csv(data_path / "PR.csv", encoding="latin1")
+    province_df = pd.read_csv(data_path / PROVINCE_FILE, encoding="latin1")
 
     # equivalent of metro area
-    cma_df = pd.read_csv(data_path / "CMA_CA.csv", encoding="latin1")
+    cma_df = pd.read_csv(data_path / CMA_FILE, encoding="latin1")
 
     df = (
         csd_df[["CSDname", "CSDtype", "CSDuid", "PRuid", "CDcode", "CMAuid"]]
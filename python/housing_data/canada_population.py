@@ -1,11 +1,62 @@
 from pathlib import Path
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
 from housing_data.build_data_utils import CANADA_POPULATION_DIR
+from housing_data.file_cache import cache_path_for, write_cache
+
+# Relative to the data repo
+POPULATION_PATH = CANADA_POPULATION_DIR / "17100142.csv"
+
+POPULATION_COLUMN_TYPES = {
+    "REF_DATE": pa.int64(),
+    "DGUID": pa.string(),
+    "VALUE": pa.float64(),
+}
+
+# DGUID prefix of census subdivisions (i.e. places), 2016 boundaries.
+# The table also has rows for provinces, census divisions etc., which we don't use.
+CSD_DGUID_PREFIX = "2016A0005"
+
+
+def read_csd_populations(path: Path) -> pd.DataFrame:
+    """
+    Reads the REF_DATE, DGUID and VALUE columns of the census subdivision rows of a StatCan
+    population table (e.g. 17100142.csv), skipping the other columns and rows while parsing.
+    The result is cached (see file_cache.py), since the table is much bigger than what we keep.
+    """
+    cache_path = cache_path_for(
+        path,
+        "statcan",
+        columns=list(POPULATION_COLUMN_TYPES),
+        dguid_prefix=CSD_DGUID_PREFIX,
+    )
+    if cache_path.exists():
+        return pd.read_parquet(cache_path)
+
+    reader = pa_csv.open_csv(
+        path,
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=list(POPULATION_COLUMN_TYPES),
+            column_types=POPULATION_COLUMN_TYPES,
+        ),
+    )
+    table = pa.Table.from_batches(
+        [
+            batch.filter(pc.starts_with(batch["DGUID"], CSD_DGUID_PREFIX))
+            for batch in reader
+        ],
+        schema=reader.schema,
+    )
+    write_cache(table, cache_path)
+
+    return table.to_pandas()
 
 
 def load_populations(data_root_path: Path) -> pd.DataFrame:
-    df = pd.read_csv(data_root_path / CANADA_POPULATION_DIR / "17100142.csv")
+    df = read_csd_populations(data_root_path / POPULATION_PATH)
 
     df = (
         df[["REF_DATE", "DGUID", "VALUE"]]
@@ -19,7 +70,7 @@ def load_populations(data_root_path: Path) -> pd.DataFrame:
         )
     )
 
-    df["SGC"] = df["SGC"].str.removeprefix("2016A0005")
+    df["SGC"] = df["SGC"].str.removeprefix(CSD_DGUID_PREFIX)
 
     # We don't have 2000 data, let's just use 2001 data for 2000
     df = pd.concat([df, df[df["year"] == 2001].assign(year=2000)])
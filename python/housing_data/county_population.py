@@ -4,10 +4,23 @@ from pathlib import Path
 import pandas as pd
 import us
 from housing_data.build_data_utils import (
+    COUNTY_POPULATION_DIR,
     check_population_present_for_all_years,
     impute_2025_and_2026_population,
 )
-from housing_data.fips_crosswalk import load_fips_crosswalk
+from housing_data.file_cache import read_excel_cached
+from housing_data.fips_crosswalk import FIPS_CROSSWALK_PATH, load_fips_crosswalk
+
+# The files in COUNTY_POPULATION_DIR, by decade (the 2000s have a file per state, see
+# get_county_populations_2000s_paths)
+COUNTIES_1980S_YEARS = range(1980, 1990)
+COUNTIES_1990S_FILE = "99c8_00.txt"
+COUNTIES_2010S_FILE = "co-est2020-alldata.csv"
+COUNTIES_2020S_FILE = "co-est2024-alldata.csv"
+
+
+def get_counties_1980s_file(year: int) -> str:
+    return f"pe-02-{year}.xls"
 
 
 def _melt_df(df: pd.DataFrame, years: list[int]) -> pd.DataFrame:
@@ -22,25 +35,32 @@ def _melt_df(df: pd.DataFrame, years: list[int]) -> pd.DataFrame:
 
 
 def get_county_populations_2020s(data_path: Path) -> pd.DataFrame:
-    df = pd.read_csv(data_path / "co-est2024-alldata.csv", encoding="latin_1")
+    df = pd.read_csv(data_path / COUNTIES_2020S_FILE, encoding="latin_1")
 
     df = _melt_df(df, list(range(2020, 2025)))
     return impute_2025_and_2026_population(df)
 
 
 def get_county_populations_2010s(data_path: Path) -> pd.DataFrame:
-    df = pd.read_csv(data_path / "co-est2020-alldata.csv", encoding="latin_1")
+    df = pd.read_csv(data_path / COUNTIES_2010S_FILE, encoding="latin_1")
 
     return _melt_df(df, list(range(2010, 2020)))
 
 
-def get_county_populations_2000s(data_path: Path, data_repo_path: Path) -> pd.DataFrame:
-    paths = [
+def get_county_populations_2000s_paths() -> list[tuple[str, str]]:
+    """
+    Returns (state FIPS code, file name) for each of the 2000s county population files (one per state).
+    """
+    return [
         (state.fips, f"co-est00int-01-{state.fips}.csv")
         for state in us.STATES_AND_TERRITORIES + [us.states.DC]
         if state.fips not in ["60", "66", "69", "72", "78"]  # exclude territories
     ]
 
+
+def get_county_populations_2000s(data_path: Path, data_repo_path: Path) -> pd.DataFrame:
+    paths = get_county_populations_2000s_paths()
+
     col_names = [
         "County Name",
         "2000-04-01",
@@ -121,7 +141,7 @@ def get_county_fips_crosswalk(data_repo_path: Path) -> pd.DataFrame:
 
 
 def get_county_populations_1990s(data_path: Path) -> pd.DataFrame:
-    table_text = (data_path / "99c8_00.txt").read_text(encoding="latin_1")
+    table_text = (data_path / COUNTIES_1990S_FILE).read_text(encoding="latin_1")
 
     table_text = table_text[: table_text.index("Block 2")].strip()
 
@@ -171,8 +191,8 @@ def get_county_populations_1990s(data_path: Path) -> pd.DataFrame:
 
 def get_county_populations_1980s(data_path: Path) -> pd.DataFrame:
     dfs = []
-    for year in range(1980, 1990):
-        df = pd.read_excel(data_path / f"pe-02-{year}.xls", skiprows=5)
+    for year in COUNTIES_1980S_YEARS:
+        df = read_excel_cached(data_path / get_counties_1980s_file(year), skiprows=5)
         df = df.rename(
             columns={
                 "Year of Estimate": "year",
@@ -207,6 +227,22 @@ def get_county_populations_1980s(data_path: Path) -> pd.DataFrame:
     return combined_df
 
 
+def get_input_paths() -> list[Path]:
+    """
+    Returns the paths (relative to the data repo) of the files read by get_county_population_estimates.
+    """
+    return [
+        COUNTY_POPULATION_DIR / file_name
+        for file_name in [
+            *[get_counties_1980s_file(year) for year in COUNTIES_1980S_YEARS],
+            COUNTIES_1990S_FILE,
+            *[file_name for _, file_name in get_county_populations_2000s_paths()],
+            COUNTIES_2010S_FILE,
+            COUNTIES_2020S_FILE,
+        ]
+    ] + [FIPS_CROSSWALK_PATH]
+
+
 def get_county_population_estimates(
     data_path: Path, data_repo_path: Path
 ) -> pd.DataFrame:
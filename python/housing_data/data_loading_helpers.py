@@ -15,6 +15,7 @@ def get_url_text(
     """
     If data_path is not None, returns the file from that path
     (assuming it's stored there with the same filename as in the URL).
+    data_path can also be a data_source.DataPath, e.g. in a zip of the data repo.
 
     Otherwise, downloads it from the web.
 
@@ -29,8 +30,7 @@ def get_url_text(
         web_prefix, common_path = os.path.split(url)
 
     if data_path is not None:
-        path = Path(data_path, common_path)
-        return path.read_text(encoding=encoding)
+        return (data_path / common_path).read_text(encoding=encoding)
     else:
         web_url = os.path.join(web_prefix, common_path)
         return requests.get(web_url).text
@@ -0,0 +1,331 @@
+"""
+Reads the data repo (https://github.com/sid-kap/housing-data-data) from a directory, or from a
+single zip or tar.zst snapshot of it, which is much cheaper to download and cache than a clone
+of thousands of files:
+
+    python -m housing_data.build_data --data-repo-path ../housing-data-data.zip
+
+A DataPath is a file or directory in the data repo. It supports the parts of the pathlib.Path API
+that the loaders use (`/`, open, read_text, exists, name, stem, ...), so loaders don't need to know
+where the data repo is stored. Files can also be stored compressed, as {name}.gz or {name}.zst:
+`data_path / name` then reads the decompressed contents.
+
+How the files are read:
+- In a directory, in place.
+- In a zip, directly from the archive, which has an index of its members (so reading one file
+  doesn't decompress the others).
+- A tar.zst has no index, so it's unpacked once (per version of the archive) under
+  CACHE_DIR/data_repo, and read as a directory from then on.
+
+Readers that take a file system path rather than a file object (e.g. pd.read_csv(path)) get one
+through os.fspath(). For a zip member or a compressed file, that extracts the (decompressed) file
+under CACHE_DIR/data_repo the first time.
+"""
+
+import hashlib
+import io
+import os
+import shutil
+import tarfile
+import zipfile
+from dataclasses import dataclass
+from functools import cache
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, Iterator, Optional, Union
+
+import pyarrow as pa
+from housing_data.build_data_utils import CACHE_DIR
+
+DATA_REPO_CACHE_DIR = CACHE_DIR / "data_repo"
+
+# Archives made by GitHub (or `git archive --prefix`) have all the files in one top-level directory,
+# like housing-data-data-main/. Paths in the archive are relative to that directory.
+ARCHIVE_DIR_PREFIX = "housing-data-data"
+
+# Suffixes of compressed files, and their pyarrow codecs
+COMPRESSED_SUFFIXES = {".gz": "gzip", ".zst": "zstd"}
+
+
+def _stat_version(path: Path) -> tuple[int, int]:
+    stat = path.stat()
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _short_hash(*parts: object) -> str:
+    return hashlib.sha256(repr(parts).encode()).hexdigest()[:16]
+
+
+@dataclass(frozen=True)
+class DirectoryStore:
+    root: Path
+    # The tar.zst archive that root was unpacked from, if any
+    archive_path: Optional[Path] = None
+
+    def __str__(self) -> str:
+        return str(self.archive_path or self.root)
+
+    def is_file(self, name: str) -> bool:
+        return (self.root / name).is_file()
+
+    def is_dir(self, name: str) -> bool:
+        return (self.root / name).is_dir()
+
+    def list_files(self, name: str) -> list[str]:
+        return sorted(
+            path.relative_to(self.root).as_posix()
+            for path in (self.root / name).rglob("*")
+            if path.is_file()
+        )
+
+    def open(self, name: str) -> BinaryIO:
+        return (self.root / name).open("rb")
+
+    def version(self, name: str) -> tuple[int, int]:
+        return _stat_version(self.root / name)
+
+    def local_path(self, name: str) -> Optional[Path]:
+        return self.root / name
+
+
+@dataclass(frozen=True)
+class _ZipIndex:
+    zip_file: zipfile.ZipFile
+    members: dict[str, zipfile.ZipInfo]
+    dirs: set[str]
+
+
+@cache
+def _read_zip_index(archive_path: Path, pid: int) -> _ZipIndex:
+    """
+    Opened once per process (hence the pid argument: forked stage workers mustn't share the parent's
+    file offset).
+    """
+    zip_file = zipfile.ZipFile(archive_path)
+    infos = [info for info in zip_file.infolist() if not info.is_dir()]
+
+    top_level_names = {info.filename.split("/")[0] for info in infos}
+    prefix = ""
+    if len(top_level_names) == 1 and all("/" in info.filename for info in infos):
+        top_level_name = top_level_names.pop()
+        if top_level_name.startswith(ARCHIVE_DIR_PREFIX):
+            prefix = top_level_name + "/"
+
+    members = {info.filename.removeprefix(prefix): info for info in infos}
+    dirs = {""} | {
+        "/".join(parts[:i])
+        for name in members
+        for parts in [name.split("/")]
+        for i in range(1, len(parts))
+    }
+    return _ZipIndex(zip_file, members, dirs)
+
+
+@dataclass(frozen=True)
+class ZipStore:
+    archive_path: Path
+
+    def __str__(self) -> str:
+        return str(self.archive_path)
+
+    @property
+    def _index(self) -> _ZipIndex:
+        return _read_zip_index(self.archive_path, os.getpid())
+
+    def is_file(self, name: str) -> bool:
+        return name in self._index.members
+
+    def is_dir(self, name: str) -> bool:
+        return name in self._index.dirs
+
+    def list_files(self, name: str) -> list[str]:
+        prefix = name + "/" if name else ""
+        return sorted(
+            member for member in self._index.members if member.startswith(prefix)
+        )
+
+    def open(self, name: str) -> BinaryIO:
+        return self._index.zip_file.open(self._index.members[name])
+
+    def version(self, name: str) -> tuple[int, int]:
+        info = self._index.members[name]
+        return info.file_size, info.CRC
+
+    def local_path(self, name: str) -> Optional[Path]:
+        return None
+
+
+DataStore = Union[DirectoryStore, ZipStore]
+
+
+@dataclass(frozen=True)
+class DataPath(os.PathLike):
+    store: DataStore
+    relative: PurePosixPath = PurePosixPath()
+
+    def __str__(self) -> str:
+        return str(Path(str(self.store)) / self.relative)
+
+    def __truediv__(self, other: Union[str, os.PathLike]) -> "DataPath":
+        return DataPath(self.store, self.relative / other)
+
+    @property
+    def name(self) -> str:
+        return self.relative.name
+
+    @property
+    def stem(self) -> str:
+        return self.relative.stem
+
+    @property
+    def suffix(self) -> str:
+        return self.relative.suffix
+
+    @property
+    def parent(self) -> "DataPath":
+        return DataPath(self.store, self.relative.parent)
+
+    @property
+    def _name(self) -> str:
+        return "" if self.relative == PurePosixPath() else self.relative.as_posix()
+
+    def _resolve(self) -> Optional[tuple[str, Optional[str]]]:
+        """
+        Returns the name of the file in the store, and its compression (None if it's uncompressed),
+        or None if there's no such file.
+        """
+        if self.store.is_file(self._name):
+            return self._name, None
+        for suffix, compression in COMPRESSED_SUFFIXES.items():
+            if self.store.is_file(self._name + suffix):
+                return self._name + suffix, compression
+        return None
+
+    def is_dir(self) -> bool:
+        return self.store.is_dir(self._name)
+
+    def is_file(self) -> bool:
+        return self._resolve() is not None
+
+    def exists(self) -> bool:
+        return self.is_dir() or self.is_file()
+
+    def iter_files(self) -> Iterator["DataPath"]:
+        """
+        The files under this directory, as they're stored (i.e. with their compression suffix).
+        """
+        for name in self.store.list_files(self._name):
+            yield DataPath(self.store, PurePosixPath(name))
+
+    def version(self) -> tuple[int, int]:
+        """
+        Changes when the file does: (size, mtime) in a directory, (size, CRC) in a zip.
+        """
+        name, _ = self._resolve_or_raise()
+        return self.store.version(name)
+
+    def _resolve_or_raise(self) -> tuple[str, Optional[str]]:
+        resolved = self._resolve()
+        if resolved is None:
+            raise FileNotFoundError(f"No such file in the data repo: {self}")
+        return resolved
+
+    def open(self, mode: str = "rb") -> BinaryIO:
+        if mode != "rb":
+            raise ValueError(
+                f"The data repo can only be opened for reading bytes, not {mode}"
+            )
+
+        name, compression = self._resolve_or_raise()
+        f = self.store.open(name)
+        if compression is not None:
+            return pa.CompressedInputStream(f, compression)
+        return f
+
+    def read_bytes(self) -> bytes:
+        with self.open() as f:
+            return f.read()
+
+    def read_text(self, encoding: Optional[str] = None) -> str:
+        # Like Path.read_text, translates \r\n to \n
+        with io.TextIOWrapper(self.open(), encoding=encoding) as f:
+            return f.read()
+
+    def __fspath__(self) -> str:
+        name, compression = self._resolve_or_raise()
+        local_path = self.store.local_path(name)
+        if compression is None and local_path is not None:
+            return str(local_path)
+
+        extracted_path = (
+            DATA_REPO_CACHE_DIR
+            / _short_hash(str(self.store), name, self.store.version(name))
+            / self.name
+        )
+        if not extracted_path.exists():
+            extracted_path.parent.mkdir(parents=True, exist_ok=True)
+            # Builds run stages in parallel processes, so give each one its own temporary file
+            tmp_path = extracted_path.with_name(f"{self.name}.{os.getpid()}.tmp")
+            with self.open() as src, tmp_path.open("wb") as dst:
+                shutil.copyfileobj(src, dst)
+            tmp_path.replace(extracted_path)
+        return str(extracted_path)
+
+
+def _extract_tar(tar: tarfile.TarFile, path: Path) -> None:
+    """
+    Extracts the archive's regular files and directories, refusing members outside of path.
+    (Python >= 3.11.4 does that with filter="data"; older versions don't have the filters.)
+    """
+    if hasattr(tarfile, "data_filter"):
+        tar.extractall(path, filter="data")
+        return
+
+    root = path.resolve()
+    for member in tar:
+        if not (member.isfile() or member.isdir()):
+            continue
+        member_path = (root / member.name).resolve()
+        if member_path != root and root not in member_path.parents:
+            raise ValueError(f"Archive member is outside of {path}: {member.name}")
+        tar.extract(member, path)
+
+
+def _unpack_tar_zst(archive_path: Path) -> Path:
+    unpacked_path = (
+        DATA_REPO_CACHE_DIR
+        / f"{archive_path.name}-{_short_hash(*_stat_version(archive_path))}"
+    )
+    if not unpacked_path.exists():
+        print(f"Unpacking {archive_path} to {unpacked_path}")
+        tmp_path = unpacked_path.with_name(unpacked_path.name + ".tmp")
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        with pa.CompressedInputStream(archive_path.open("rb"), "zstd") as f:
+            with tarfile.open(fileobj=f, mode="r|") as tar:
+                _extract_tar(tar, tmp_path)
+        tmp_path.replace(unpacked_path)
+
+    children = list(unpacked_path.iterdir())
+    if (
+        len(children) == 1
+        and children[0].is_dir()
+        and children[0].name.startswith(ARCHIVE_DIR_PREFIX)
+    ):
+        return children[0]
+    return unpacked_path
+
+
+def open_data_repo(path: Union[str, Path]) -> DataPath:
+    """
+    :param path: A directory, or a .zip or .tar.zst archive of the data repo.
+    """
+    path = Path(path)
+    if path.name.endswith(".zip"):
+        return DataPath(ZipStore(path))
+    elif path.name.endswith(".tar.zst"):
+        return DataPath(DirectoryStore(_unpack_tar_zst(path), archive_path=path))
+    else:
+        return DataPath(DirectoryStore(path))
+
+
+def as_data_path(path: Union[str, Path, DataPath]) -> DataPath:
+    return path if isinstance(path, DataPath) else open_data_repo(path)
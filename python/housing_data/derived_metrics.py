@@ -0,0 +1,154 @@
+"""
+Trend metrics of each geography, computed once in the build rather than in the browser:
+for each of DERIVED_METRIC_COLUMNS (the BPS total and unit type units, and the CA HCD total units),
+e.g. total_units,
+- total_units_yoy_change: the change since the previous year,
+- total_units_rolling_3y, total_units_rolling_5y: the average over the last 3 and 5 years,
+- total_units_cumulative_since_2000: the sum since 2000 (or since the first year we have, if later),
+- and "{metric}_per_capita" of each of those, divided by the year's population.
+
+The current year's BPS value is its total so far plus the projection for the rest of the year
+(see add_current_year_projections), like in the charts, so that it's comparable to full years.
+(The unit types don't have projections of their own, so they're projected at the same rate.)
+
+All the entities are computed at once, as NumPy operations along the year axis of an
+entities × years array of each column.
+"""
+
+import numpy as np
+import pandas as pd
+from housing_data.build_data_utils import DataSource, get_numerical_columns
+
+# The columns that get derived metrics. The BPS ones are projected to the whole current year.
+PROJECTED_DERIVED_METRIC_COLUMNS = ["total_units"] + [
+    col for col in get_numerical_columns(DataSource.BPS) if col.endswith("_units")
+]
+DERIVED_METRIC_COLUMNS = PROJECTED_DERIVED_METRIC_COLUMNS + ["total_units_hcd"]
+
+ROLLING_WINDOWS = [3, 5]
+CUMULATIVE_START_YEAR = 2000
+
+# An entity is a row of the list file, i.e. one JSON file. (Rows of different geographies can
+# have the same path, e.g. two places with the same name in a state, and are then added up.)
+ENTITY_COLUMNS = ["path_1", "path_2"]
+
+
+def _get_entity_codes(df: pd.DataFrame) -> np.ndarray:
+    """
+    Returns the index of each row's entity, in the order of the sorted ENTITY_COLUMNS.
+    """
+    return df.groupby(ENTITY_COLUMNS, dropna=False, sort=True).ngroup().to_numpy()
+
+
+def _to_year_arrays(
+    values_df: pd.DataFrame, columns: list[str]
+) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+    """
+    Returns the years (a contiguous range) and an entities × years array of each of the columns,
+    NaN for the years an entity doesn't have.
+
+    :param values_df: Has at most one row per entity and year.
+    """
+    entity_codes = _get_entity_codes(values_df)
+    row_years = values_df["year"].astype(int).to_numpy()
+    years = np.arange(row_years.min(), row_years.max() + 1)
+    year_codes = row_years - years[0]
+
+    arrays = {}
+    for col in columns:
+        array = np.full((entity_codes.max() + 1, len(years)), np.nan)
+        array[entity_codes, year_codes] = values_df[col].to_numpy(
+            dtype=float, na_value=np.nan
+        )
+        arrays[col] = array
+    return years, arrays
+
+
+def yoy_change(values: np.ndarray) -> np.ndarray:
+    """
+    :param values: entities × years
+    """
+    change = np.full_like(values, np.nan)
+    change[:, 1:] = values[:, 1:] - values[:, :-1]
+    return change
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    The mean of each year and the window - 1 years before it, or NaN if any of those is missing.
+    """
+    means = np.full_like(values, np.nan)
+    if values.shape[1] >= window:
+        windows = np.lib.stride_tricks.sliding_window_view(values, window, axis=1)
+        first_full_window = window - 1
+        means[:, first_full_window:] = windows.mean(axis=2)
+    return means
+
+
+def cumulative_sum(values: np.ndarray, start_index: int) -> np.ndarray:
+    """
+    The sum of the years from start_index (NaN before it). Missing years count as 0.
+    """
+    sums = np.full_like(values, np.nan)
+    start_index = max(start_index, 0)
+    sums[:, start_index:] = np.nancumsum(values[:, start_index:], axis=1)
+    return sums
+
+
+def with_derived_metrics(df: pd.DataFrame, per_capitas: bool = True) -> pd.DataFrame:
+    """
+    Returns a copy of df with the derived metrics of the columns of DERIVED_METRIC_COLUMNS that df has.
+
+    :param per_capitas: Whether to also add their "_per_capita" metrics (not with --lazy-per-capita).
+    """
+    columns = [col for col in DERIVED_METRIC_COLUMNS if col in df.columns]
+    if not columns or df.empty:
+        return df
+
+    if "projected_units" in df.columns:
+        # The projection for the rest of the year, as a share of the total so far
+        projected_ratio = (
+            (df["projected_units"] / df["total_units"].replace({0: np.nan}))
+            .astype(float)
+            .fillna(0)
+        )
+    else:
+        projected_ratio = 0
+    values_df = df[ENTITY_COLUMNS + ["year"]].assign(
+        **{
+            col: (
+                df[col] * (1 + projected_ratio)
+                if col in PROJECTED_DERIVED_METRIC_COLUMNS
+                else df[col]
+            )
+            for col in columns
+        }
+    )
+    values_df = (
+        values_df.groupby(ENTITY_COLUMNS + ["year"], dropna=False)[columns]
+        .sum(min_count=1)
+        .reset_index()
+    )
+    years, arrays = _to_year_arrays(values_df, columns)
+
+    derived = {}
+    for col, values in arrays.items():
+        derived[f"{col}_yoy_change"] = yoy_change(values)
+        for window in ROLLING_WINDOWS:
+            derived[f"{col}_rolling_{window}y"] = rolling_mean(values, window)
+        derived[f"{col}_cumulative_since_{CUMULATIVE_START_YEAR}"] = cumulative_sum(
+            values, CUMULATIVE_START_YEAR - years[0]
+        )
+
+    # values_df has the same entities as df, so the same entity codes
+    entity_codes = _get_entity_codes(df)
+    year_codes = df["year"].astype(int).to_numpy() - years[0]
+    # Null where the population is 0, like add_per_capita_columns
+    population = df["population"].astype(float).replace({0: np.nan})
+    new_columns = {}
+    for name, array in derived.items():
+        new_columns[name] = array[entity_codes, year_codes]
+        if per_capitas:
+            new_columns[f"{name}_per_capita"] = new_columns[name] / population
+    # All at once, rather than one insert per column, which would fragment df
+    return pd.concat([df, pd.DataFrame(new_columns, index=df.index)], axis=1)
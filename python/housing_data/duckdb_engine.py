@@ -0,0 +1,187 @@
+"""
+Runs the largest joins and aggregations of the build (the metro rollup in load_metros,
+impute_pre_1990_counties, and the latest population of each row of the list files) as SQL in an
+embedded DuckDB, instead of pandas. DuckDB runs a query on all cores, and spills to disk
+(under CACHE_DIR) when it doesn't fit in memory. The input frames, which the pipeline memory-maps
+from the stage artifacts, are scanned in place rather than copied into the database.
+
+Used with `build_data --engine duckdb`. Needs the optional duckdb dependency:
+
+    uv sync --extra duckdb
+
+The results are the same as the pandas code's (see tests/test_duckdb_engine.py).
+"""
+
+from typing import Optional
+
+import duckdb
+import pandas as pd
+from housing_data.build_data_utils import CACHE_DIR
+from housing_data.rollup import REAGGREGATE_FUNCTIONS
+
+DUCKDB_TEMP_DIR = CACHE_DIR / "duckdb"
+
+
+def connect() -> duckdb.DuckDBPyConnection:
+    DUCKDB_TEMP_DIR.mkdir(parents=True, exist_ok=True)
+    return duckdb.connect(
+        config={
+            "temp_directory": str(DUCKDB_TEMP_DIR),
+            # The queries sort their results, so there's no need to keep the input order
+            # (which makes it harder for DuckDB to parallelize and spill)
+            "preserve_insertion_order": False,
+        }
+    )
+
+
+def quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _aggregate_sql(col: str, aggfunc: str, output_col: str) -> str:
+    if aggfunc == "sum":
+        # pandas sums empty (or all null) groups to 0, whereas SQL sums them to NULL
+        sql = f"COALESCE(SUM({quote(col)}), 0)"
+    elif aggfunc == "count":
+        sql = f"COUNT({quote(col)})"
+    elif aggfunc in ["max", "min"]:
+        sql = f"{aggfunc.upper()}({quote(col)})"
+    else:
+        raise ValueError(f"Can't roll up {output_col} with aggfunc {aggfunc}")
+
+    return f"{sql} AS {quote(output_col)}"
+
+
+def _rollup(
+    conn: duckdb.DuckDBPyConnection,
+    relation: duckdb.DuckDBPyRelation,
+    levels: dict[str, list[str]],
+    aggregations: dict[str, tuple[str, str]],
+) -> dict[str, pd.DataFrame]:
+    for output_col, (_, aggfunc) in aggregations.items():
+        if aggfunc not in REAGGREGATE_FUNCTIONS:
+            raise ValueError(f"Can't roll up {output_col} with aggfunc {aggfunc}")
+
+    base_keys = list(dict.fromkeys(key for keys in levels.values() for key in keys))
+    relation.create_view("source")
+
+    key_list = ", ".join(quote(key) for key in base_keys)
+    aggregate_list = ", ".join(
+        _aggregate_sql(col, aggfunc, output_col)
+        for output_col, (col, aggfunc) in aggregations.items()
+    )
+    grouping_sets = ", ".join(
+        "(" + ", ".join(quote(key) for key in keys) + ")" for keys in levels.values()
+    )
+
+    # GROUPING(...) is a bitmask of the base keys that aren't in the row's grouping set,
+    # which tells us which level each row belongs to
+    query = f"""
+        SELECT {key_list}, {aggregate_list}, GROUPING({key_list}) AS grouping_id
+        FROM source
+        GROUP BY GROUPING SETS ({grouping_sets})
+    """
+    result_df = conn.sql(query).df()
+
+    rollups = {}
+    for name, keys in levels.items():
+        grouping_id = sum(
+            1 << (len(base_keys) - 1 - i)
+            for i, key in enumerate(base_keys)
+            if key not in keys
+        )
+        # Like pandas' groupby, leave out the groups with a null key, and sort by the keys
+        level_df = result_df[
+            (result_df["grouping_id"] == grouping_id)
+            & result_df[keys].notnull().all(axis=1)
+        ]
+        rollups[name] = (
+            level_df[keys + list(aggregations)].sort_values(keys).reset_index(drop=True)
+        )
+
+    return rollups
+
+
+def rollup(
+    df: pd.DataFrame,
+    levels: dict[str, list[str]],
+    aggregations: dict[str, tuple[str, str]],
+    where: Optional[str] = None,
+) -> dict[str, pd.DataFrame]:
+    """
+    Same as rollup.rollup, with one GROUP BY GROUPING SETS query.
+
+    :param where: An SQL condition to filter df's rows by before aggregating, e.g. "year < '1990'".
+    """
+    conn = connect()
+    relation = conn.from_df(df)
+    if where is not None:
+        relation = relation.filter(where)
+
+    return _rollup(conn, relation, levels, aggregations)
+
+
+def rollup_left_join(
+    left_df: pd.DataFrame,
+    right_df: pd.DataFrame,
+    on: list[str],
+    levels: dict[str, list[str]],
+    aggregations: dict[str, tuple[str, str]],
+) -> dict[str, pd.DataFrame]:
+    """
+    Same as `rollup.rollup(left_df.merge(right_df, on=on, how="left"), levels, aggregations)`,
+    without materializing the merged frame.
+    """
+    conn = connect()
+    left = conn.from_df(left_df).set_alias("l")
+    right = conn.from_df(right_df).set_alias("r")
+    condition = " AND ".join(f"l.{quote(col)} = r.{quote(col)}" for col in on)
+    right_columns = [col for col in right_df.columns if col not in on]
+    relation = left.join(right, condition, how="left").select(
+        ", ".join(
+            [f"l.{quote(col)}" for col in left_df.columns]
+            + [f"r.{quote(col)}" for col in right_columns]
+        )
+    )
+
+    rollups = _rollup(conn, relation, levels, aggregations)
+
+    # In pandas, the merge turns the bool columns of right_df into object columns when some rows
+    # of left_df have no match (e.g. the counties of the crosswalk that aren't in counties_df),
+    # and so do their aggregates. DuckDB gives nullable booleans instead.
+    bool_columns = [col for col in right_columns if right_df[col].dtype == bool]
+    if bool_columns:
+        has_unmatched_rows = (
+            left.join(right, condition, how="anti").limit(1).fetchone() is not None
+        )
+        bool_dtype = object if has_unmatched_rows else bool
+        for name, level_df in rollups.items():
+            rollups[name] = level_df.astype(
+                {
+                    output_col: bool_dtype
+                    for output_col, (col, aggfunc) in aggregations.items()
+                    if col in bool_columns and aggfunc in ["max", "min"]
+                }
+            )
+
+    return rollups
+
+
+def get_latest_rows(rows_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    :param rows_df: Has the columns list_row_id, year and population.
+    :return: The year and population of the row with the latest year, for each list_row_id
+        (sorted by list_row_id).
+    """
+    conn = connect()
+    conn.register("list_rows", rows_df)
+    return conn.sql("""
+        SELECT
+            list_row_id,
+            MAX(year) AS year,
+            -- Unlike arg_max, doesn't skip the rows with a null population
+            arg_max_null(population, year) AS population
+        FROM list_rows
+        GROUP BY list_row_id
+        ORDER BY list_row_id
+        """).df()
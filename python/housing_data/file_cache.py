@@ -0,0 +1,76 @@
+"""
+Caches parsed copies of slow-to-read raw inputs (mostly Excel workbooks) as Parquet files
+in CACHE_DIR, keyed on the hash of the input file and the arguments used to read it.
+Editing or replacing the input file changes its hash, so stale entries are never read;
+they are just left behind until CACHE_DIR is deleted.
+"""
+
+import hashlib
+import io
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from housing_data.build_data_utils import CACHE_DIR
+
+
+def file_digest(path: Path) -> str:
+    with path.open("rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def cache_path_for(path: Path, namespace: str, **kwargs: object) -> Path:
+    """
+    Returns the path of the cached copy of `path` read with `kwargs`.
+
+    :param namespace: Subdirectory of CACHE_DIR, one per kind of reader (e.g. "excel").
+    """
+    key = json.dumps(
+        {"file": file_digest(path), "kwargs": kwargs}, sort_keys=True, default=str
+    )
+    key_hash = hashlib.sha256(key.encode()).hexdigest()[:16]
+    return CACHE_DIR / namespace / f"{path.stem}-{key_hash}.parquet"
+
+
+def write_cache(table: pa.Table, cache_path: Path) -> None:
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    # Write to a temporary file first, so that an interrupted build doesn't leave a partial file behind
+    tmp_path = cache_path.with_suffix(".tmp")
+    pq.write_table(table, tmp_path)
+    tmp_path.replace(cache_path)
+
+
+def read_excel_cached(path: Path, **kwargs: object) -> pd.DataFrame:
+    """
+    Same as `pd.read_excel(path, **kwargs)`, except that the column names are always strings
+    (Parquet can only store string column names), and that the parsed sheet is cached.
+
+    Sheets that can't be stored as Parquet (e.g. a column with a mix of numbers and strings)
+    are just not cached.
+
+    :param path: A Path or a data_source.DataPath. The workbook is read into memory first (which
+        the Excel readers would do anyway), so that it can come from a zip or a compressed file.
+    """
+    cache_path = cache_path_for(path, "excel", **kwargs)
+    if cache_path.exists():
+        df = pd.read_parquet(cache_path)
+        # Parquet gives None for missing strings, read_excel gives NaN
+        for col in df.select_dtypes(include="object").columns:
+            df[col] = df[col].where(df[col].notna(), np.nan)
+        return df
+
+    df = pd.read_excel(io.BytesIO(path.read_bytes()), **kwargs)
+    df.columns = df.columns.astype(str)
+
+    try:
+        table = pa.Table.from_pandas(df)
+    except pa.ArrowException as e:
+        print(f"Not caching {path} ({kwargs}): {e}")
+        return df
+
+    write_cache(table, cache_path)
+
+    return df
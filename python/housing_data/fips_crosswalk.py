@@ -1,9 +1,12 @@
 from pathlib import Path
 
 import pandas as pd
+from housing_data.build_data_utils import CROSSWALK_DIR
+from housing_data.file_cache import read_excel_cached
+
+# Relative to the data repo
+FIPS_CROSSWALK_PATH = CROSSWALK_DIR / "all-geocodes-v2024.xlsx"
 
 
 def load_fips_crosswalk(data_repo_path: Path) -> pd.DataFrame:
-    return pd.read_excel(
-        data_repo_path / "data/crosswalk/all-geocodes-v2024.xlsx", skiprows=4
-    )
+    return read_excel_cached(data_repo_path / FIPS_CROSSWALK_PATH, skiprows=4)
@@ -0,0 +1,146 @@
+"""
+Lists the files in the data repo that a build reads, so that deploys can check out just those
+(with a sparse checkout) instead of cloning the whole repo. From `python/`:
+
+    uv run python -m housing_data.input_manifest --sparse-checkout-patterns \\
+        | git -C ../housing-data-data sparse-checkout set --no-cone --stdin
+
+The files are listed per stage of build_data, so that --only and --skip (same as in build_data)
+only list the files of the stages needed for those geographies.
+
+The files come from the loaders' own get_input_paths (and the like), so a loader that starts reading
+a new file should list it there, otherwise the deploy will fail with a FileNotFoundError.
+`--check-data-repo-path` checks that all the listed files exist.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+from typing import Callable, Optional
+
+from housing_data import (
+    california_hcd_data,
+    canada_bper,
+    county_population,
+    place_population,
+    state_population,
+)
+from housing_data.build_data import (
+    LOAD_STAGES,
+    TARGET_STAGES,
+    get_reuse_stages,
+    get_targets,
+    get_write_stages,
+)
+from housing_data.build_data_utils import get_bps_data_paths
+from housing_data.build_metros import METRO_CROSSWALK_PATH
+from housing_data.building_permits_survey import REGIONS
+from housing_data.data_source import COMPRESSED_SUFFIXES, open_data_repo
+from housing_data.pipeline import Stage
+
+# The files each stage of build_data reads, from the loaders' own lists
+STAGE_INPUT_PATHS: dict[str, Callable[[], list[Path]]] = {
+    "states": lambda: get_bps_data_paths("state") + state_population.get_input_paths(),
+    "county_population": county_population.get_input_paths,
+    "place_population": place_population.get_input_paths,
+    **{
+        f"places_{region}": (lambda region=region: get_bps_data_paths("place", region))
+        for region in REGIONS
+    },
+    "counties": lambda: get_bps_data_paths("county", start_year=1990),
+    "ca_hcd": california_hcd_data.get_input_paths,
+    "canada": canada_bper.get_input_paths,
+    "metros": lambda: [METRO_CROSSWALK_PATH],
+}
+
+
+def get_required_stages(
+    stages: list[Stage], targets: list[str], reuse_stages: Optional[list[str]] = None
+) -> list[Stage]:
+    """
+    Returns the stages that run_pipeline would run to build the targets (with an empty cache).
+    """
+    stages_by_name = {stage.name: stage for stage in stages}
+    producers = {
+        output_name: stage for stage in stages for output_name in stage.output_names()
+    }
+
+    required: dict[str, Stage] = {}
+    stack = [stages_by_name[target] for target in targets]
+    while stack:
+        stage = stack.pop()
+        if stage.name not in required and stage.name not in (reuse_stages or []):
+            required[stage.name] = stage
+            stack.extend(producers[input_name] for input_name in stage.inputs)
+
+    return [stage for stage in stages if stage.name in required]
+
+
+def get_input_paths(
+    only: Optional[list[str]] = None, skip: Optional[list[str]] = None
+) -> list[Path]:
+    """
+    Returns the paths (relative to the data repo) of the files read by a build with the
+    given --only and --skip geographies.
+    """
+    skip = skip or []
+    stages = LOAD_STAGES + get_write_stages()
+    targets = get_targets(only, skip)
+
+    paths = [
+        path
+        for stage in get_required_stages(stages, targets, get_reuse_stages(skip))
+        if stage.name in STAGE_INPUT_PATHS
+        for path in STAGE_INPUT_PATHS[stage.name]()
+    ]
+    return list(dict.fromkeys(paths))
+
+
+def get_sparse_checkout_patterns(path: Path) -> list[str]:
+    """
+    Returns the patterns of path, and of its compressed versions (see data_source.py)
+    unless it's already compressed.
+    """
+    suffixes = (
+        [""] if path.suffix in COMPRESSED_SUFFIXES else ["", *COMPRESSED_SUFFIXES]
+    )
+    return [f"/{path.as_posix()}{suffix}" for suffix in suffixes]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--only", nargs="+", choices=list(TARGET_STAGES))
+    parser.add_argument("--skip", nargs="+", choices=list(TARGET_STAGES), default=[])
+    parser.add_argument(
+        "--sparse-checkout-patterns",
+        action="store_true",
+        help="Print the paths as patterns for `git sparse-checkout set --no-cone --stdin` "
+        "(anchored to the root of the repo).",
+    )
+    parser.add_argument(
+        "--check-data-repo-path",
+        type=Path,
+        help="Instead of printing the paths, check that they all exist in the given data repo "
+        "(a directory, or a .zip or .tar.zst archive).",
+    )
+    args = parser.parse_args()
+
+    paths = get_input_paths(args.only, args.skip)
+
+    if args.check_data_repo_path is not None:
+        data_repo = open_data_repo(args.check_data_repo_path)
+        missing_paths = [path for path in paths if not (data_repo / path).exists()]
+        for path in missing_paths:
+            print(f"Missing: {path}", file=sys.stderr)
+        sys.exit(1 if missing_paths else 0)
+
+    for path in paths:
+        if args.sparse_checkout_patterns:
+            for pattern in get_sparse_checkout_patterns(path):
+                print(pattern)
+        else:
+            print(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,513 @@
+"""
+Runs the stages of build_data as a dependency graph.
+
+Each stage declares the artifacts (intermediate frames) it reads and produces. Stages whose inputs
+are ready run in parallel, in separate processes, and every artifact is saved in STAGE_CACHE_DIR
+as an Arrow IPC file, which the stages that use it memory-map. So the driver never holds any
+frames, and each process only holds the frames of the one stage it's running.
+
+Artifacts are saved under a key that hashes everything the stage depends on:
+- the source of the stage function and of the housing_data modules it uses (and their imports),
+  including the modules of the functions it calls,
+- the module-level constants and helper functions that the stage function refers to
+  (e.g. JSON_OPTIONS in build_data),
+- the stage's wiring (its inputs, outputs and data paths),
+- the files it reads from the data repo (paths, sizes and modification times), and the contents
+  of the files it reads from this repo (e.g. raw_data/),
+- the build options it uses,
+- the keys of its input artifacts,
+- the dtype backend the artifacts are read with.
+
+So re-running after editing build_metros.py only re-runs the metros stage and the stages downstream
+of it. Stages that write to public/ (`output=True`) don't produce an artifact; a marker file
+records that they already ran with the current key, and they re-run if any of the files they
+write has been deleted since.
+"""
+
+import ast
+import hashlib
+import inspect
+import json
+import time
+import types
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import pandas as pd
+import pyarrow as pa
+from housing_data.build_data_utils import CACHE_DIR
+from housing_data.data_source import as_data_path
+
+STAGE_CACHE_DIR = CACHE_DIR / "stages"
+
+PACKAGE_DIR = Path(__file__).parent
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    # Called with the input artifacts as positional arguments, and the options as keyword arguments.
+    # Must return a tuple with one value per output (or a single value if there is one output).
+    # The input frames may be backed by read-only memory: adding columns is fine, but values
+    # can't be modified in place.
+    func: Callable[..., Any]
+    inputs: list[str] = field(default_factory=list)
+    # Names of the artifacts this stage produces. Defaults to [name], or [] for output stages.
+    outputs: Optional[list[str]] = None
+    # housing_data modules (e.g. "build_metros") whose source, along with the source of the
+    # housing_data modules they import, determines the stage's output.
+    modules: list[str] = field(default_factory=list)
+    # Files or directories (relative to the data repo) that the stage reads.
+    data_paths: list[Path] = field(default_factory=list)
+    # Files or directories in this repo (e.g. RAW_DATA_DIR) that the stage reads.
+    local_paths: list[Path] = field(default_factory=list)
+    # Names of the build options that are passed to func.
+    options: list[str] = field(default_factory=list)
+    # Whether the stage writes files to public/ instead of producing artifacts.
+    output: bool = False
+    # For output stages, the files or directories they write.
+    files: list[Path] = field(default_factory=list)
+
+    def output_names(self) -> list[str]:
+        if self.outputs is not None:
+            return self.outputs
+        return [] if self.output else [self.name]
+
+
+@lru_cache
+def _module_imports(module: str) -> list[str]:
+    tree = ast.parse((PACKAGE_DIR / f"{module}.py").read_text())
+    imports = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom) and node.module is not None:
+            names = [node.module]
+            if node.module == "housing_data":
+                # from housing_data import building_permits_survey as bps
+                names = [f"housing_data.{alias.name}" for alias in node.names]
+        elif isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        else:
+            continue
+
+        for name in names:
+            if name.startswith("housing_data."):
+                imports.append(name.removeprefix("housing_data."))
+
+    return imports
+
+
+def module_closure(modules: list[str]) -> list[str]:
+    """
+    Returns the given housing_data modules and all the housing_data modules they (transitively) import.
+    """
+    seen: set[str] = set()
+    stack = list(modules)
+    while stack:
+        module = stack.pop()
+        if module not in seen:
+            seen.add(module)
+            stack.extend(_module_imports(module))
+
+    return sorted(seen)
+
+
+def data_signature(data_repo_path: Optional[Path], paths: list[Path]) -> list[Any]:
+    """
+    Returns (path, size, mtime) for every file under the given paths ((path, size, CRC) if the
+    data repo is a zip, see data_source.py).
+    Cheaper than hashing the contents, and good enough to notice a `git pull` in the data repo.
+    """
+    if data_repo_path is None:
+        return []
+
+    data_repo = as_data_path(data_repo_path)
+    signature = []
+    for path in paths:
+        full_path = data_repo / path
+        if full_path.is_dir():
+            for file in full_path.iter_files():
+                signature.append([str(file.relative), *file.version()])
+        elif full_path.is_file():
+            signature.append([str(full_path.relative), *full_path.version()])
+        else:
+            signature.append([str(full_path.relative), None, None])
+
+    return signature
+
+
+def local_signature(paths: list[Path]) -> list[Any]:
+    """
+    Returns (path, SHA-256) for every file under the given paths. Unlike data_signature, hashes the
+    contents, since a fresh checkout of this repo gives every file a new modification time.
+    """
+    signature = []
+    for path in paths:
+        files = (
+            sorted(p for p in path.rglob("*") if p.is_file())
+            if path.is_dir()
+            else [path]
+        )
+        for file in files:
+            digest = (
+                hashlib.sha256(file.read_bytes()).hexdigest() if file.exists() else None
+            )
+            signature.append([file.as_posix(), digest])
+
+    return signature
+
+
+def _code_names(code: types.CodeType) -> set[str]:
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            # Nested functions, lambdas and comprehensions
+            names |= _code_names(const)
+    return names
+
+
+def referenced_globals(func: Callable[..., Any]) -> dict[str, Any]:
+    """
+    Returns the module-level values (other than modules) that func refers to, including the ones that
+    the functions of func's own module that it calls refer to.
+    """
+    referenced: dict[str, Any] = {}
+
+    def visit(function: types.FunctionType) -> None:
+        for name in sorted(_code_names(function.__code__)):
+            if name in referenced or name not in function.__globals__:
+                continue
+            value = function.__globals__[name]
+            if isinstance(value, types.ModuleType):
+                continue
+            referenced[name] = value
+            if (
+                isinstance(value, types.FunctionType)
+                and value.__module__ == func.__module__
+            ):
+                visit(value)
+
+    visit(func)
+    return referenced
+
+
+def _stable_repr(value: Any) -> str:
+    """
+    repr, but with the elements of sets sorted, since their order changes between processes.
+    """
+    if isinstance(value, (set, frozenset)):
+        return "{" + ", ".join(sorted(_stable_repr(element) for element in value)) + "}"
+    if isinstance(value, dict):
+        items = [f"{_stable_repr(k)}: {_stable_repr(v)}" for k, v in value.items()]
+        return "{" + ", ".join(items) + "}"
+    if isinstance(value, (list, tuple)):
+        return "[" + ", ".join(_stable_repr(element) for element in value) + "]"
+    return repr(value)
+
+
+def _globals_key(func: Callable[..., Any]) -> tuple[dict[str, str], list[str]]:
+    """
+    Returns what stage_key hashes of the values that func refers to: the source of the functions
+    of func's own module and the repr of constants, and the housing_data modules of the other
+    functions and classes (whose source is then hashed along with the stage's modules).
+    """
+    values = {}
+    modules = []
+    for name, value in referenced_globals(func).items():
+        module = getattr(value, "__module__", None) or ""
+        if isinstance(value, (types.FunctionType, type)):
+            if module == func.__module__:
+                values[name] = inspect.getsource(value)
+            elif module.startswith("housing_data."):
+                modules.append(module.removeprefix("housing_data."))
+        elif not callable(value):
+            values[name] = _stable_repr(value)
+
+    return values, modules
+
+
+def stage_key(
+    stage: Stage,
+    options: dict[str, Any],
+    input_keys: list[str],
+    dtype_backend: Optional[str] = None,
+) -> str:
+    func = getattr(stage.func, "func", stage.func)  # unwrap functools.partial
+    global_values, global_modules = _globals_key(func)
+    key = {
+        "name": stage.name,
+        "func": inspect.getsource(func),
+        "args": [repr(arg) for arg in getattr(stage.func, "args", [])],
+        "globals": global_values,
+        "modules": {
+            module: hashlib.sha256(
+                (PACKAGE_DIR / f"{module}.py").read_bytes()
+            ).hexdigest()
+            for module in module_closure(stage.modules + global_modules)
+        },
+        "wiring": [stage.inputs, stage.output_names(), stage.data_paths, stage.files],
+        "data": data_signature(options.get("data_repo_path"), stage.data_paths),
+        "local": local_signature(stage.local_paths),
+        "options": {name: options[name] for name in stage.options},
+        "inputs": input_keys,
+        "dtype_backend": dtype_backend,
+    }
+    return hashlib.sha256(
+        json.dumps(key, sort_keys=True, default=str).encode()
+    ).hexdigest()[:16]
+
+
+def artifact_path(name: str, key: str) -> Path:
+    """
+    Artifacts are Arrow IPC files, or pickles for values that Arrow can't store
+    (see _write_artifact), in which case the suffix is .pickle instead.
+    """
+    return STAGE_CACHE_DIR / f"{name}-{key}.arrow"
+
+
+def artifact_exists(path: Path) -> bool:
+    return path.exists() or path.with_suffix(".pickle").exists()
+
+
+def marker_path(name: str, key: str) -> Path:
+    return STAGE_CACHE_DIR / f"{name}-{key}.done"
+
+
+def cached_key(stage: Stage) -> str:
+    """
+    Returns the key of the stage's cached artifacts (whatever the stage's current key is).
+    """
+    keys = set()
+    for output_name in stage.output_names():
+        paths = [
+            path
+            for path in STAGE_CACHE_DIR.glob(f"{output_name}-*")
+            if path.suffix in [".arrow", ".pickle"]
+        ]
+        if not paths:
+            raise ValueError(
+                f"Stage {stage.name} is reused from the cache, but there is no cached {output_name}. "
+                "Build it first (e.g. without --skip)."
+            )
+        keys.update(path.stem.rsplit("-", 1)[1] for path in paths)
+
+    if len(keys) != 1:
+        raise ValueError(
+            f"The cached artifacts of stage {stage.name} are from different runs: {sorted(keys)}"
+        )
+    return keys.pop()
+
+
+def _write_atomically(path: Path, write: Callable[[Path], None]) -> None:
+    # Remove the files from previous keys, so that the cache doesn't keep growing
+    for old_path in path.parent.glob(f"{path.name.rsplit('-', 1)[0]}-*"):
+        old_path.unlink()
+
+    tmp_path = path.with_suffix(".tmp")
+    write(tmp_path)
+    tmp_path.replace(path)
+
+
+def _write_artifact(value: Any, path: Path) -> None:
+    try:
+        table = pa.Table.from_pandas(value)
+    except (TypeError, pa.ArrowException):
+        # Not a DataFrame, or has a column that Arrow can't store (e.g. mixed ints and strings)
+        _write_atomically(
+            path.with_suffix(".pickle"),
+            lambda tmp_path: pd.to_pickle(value, tmp_path),
+        )
+        return
+
+    def write(tmp_path: Path) -> None:
+        # Uncompressed, so that readers can memory-map it
+        with pa.OSFile(str(tmp_path), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+    _write_atomically(path, write)
+
+
+def _arrow_dtype(arrow_type: pa.DataType) -> Optional[pd.ArrowDtype]:
+    # Leave these as object columns:
+    # - columns that are entirely null have the null type, which pandas can't do much with
+    #   (e.g. it can't be added to strings or grouped on),
+    # - pandas can't read list[pyarrow] columns back from the Parquet files we write
+    #   (the dtype name in the pandas metadata doesn't parse).
+    if pa.types.is_null(arrow_type) or pa.types.is_list(arrow_type):
+        return None
+    return pd.ArrowDtype(arrow_type)
+
+
+def _read_artifact(path: Path, dtype_backend: Optional[str] = None) -> Any:
+    """
+    :param dtype_backend: Same as the dtype_backend argument of pd.read_parquet. With "pyarrow",
+        the columns stay in Arrow memory (so strings aren't converted to Python objects), and
+        writing them back out is nearly zero-copy.
+    """
+    if not path.exists():
+        value = pd.read_pickle(path.with_suffix(".pickle"))
+        if dtype_backend is not None and isinstance(value, pd.DataFrame):
+            value = value.convert_dtypes(dtype_backend=dtype_backend)
+        return value
+
+    # Memory-map the file rather than reading it: the numeric columns are converted to
+    # pandas without copying, and pages that are no longer used can be dropped by the OS.
+    with pa.memory_map(str(path)) as source:
+        table = pa.ipc.open_file(source).read_all()
+
+    if dtype_backend == "pyarrow":
+        return table.to_pandas(types_mapper=_arrow_dtype)
+    df = table.to_pandas(split_blocks=True, self_destruct=True)
+    if dtype_backend is not None:
+        df = df.convert_dtypes(dtype_backend=dtype_backend)
+    return df
+
+
+def _run_stage(
+    stage: Stage,
+    input_paths: list[Path],
+    output_paths: list[Path],
+    marker: Optional[Path],
+    kwargs: dict[str, Any],
+    dtype_backend: Optional[str] = None,
+) -> None:
+    inputs = [_read_artifact(path, dtype_backend) for path in input_paths]
+    result = stage.func(*inputs, **kwargs)
+    # Free the inputs before writing the outputs
+    del inputs
+
+    results = result if len(output_paths) > 1 else (result,)
+    del result
+    for path, value in zip(output_paths, results):
+        _write_artifact(value, path)
+
+    if marker is not None:
+        _write_atomically(marker, lambda tmp_path: tmp_path.touch())
+
+
+def run_pipeline(
+    stages: list[Stage],
+    options: dict[str, Any],
+    targets: Optional[list[str]] = None,
+    max_workers: Optional[int] = None,
+    use_cache: bool = True,
+    dtype_backend: Optional[str] = None,
+    reuse_stages: Optional[list[str]] = None,
+) -> None:
+    """
+    Runs the stages needed to produce `targets` (stage names, defaults to all output stages),
+    skipping the ones whose artifacts are already cached.
+
+    :param stages: In dependency order: every input must be an output of an earlier stage.
+    :param options: The build options. Stages get the ones listed in their `options`.
+    :param max_workers: Number of processes to run stages in. If 1, stages run in this process,
+        one at a time (handy for debugging).
+    :param dtype_backend: "numpy_nullable" or "pyarrow" to read the stages' input frames with
+        nullable dtypes, or with Arrow-backed dtypes (string[pyarrow], int64[pyarrow], etc.).
+        Defaults to the NumPy dtypes (object for strings).
+    :param reuse_stages: Stages that never run: the stages that use their outputs get the cached
+        artifacts of their last run, even if they're out of date. Raises ValueError if there are none.
+    """
+    STAGE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    reuse_stages = reuse_stages or []
+
+    stages_by_name = {stage.name: stage for stage in stages}
+    producers: dict[str, Stage] = {}
+    keys: dict[str, str] = {}
+    for stage in stages:
+        for input_name in stage.inputs:
+            if input_name not in producers:
+                raise ValueError(
+                    f"Input {input_name} of stage {stage.name} isn't produced by an earlier stage"
+                )
+        if stage.name in reuse_stages:
+            keys[stage.name] = cached_key(stage)
+        else:
+            keys[stage.name] = stage_key(
+                stage,
+                options,
+                [keys[producers[input_name].name] for input_name in stage.inputs],
+                dtype_backend,
+            )
+        for output_name in stage.output_names():
+            producers[output_name] = stage
+
+    def is_cached(stage: Stage) -> bool:
+        key = keys[stage.name]
+        if stage.output:
+            return marker_path(stage.name, key).exists() and all(
+                path.exists() for path in stage.files
+            )
+        return all(
+            artifact_exists(artifact_path(output_name, key))
+            for output_name in stage.output_names()
+        )
+
+    # Only run what's needed for the targets, and isn't cached
+    to_run: list[Stage] = []
+    visited: set[str] = set()
+
+    def require(stage: Stage) -> None:
+        if stage.name in visited:
+            return
+        visited.add(stage.name)
+
+        if stage.name in reuse_stages or (use_cache and is_cached(stage)):
+            return
+        for input_name in stage.inputs:
+            require(producers[input_name])
+        to_run.append(stage)
+
+    if targets is None:
+        targets = [stage.name for stage in stages if stage.output]
+    for target in targets:
+        require(stages_by_name[target])
+
+    cached = sorted(visited - {stage.name for stage in to_run})
+    print(f"Cached stages: {', '.join(cached) or 'none'}")
+    print(f"Stages to run: {', '.join(stage.name for stage in to_run) or 'none'}")
+
+    def run_args(stage: Stage) -> tuple[Any, ...]:
+        key = keys[stage.name]
+        return (
+            stage,
+            [
+                artifact_path(input_name, keys[producers[input_name].name])
+                for input_name in stage.inputs
+            ],
+            [artifact_path(output_name, key) for output_name in stage.output_names()],
+            marker_path(stage.name, key) if stage.output else None,
+            {name: options[name] for name in stage.options},
+            dtype_backend,
+        )
+
+    if max_workers == 1:
+        for stage in sorted(to_run, key=stages.index):
+            start = time.perf_counter()
+            _run_stage(*run_args(stage))
+            print(f"Stage {stage.name} done in {time.perf_counter() - start:.1f}s")
+        return
+
+    remaining = sorted(to_run, key=stages.index)
+    unfinished = {stage.name for stage in to_run}
+    running: dict[Future, tuple[Stage, float]] = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        while remaining or running:
+            for stage in list(remaining):
+                if all(
+                    producers[input_name].name not in unfinished
+                    for input_name in stage.inputs
+                ):
+                    remaining.remove(stage)
+                    future = executor.submit(_run_stage, *run_args(stage))
+                    running[future] = (stage, time.perf_counter())
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stage, start = running.pop(future)
+                future.result()  # Raise the stage's exception, if any
+                unfinished.remove(stage.name)
+                print(f"Stage {stage.name} done in {time.perf_counter() - start:.1f}s")
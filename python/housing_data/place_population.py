@@ -5,13 +5,38 @@ from typing import Optional
 import numpy as np
 import pandas as pd
 from housing_data.build_data_utils import (
+    PLACE_POPULATION_DIR,
+    RAW_DATA_DIR,
     check_population_present_for_all_years,
     impute_2025_and_2026_population,
 )
 
+# The files in PLACE_POPULATION_DIR. (The 1980 populations are in raw_data/ in this repo.)
+PLACES_CROSSWALK_FILE = "us_places.txt"
+PLACES_1990S_FILE = "sc2000f_us.txt"
+PLACES_2000S_FILE = "sub-est00int.csv"
+PLACES_2010S_FILE = "SUB-EST2020_ALL.csv"
+PLACES_2020S_FILE = "sub-est2024.csv"
+
+
+def get_input_paths() -> list[Path]:
+    """
+    Returns the paths (relative to the data repo) of the files read by get_place_population_estimates.
+    """
+    return [
+        PLACE_POPULATION_DIR / file_name
+        for file_name in [
+            PLACES_CROSSWALK_FILE,
+            PLACES_1990S_FILE,
+            PLACES_2000S_FILE,
+            PLACES_2010S_FILE,
+            PLACES_2020S_FILE,
+        ]
+    ]
+
 
 def _get_places_crosswalk_df(data_path: Path) -> pd.DataFrame:
-    df = pd.read_fwf(data_path / "us_places.txt")
+    df = pd.read_fwf(data_path / PLACES_CROSSWALK_FILE)
 
     df["State Code"] = df["CENSUS"] // 10000
     df["Place Code"] = df["CENSUS"] % 10000
@@ -35,7 +60,9 @@ def get_unincorporated_places_populations_1980() -> pd.DataFrame:
     31 states that are present.
     """
     # TODO download programmatically, add header=1
-    counties_df = pd.read_csv("../raw_data/nhgis0015_ds104_1980_county.csv", header=1)
+    counties_df = pd.read_csv(
+        RAW_DATA_DIR / "nhgis0015_ds104_1980_county.csv", header=1
+    )
     counties_df = counties_df.rename(columns={"Total": "County Total"})[
         ["County Total", "County Code", "State Code", "County Name"]
     ]
@@ -44,7 +71,9 @@ def get_unincorporated_places_populations_1980() -> pd.DataFrame:
     )
     counties_df = counties_df.drop(columns=["County Name"])
 
-    places_df = pd.read_csv("../raw_data/nhgis0015_ds104_1980_place_070.csv", header=1)
+    places_df = pd.read_csv(
+        RAW_DATA_DIR / "nhgis0015_ds104_1980_place_070.csv", header=1
+    )
 
     # We can't simply add up the CDPs and "REMAINDER OF <county subdivision name>" rows and
     # assume that that equals the total unincorporated population... because it empirically
@@ -80,7 +109,7 @@ def get_unincorporated_places_populations_1980() -> pd.DataFrame:
 def get_place_populations_1980(data_path: Path) -> pd.DataFrame:
     # Assuming this is run from `python/`
     # For the header row, use the nice descriptive names that IPUMS provides rather than the code names
-    df = pd.read_csv("../raw_data/nhgis0015_ds104_1980_place_070.csv", header=1)
+    df = pd.read_csv(RAW_DATA_DIR / "nhgis0015_ds104_1980_place_070.csv", header=1)
 
     df = df[
         [
@@ -146,7 +175,7 @@ def get_place_populations_1980(data_path: Path) -> pd.DataFrame:
 
 
 def _load_raw_place_populations_1990s(data_path: Path) -> pd.DataFrame:
-    tables = (data_path / "sc2000f_us.txt").read_text().split("\f")
+    tables = (data_path / PLACES_1990S_FILE).read_text().split("\f")
 
     common_cols = [
         "Block",
@@ -391,7 +420,7 @@ def _melt_df(
 
 
 def get_place_populations_2000s(data_path: Path) -> pd.DataFrame:
-    df = pd.read_csv(data_path / "sub-est00int.csv", encoding="latin_1")
+    df = pd.read_csv(data_path / PLACES_2000S_FILE, encoding="latin_1")
     return _melt_df(
         df,
         years=list(range(2000, 2011)),
@@ -401,13 +430,13 @@ def get_place_populations_2000s(data_path: Path) -> pd.DataFrame:
 
 
 def get_place_populations_2010s(data_path: Path) -> pd.DataFrame:
-    df = pd.read_csv(data_path / "SUB-EST2020_ALL.csv", encoding="latin_1")
+    df = pd.read_csv(data_path / PLACES_2010S_FILE, encoding="latin_1")
 
     return _melt_df(df, years=list(range(2010, 2021)))
 
 
 def get_place_populations_2020s(data_path: Path) -> pd.DataFrame:
-    df = pd.read_csv(data_path / "sub-est2024.csv", encoding="latin_1")
+    df = pd.read_csv(data_path / PLACES_2020S_FILE, encoding="latin_1")
     df = _melt_df(df, years=list(range(2020, 2025)))
     df = impute_2025_and_2026_population(df)
     return df
@@ -0,0 +1,184 @@
+"""
+Ranks the geographies of each level (places, counties, metros, states) by a few metrics, in each year,
+so that the site can show leaderboards without loading the whole {geography}_annual.parquet:
+
+- public/{geography}_rankings/{year}/{metric}.json has the top TOP_N geographies in the US,
+  and (for places and counties) the top TOP_N in each state.
+- public/{geography}_rankings/{year}/ranks.json has the rank of every geography, keyed by its path:
+  "{metric}_rank" (1 = highest in the US that year) and "{metric}_percentile" (the share of the
+  year's geographies with a value at most as high) for each of RANKING_METRICS, and (for places
+  and counties) "{metric}_state_rank" and "{metric}_state_percentile", within its state.
+  (They're in their own file rather than in the JSON files and {geography}_annual.parquet,
+  which they would about double.)
+
+Per capita metrics only rank the geographies with at least MIN_PER_CAPITA_RANK_POPULATION people,
+since in tiny places a handful of permits is a huge number per capita.
+"""
+
+import json
+import shutil
+from pathlib import Path
+
+import pandas as pd
+from housing_data.build_data_utils import (
+    SUFFIXES,
+    DataSource,
+    get_numerical_columns,
+)
+
+# The totals, and the units of each unit type (e.g. 5_plus_units_units)
+_BASE_RANKING_METRICS = [f"total{suffix}" for suffix in SUFFIXES[DataSource.BPS]] + [
+    col for col in get_numerical_columns(DataSource.BPS) if col.endswith("_units")
+]
+RANKING_METRICS = _BASE_RANKING_METRICS + [
+    f"{metric}_per_capita" for metric in _BASE_RANKING_METRICS
+]
+
+TOP_N = 50
+
+MIN_PER_CAPITA_RANK_POPULATION = 10_000
+
+PERCENTILE_DECIMALS = 4
+
+
+def _get_ranking_values(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns the RANKING_METRICS of df's rows, with the per capita metrics of the rows under
+    the population threshold set to null. (Computes the per capita metrics if they're missing,
+    e.g. with --lazy-per-capita.)
+    """
+    population = df["population"].astype(float)
+    values = {}
+    for metric in RANKING_METRICS:
+        if metric.endswith("_per_capita"):
+            base_metric = metric.removesuffix("_per_capita")
+            per_capita = (
+                df[metric] if metric in df.columns else df[base_metric] / population
+            )
+            values[metric] = per_capita.astype(float).where(
+                population >= MIN_PER_CAPITA_RANK_POPULATION
+            )
+        else:
+            values[metric] = df[metric].astype(float)
+    return pd.DataFrame(values, index=df.index)
+
+
+def _get_rank_columns(
+    df: pd.DataFrame, values_df: pd.DataFrame, group_columns: list[str], prefix: str
+) -> dict[str, pd.Series]:
+    groups = values_df.groupby([df[col] for col in group_columns])
+    ranks = groups.rank(method="min", ascending=False)
+    percentiles = groups.rank(method="max", pct=True)
+
+    columns = {}
+    for metric in RANKING_METRICS:
+        columns[f"{metric}_{prefix}rank"] = ranks[metric].astype("Int64")
+        columns[f"{metric}_{prefix}percentile"] = percentiles[metric]
+    return columns
+
+
+def get_rank_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns the "{metric}_rank" and "{metric}_percentile" columns of RANKING_METRICS for the rows of df,
+    and for geographies within states (i.e. that have a path_1), "{metric}_state_rank" and
+    "{metric}_state_percentile".
+    """
+    values_df = _get_ranking_values(df)
+    columns = _get_rank_columns(df, values_df, ["year"], "")
+    if df["path_1"].notnull().any():
+        columns |= _get_rank_columns(df, values_df, ["year", "path_1"], "state_")
+    return pd.DataFrame(columns, index=df.index)
+
+
+def _get_ranks_table(year_df: pd.DataFrame, ranks_df: pd.DataFrame) -> dict:
+    """
+    Returns the ranks.json of a year: {"columns": [...], "ranks": {path: [value of each column], ...}}.
+    """
+    # Rows with the same path are in the same JSON file, so keep the first one, like the list file
+    is_first = ~year_df["path"].duplicated()
+    ranks_df = ranks_df[is_first].round(PERCENTILE_DECIMALS).astype(object)
+    rows = ranks_df.where(ranks_df.notnull(), None).to_numpy().tolist()
+    return {
+        "columns": list(ranks_df.columns),
+        "ranks": dict(zip(year_df.loc[is_first, "path"], rows)),
+    }
+
+
+def _top_rows(values_df: pd.DataFrame, group_columns: list[str]) -> pd.DataFrame:
+    """
+    Returns the rows of the long values_df (with the columns metric and value) that are in the top
+    TOP_N of their group_columns, with their rank.
+    """
+    values_df = values_df.assign(
+        rank=values_df.groupby(group_columns)["value"].rank(
+            method="min", ascending=False
+        )
+    )
+    top_df = values_df[values_df["rank"] <= TOP_N].astype({"rank": int})
+    return top_df.sort_values(group_columns + ["rank", "name"])
+
+
+def write_ranking_tables(df: pd.DataFrame, directory_path: Path) -> None:
+    """
+    Writes {directory_path}/{year}/{metric}.json files, which have the form
+    {"national": [{"name": ..., "path": ..., "value": ..., "rank": ...}, ...], "by_state": {"CA": [...], ...}}
+    ("by_state" only for geographies within states, i.e. that have a path_1),
+    and the {directory_path}/{year}/ranks.json files (see _get_ranks_table).
+    """
+    # Same as the "path" of the list file
+    paths = (df["path_1"] + "/").fillna("") + df["path_2"]
+    ranks_df = get_rank_columns(df)
+
+    values_df = (
+        pd.concat(
+            [
+                df[["name", "path_1", "path_2", "year"]],
+                _get_ranking_values(df),
+            ],
+            axis=1,
+        )
+        .melt(
+            id_vars=["name", "path_1", "path_2", "year"],
+            var_name="metric",
+            value_name="value",
+        )
+        .dropna(subset=["value"])
+    )
+    values_df["path"] = (values_df["path_1"] + "/").fillna("") + values_df["path_2"]
+
+    output_columns = ["name", "path", "value", "rank"]
+    national_df = _top_rows(values_df, ["year", "metric"])
+    has_states = values_df["path_1"].notnull().any()
+    state_groups = dict(
+        list(
+            _top_rows(
+                values_df[values_df["path_1"].notnull()], ["year", "metric", "path_1"]
+            ).groupby(["year", "metric"])
+        )
+    )
+
+    if directory_path.exists():
+        shutil.rmtree(directory_path)
+
+    for (year, metric), group in national_df.groupby(["year", "metric"]):
+        table = {"national": group[output_columns].to_dict(orient="records")}
+        if has_states:
+            table["by_state"] = {
+                state: state_rows[output_columns].to_dict(orient="records")
+                for state, state_rows in (
+                    state_groups[(year, metric)].groupby("path_1")
+                    if (year, metric) in state_groups
+                    else []
+                )
+            }
+
+        year_path = directory_path / str(year)
+        year_path.mkdir(parents=True, exist_ok=True)
+        (year_path / f"{metric}.json").write_text(json.dumps(table))
+
+    for year, year_df in df[["year"]].assign(path=paths).groupby("year"):
+        year_path = directory_path / str(year)
+        year_path.mkdir(parents=True, exist_ok=True)
+        (year_path / "ranks.json").write_text(
+            json.dumps(_get_ranks_table(year_df, ranks_df.loc[year_df.index]))
+        )
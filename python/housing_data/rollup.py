@@ -0,0 +1,71 @@
+"""
+Aggregates a table to several levels of a geography hierarchy at once (like SQL's GROUPING SETS),
+e.g. Canadian places to census divisions, metros and provinces, or counties to MSAs and CSAs.
+
+The table is first aggregated once to the finest grain that every level can be derived from
+(the union of all the levels' keys), and each level is then computed from that much smaller frame,
+instead of grouping the full table once per level.
+"""
+
+import pandas as pd
+
+# How to combine the partial aggregates of the finest grain into a coarser level
+REAGGREGATE_FUNCTIONS = {
+    "sum": "sum",
+    "count": "sum",
+    "max": "max",
+    "min": "min",
+}
+
+
+def sum_aggregations(columns: list[str]) -> dict[str, tuple[str, str]]:
+    return {col: (col, "sum") for col in columns}
+
+
+def rollup(
+    df: pd.DataFrame,
+    levels: dict[str, list[str]],
+    aggregations: dict[str, tuple[str, str]],
+) -> dict[str, pd.DataFrame]:
+    """
+    Returns a dict mapping each level name to a DataFrame with the level's keys (in order)
+    followed by the aggregated columns, sorted by the keys.
+    Same as `df.groupby(keys).agg(**aggregations).reset_index()` for each level: in particular,
+    rows with a null in any of a level's keys are left out of that level.
+
+    :param levels: Maps level name to the columns to group by,
+        e.g. {"msa": ["msa_name", "year"], "csa": ["csa_name", "year"]}.
+    :param aggregations: Maps output column to (input column, aggfunc),
+        where aggfunc is one of the keys of REAGGREGATE_FUNCTIONS.
+    """
+    for output_col, (_, aggfunc) in aggregations.items():
+        if aggfunc not in REAGGREGATE_FUNCTIONS:
+            raise ValueError(f"Can't roll up {output_col} with aggfunc {aggfunc}")
+
+    base_keys = list(dict.fromkeys(key for keys in levels.values() for key in keys))
+
+    # Keep null keys here, since a key that is null for one level may be used by another
+    base_df = (
+        df.groupby(base_keys, dropna=False, sort=False)
+        .agg(
+            **{
+                output_col: pd.NamedAgg(column=col, aggfunc=aggfunc)
+                for output_col, (col, aggfunc) in aggregations.items()
+            }
+        )
+        .reset_index()
+    )
+
+    return {
+        name: base_df.groupby(keys)
+        .agg(
+            **{
+                output_col: pd.NamedAgg(
+                    column=output_col, aggfunc=REAGGREGATE_FUNCTIONS[aggfunc]
+                )
+                for output_col, (_, aggfunc) in aggregations.items()
+            }
+        )
+        .reset_index()
+        for name, keys in levels.items()
+    }
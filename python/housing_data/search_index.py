@@ -0,0 +1,129 @@
+"""
+Builds a sharded prefix index over the rows of a {geography}_list.json file.
+
+Each shard is keyed on the first couple of characters of a normalized word from the
+name or alt_name, and contains the list rows (same schema as the list file) ordered
+by population descending. This lets the search box fetch one small shard for the
+typed prefix instead of downloading the full places_list.json up front
+(see lib/placesSearch.ts).
+
+Shards with more than MAX_SHARD_ROWS rows (e.g. "sa", with all the San ... and Santa ...)
+are split into shards with one more character ("san", "sat", ...), up to MAX_SHARD_PREFIX_LENGTH.
+The shard that was split only keeps its MAX_SHARD_ROWS most populous rows (plus the rows
+with a word that is exactly the prefix), which is enough to show while the user types the
+next character. index.json maps every shard to whether it is complete (i.e. wasn't split).
+"""
+
+import json
+import shutil
+from pathlib import Path
+
+import pandas as pd
+
+SHARD_PREFIX_LENGTH = 2
+MAX_SHARD_PREFIX_LENGTH = 6
+MAX_SHARD_ROWS = 500
+
+# Number of rows in top.json, which can be shown before the user has typed enough
+# characters to pick a shard.
+TOP_N = 100
+
+
+def normalize_names(names: pd.Series) -> pd.Series:
+    """
+    Lowercases, strips accents (e.g. "Montréal" -> "montreal") and replaces punctuation with spaces,
+    so that the index can be split into words.
+    """
+    return (
+        # .str.encode isn't implemented for Arrow-backed strings
+        names.astype(object)
+        .fillna("")
+        .str.normalize("NFKD")
+        .str.encode("ascii", errors="ignore")
+        .str.decode("ascii")
+        .str.lower()
+        .str.replace(r"[^a-z0-9]+", " ", regex=True)
+        .str.strip()
+    )
+
+
+def get_shard_words(list_df: pd.DataFrame) -> pd.Series:
+    """
+    Returns a Series of the normalized words of each row's name and alt_name, indexed by the position
+    of the row in list_df. A row may have the same word more than once.
+    """
+    # Leave out the ", CA" suffix, otherwise every California place would end up in the "ca" shard
+    place_names = list_df["name"].str.replace(r"^(.*), .*$", r"\1", regex=True)
+
+    return (
+        pd.concat([normalize_names(place_names), normalize_names(list_df["alt_name"])])
+        .str.split()
+        .explode()
+        .dropna()
+    )
+
+
+def get_shards(list_df: pd.DataFrame) -> dict[str, tuple[pd.Series, bool]]:
+    """
+    Returns a dict mapping each shard key to the positions of its rows in list_df (in the order of
+    list_df), and whether the shard is complete.
+    """
+    words_df = (
+        get_shard_words(list_df)
+        .rename("word")
+        .rename_axis("row")
+        .reset_index()
+        .drop_duplicates()
+    )
+
+    shards = {}
+    for prefix_length in range(SHARD_PREFIX_LENGTH, MAX_SHARD_PREFIX_LENGTH + 1):
+        words_df = words_df.assign(shard=words_df["word"].str[:prefix_length])
+        split_shards = set()
+        for shard, group in words_df.groupby("shard"):
+            rows = group["row"].drop_duplicates().sort_values()
+            if len(rows) > MAX_SHARD_ROWS and prefix_length < MAX_SHARD_PREFIX_LENGTH:
+                split_shards.add(shard)
+                exact_rows = group.loc[group["word"].str.len() <= prefix_length, "row"]
+                rows = (
+                    pd.concat([rows.head(MAX_SHARD_ROWS), exact_rows])
+                    .drop_duplicates()
+                    .sort_values()
+                )
+            shards[shard] = (rows, shard not in split_shards)
+
+        # Only the words of the split shards go on to the next prefix length
+        words_df = words_df[
+            words_df["shard"].isin(split_shards)
+            & (words_df["word"].str.len() > prefix_length)
+        ]
+        if words_df.empty:
+            break
+
+    return shards
+
+
+def write_search_index(list_df: pd.DataFrame, output_path: Path) -> None:
+    """
+    Writes {output_path}/{shard}.json for every shard, {output_path}/index.json, and
+    {output_path}/top.json with the most populous rows.
+
+    :param list_df: The rows written to the {geography}_list.json file (as returned by write_json_outputs).
+    """
+    if output_path.exists():
+        shutil.rmtree(output_path)
+    output_path.mkdir()
+
+    # Rows are in descending population order, so the shards' rows (in list_df order) are ranked
+    list_df = list_df.sort_values(
+        "population", ascending=False, kind="stable"
+    ).reset_index(drop=True)
+
+    shards = get_shards(list_df)
+    for shard, (rows, _) in shards.items():
+        list_df.loc[rows].to_json(output_path / f"{shard}.json", orient="records")
+
+    (output_path / "index.json").write_text(
+        json.dumps({shard: complete for shard, (_, complete) in sorted(shards.items())})
+    )
+    list_df.head(TOP_N).to_json(output_path / "top.json", orient="records")
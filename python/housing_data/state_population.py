@@ -4,9 +4,39 @@ from pathlib import Path
 import pandas as pd
 import us
 from housing_data.build_data_utils import (
+    STATE_POPULATION_DIR,
     check_population_present_for_all_years,
     impute_2025_and_2026_population,
 )
+from housing_data.file_cache import read_excel_cached
+
+# The files in STATE_POPULATION_DIR, by decade
+STATES_1980S_FILE = "st8090ts.txt"
+STATES_1990S_YEARS = range(1990, 2000)
+STATES_2000S_FILE = "st-est00int-01.xls"
+STATES_2010S_FILE = "nst-est2020-alldata.csv"
+STATES_2020S_FILE = "NST-EST2024-ALLDATA.csv"
+
+
+def get_states_1990s_file(year: int) -> str:
+    return f"stch-icen{year}.txt"
+
+
+def get_input_paths() -> list[Path]:
+    """
+    Returns the paths (relative to the data repo) of the files read by get_state_population_estimates.
+    """
+    return [
+        STATE_POPULATION_DIR / file_name
+        for file_name in [
+            STATES_1980S_FILE,
+            *[get_states_1990s_file(year) for year in STATES_1990S_YEARS],
+            STATES_2000S_FILE,
+            STATES_2010S_FILE,
+            STATES_2020S_FILE,
+        ]
+    ]
+
 
 DIVISIONS = {
     "New England": [
@@ -77,7 +107,7 @@ def _line_to_cols(row: str) -> list[str]:
 
 
 def get_state_populations_1980s(data_path: Path) -> pd.DataFrame:
-    states_80s_text = (data_path / "st8090ts.txt").read_text()
+    states_80s_text = (data_path / STATES_1980S_FILE).read_text()
     handle = StringIO(states_80s_text)
 
     for _ in range(10):
@@ -112,10 +142,10 @@ def get_state_populations_1980s(data_path: Path) -> pd.DataFrame:
 
 
 def _get_counties_population_table_1990s(year: int, data_path: Path) -> pd.DataFrame:
-    assert 1990 <= year <= 1999
+    assert year in STATES_1990S_YEARS
 
     df = pd.read_csv(
-        data_path / f"stch-icen{year}.txt",
+        data_path / get_states_1990s_file(year),
         delim_whitespace=True,
         names=[
             "year",
@@ -145,7 +175,7 @@ def get_state_populations_1990s(data_path: Path) -> pd.DataFrame:
     df = pd.concat(
         [
             _get_counties_population_table_1990s(year, data_path)
-            for year in range(1990, 2000)
+            for year in STATES_1990S_YEARS
         ]
     )
 
@@ -166,8 +196,8 @@ def get_state_populations_1990s(data_path: Path) -> pd.DataFrame:
 
 
 def get_state_populations_2000s(data_path: Path) -> pd.DataFrame:
-    df = pd.read_excel(
-        data_path / "st-est00int-01.xls",
+    df = read_excel_cached(
+        data_path / STATES_2000S_FILE,
         skiprows=3,
         skipfooter=8,
     )
@@ -202,13 +232,13 @@ def _melt_df(df: pd.DataFrame, years: list[int]) -> pd.DataFrame:
 
 
 def get_state_populations_2010s(data_path: Path) -> pd.DataFrame:
-    df = pd.read_csv(data_path / "nst-est2020-alldata.csv")
+    df = pd.read_csv(data_path / STATES_2010S_FILE)
 
     return _melt_df(df, list(range(2010, 2020)))
 
 
 def get_state_populations_2020s(data_path: Path) -> pd.DataFrame:
-    df = pd.read_csv(data_path / "NST-EST2024-ALLDATA.csv")
+    df = pd.read_csv(data_path / STATES_2020S_FILE)
 
     df = _melt_df(df, list(range(2020, 2025)))
     return impute_2025_and_2026_population(df)
@@ -0,0 +1,187 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from housing_data.build_data_utils import (
+    DataSource,
+    get_numerical_columns,
+    write_json_outputs,
+)
+
+# The output of the old write_list_json and write_to_json_directory (on the concatenated frames,
+# without county_names in the JSON files) for the metros of test_write_json_outputs_metros
+EXPECTED_LIST = [
+    {
+        "name": "Abbotsford CMA, BC",
+        "alt_name": None,
+        "metro_type": "cma",
+        "county_names": [],
+        "path": "Abbotsford_BC",
+        "year": "2024",
+        "population": 750,
+        "has_ca_hcd_data": False,
+    },
+    {
+        "name": "Bay Area, CA CSA",
+        "alt_name": None,
+        "metro_type": "csa",
+        "county_names": ["Alameda County, CA"],
+        "path": "Bay_Area_CA",
+        "year": "2024",
+        "population": 1000,
+        "has_ca_hcd_data": True,
+    },
+    {
+        "name": "Denver, CO MSA",
+        "alt_name": None,
+        "metro_type": "msa",
+        "county_names": ["Adams County, CO"],
+        "path": "Denver_CO",
+        "year": "2024",
+        "population": 0,
+        "has_ca_hcd_data": False,
+    },
+]
+
+EXPECTED_JSON_FILES = {
+    "Bay_Area_CA.json": [
+        {
+            "name": "Bay Area, CA CSA",
+            "path_1": None,
+            "path_2": "Bay_Area_CA",
+            "alt_name": None,
+            "metro_type": "csa",
+            "year": "2024",
+            "total_units": 300.0,
+            "total_units_hcd": 310.0,
+            "population": 1000.0,
+            "has_ca_hcd_data": True,
+        },
+        {
+            "name": "Bay Area, CA CSA",
+            "path_1": None,
+            "path_2": "Bay_Area_CA",
+            "alt_name": None,
+            "metro_type": "csa",
+            "year": "2023",
+            "total_units": 200.0,
+            "total_units_hcd": None,
+            "population": 900.0,
+            "has_ca_hcd_data": False,
+        },
+    ],
+    # The Canada rows have the union of the columns, and no CA HCD columns
+    "Abbotsford_BC.json": [
+        {
+            "name": "Abbotsford CMA, BC",
+            "path_1": None,
+            "path_2": "Abbotsford_BC",
+            "alt_name": None,
+            "metro_type": "cma",
+            "year": "2023",
+            "total_units": 80.0,
+            "population": 700.0,
+            "has_ca_hcd_data": None,
+        },
+        {
+            "name": "Abbotsford CMA, BC",
+            "path_1": None,
+            "path_2": "Abbotsford_BC",
+            "alt_name": None,
+            "metro_type": "cma",
+            "year": "2024",
+            "total_units": 90.0,
+            "population": 750.0,
+            "has_ca_hcd_data": None,
+        },
+    ],
+    "Denver_CO.json": [
+        {
+            "name": "Denver, CO MSA",
+            "path_1": None,
+            "path_2": "Denver_CO",
+            "alt_name": None,
+            "metro_type": "msa",
+            "year": "2023",
+            "total_units": 50.0,
+            "population": 500.0,
+            "has_ca_hcd_data": False,
+        },
+        {
+            "name": "Denver, CO MSA",
+            "path_1": None,
+            "path_2": "Denver_CO",
+            "alt_name": None,
+            "metro_type": "msa",
+            "year": "2024",
+            "total_units": 70.0,
+            "population": None,
+            "has_ca_hcd_data": False,
+        },
+    ],
+}
+
+
+def _to_json(rows: list[dict]) -> str:
+    # Same format as DataFrame.to_json
+    return json.dumps(rows, separators=(",", ":"))
+
+
+def test_write_json_outputs_metros(tmp_path: Path) -> None:
+    # The metros are in the same order by each of the columns that the list file is sorted by,
+    # since the order of those columns isn't fixed (see write_json_outputs)
+    us_df = pd.DataFrame(
+        {
+            "name": ["Bay Area, CA CSA"] * 2 + ["Denver, CO MSA"] * 2,
+            "path_1": None,
+            "path_2": ["Bay_Area_CA"] * 2 + ["Denver_CO"] * 2,
+            "alt_name": None,
+            "metro_type": ["csa", "csa", "msa", "msa"],
+            # The list file has the county names of the first row
+            "county_names": [
+                ["Alameda County, CA"],
+                ["Alameda County, CA", "Marin County, CA"],
+                ["Adams County, CO"],
+                ["Adams County, CO"],
+            ],
+            "year": ["2024", "2023", "2023", "2024"],
+            "total_units": [300.0, 200.0, 50.0, 70.0],
+            "total_units_hcd": [310.0, np.nan, np.nan, np.nan],
+            "population": [1000.0, 900.0, 500.0, np.nan],
+            "has_ca_hcd_data": [True, False, False, False],
+        }
+    )
+    for col in get_numerical_columns(
+        DataSource.CA_HCD, totals=True, projected=True, per_capitas=True
+    ):
+        if col not in us_df.columns:
+            us_df[col] = np.nan
+    canada_df = pd.DataFrame(
+        {
+            "name": ["Abbotsford CMA, BC"] * 2,
+            "path_1": None,
+            "path_2": ["Abbotsford_BC"] * 2,
+            "alt_name": None,
+            "metro_type": "cma",
+            "county_names": [[], []],
+            "year": ["2023", "2024"],
+            "total_units": [80.0, 90.0],
+            "population": [700.0, 750.0],
+        }
+    )
+
+    write_json_outputs(
+        [us_df, canada_df],
+        tmp_path / "metros_list.json",
+        tmp_path / "metros_data",
+        unhashable_columns=["county_names"],
+        extra_columns=["metro_type", "county_names"],
+        detail_drop_columns=["county_names"],
+    )
+
+    # Byte for byte, so that the order of the columns is the same too
+    assert (tmp_path / "metros_list.json").read_text() == _to_json(EXPECTED_LIST)
+    assert {
+        path.name: path.read_text() for path in (tmp_path / "metros_data").iterdir()
+    } == {name: _to_json(rows) for name, rows in EXPECTED_JSON_FILES.items()}
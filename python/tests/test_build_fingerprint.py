@@ -0,0 +1,37 @@
+from pathlib import Path
+
+import pytest
+from housing_data import build_fingerprint
+from housing_data.build_fingerprint import restore_build_outputs, save_build_outputs
+
+
+def test_save_and_restore_only_outputs(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    public_dir = tmp_path / "public"
+    monkeypatch.setattr(build_fingerprint, "PUBLIC_DIR", public_dir)
+    (public_dir / "places_data" / "CA").mkdir(parents=True)
+    (public_dir / "places_data" / "CA" / "Oakland.json").write_text("old")
+    (public_dir / "places_list.json").write_text("old")
+    (public_dir / "site.webmanifest").write_text("old")
+    output_paths = [
+        public_dir / "places_data",
+        public_dir / "places_list.json",
+        public_dir / "places_annual.parquet",
+    ]
+
+    cache_dir = tmp_path / "build_cache"
+    save_build_outputs(cache_dir, "abc", output_paths)
+    assert not (cache_dir / "public" / "site.webmanifest").exists()
+
+    (public_dir / "places_data" / "CA" / "Oakland.json").write_text("new")
+    (public_dir / "places_data" / "CA" / "Berkeley.json").write_text("new")
+    (public_dir / "site.webmanifest").write_text("new")
+
+    assert not restore_build_outputs(cache_dir, "def", output_paths)
+    assert restore_build_outputs(cache_dir, "abc", output_paths)
+    assert (public_dir / "places_data" / "CA" / "Oakland.json").read_text() == "old"
+    assert not (public_dir / "places_data" / "CA" / "Berkeley.json").exists()
+    assert (public_dir / "places_list.json").read_text() == "old"
+    # Not an output, so not overwritten
+    assert (public_dir / "site.webmanifest").read_text() == "new"
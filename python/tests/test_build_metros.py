@@ -0,0 +1,55 @@
+import pandas as pd
+from housing_data.build_metros import get_metro_membership
+
+
+def test_get_metro_membership() -> None:
+    crosswalk_df = pd.DataFrame(
+        {
+            "fips_state": [6, 6, 6, 6],
+            "fips_county": [75, 1, 13, 85],
+            "csa_name": ["Bay Area, CA"] * 3 + [None],
+            "msa_name": ["SF, CA", "SF, CA", "SF, CA", "San Jose, CA"],
+        }
+    ).astype({"fips_state": "Int64", "fips_county": "Int64"})
+    # Contra Costa County (13) is only observed in 2001, and Santa Clara County (85) never
+    counties_df = pd.DataFrame(
+        {
+            "fips_state": [6, 6, 6, 6, 6],
+            "fips_county": [1, 1, 75, 75, 13],
+            "year": ["2000", "2001", "2000", "2001", "2001"],
+            "name": [
+                "Alameda County, CA",
+                "Alameda County, CA",
+                "San Francisco County, CA",
+                "San Francisco County, CA",
+                "Contra Costa County, CA",
+            ],
+        }
+    ).astype({"fips_state": "Int64", "fips_county": "Int64"})
+
+    membership_df = get_metro_membership(crosswalk_df, counties_df)
+
+    # The counties observed in each year, in crosswalk order
+    expected_df = pd.DataFrame(
+        {
+            "metro_type": ["csa", "csa", "msa", "msa"],
+            "metro_name": ["Bay Area, CA", "Bay Area, CA", "SF, CA", "SF, CA"],
+            "year": ["2000", "2001", "2000", "2001"],
+            "county_names": [
+                ["San Francisco County, CA", "Alameda County, CA"],
+                [
+                    "San Francisco County, CA",
+                    "Alameda County, CA",
+                    "Contra Costa County, CA",
+                ],
+                ["San Francisco County, CA", "Alameda County, CA"],
+                [
+                    "San Francisco County, CA",
+                    "Alameda County, CA",
+                    "Contra Costa County, CA",
+                ],
+            ],
+            "num_counties": [3, 3, 3, 3],
+        }
+    )
+    pd.testing.assert_frame_equal(membership_df, expected_df)
@@ -0,0 +1,72 @@
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+import pytest
+from housing_data import building_permits_survey as bps
+from housing_data.build_places import get_name_spelling
+
+UNIT_TYPES = ["1-unit", "2-units", "3-4 units", "5+ units"]
+
+
+def make_place_file() -> str:
+    """
+    A BPS place file, with the quirks of the real ones: a two-row header, blank number fields,
+    a survey date ending in \\x1a, and a zip code with a space.
+    """
+    header_0 = (
+        "Survey,State,6-Digit,County,Census Place,FIPS Place,FIPS MCD,Pop,CSA,CBSA,Footnote,Central,Zip,"
+        "Region,Division,Number of,Place"
+    )
+    header_1 = "Date,Code,ID,Code,Code,Code,Code,,Code,Code,Code,City,Code,Code,Code,Months Rep,Name"
+    for unit_type in UNIT_TYPES + [f"{unit_type} rep" for unit_type in UNIT_TYPES]:
+        header_0 += f",,{unit_type},"
+        header_1 += ",Bldgs,Units,Value"
+    rows = [
+        "2019\x1a,06,123456,001,  ,53000,   ,400000,488,41860, ,C,94612 123,4,9,12,Oakland city",
+        "2019,06,123457,001,,6000,,100000,488,41860,,0,94701,4,9,12,Berkeley city",
+        "2019,06,123458,001,,6000,,2000,488,41860,,0,94701,4,9,12,Berkeley",
+        "2019,06,123459,085,,,,,,,,,,4,9,12,Santa Clara County Unincorporated Area",
+    ]
+    return "\n".join(
+        [header_0, header_1 + ",", ""] + [row + ",1,2,300" * 8 + "," for row in rows]
+    )
+
+
+def load_place_data(tmp_path: Path, dtype_backend: Optional[str]) -> pd.DataFrame:
+    path = tmp_path / bps.get_data_path("place", "annual", 2019, region="west")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(make_place_file())
+    return bps.load_data(
+        "place",
+        "annual",
+        2019,
+        region="west",
+        data_path=tmp_path,
+        dtype_backend=dtype_backend,
+    )
+
+
+@pytest.mark.parametrize("dtype_backend", ["numpy_nullable", "pyarrow"])
+def test_load_place_data_dtype_backends(
+    tmp_path: Path, dtype_backend: Optional[str]
+) -> None:
+    expected_df = load_place_data(tmp_path, None)
+    df = load_place_data(tmp_path, dtype_backend)
+
+    if dtype_backend == "pyarrow":
+        assert df["uncleaned_place_name"].dtype == "string[pyarrow]"
+    pd.testing.assert_frame_equal(df, expected_df, check_dtype=False)
+    assert df["6_digit_id"].tolist() == [123456, 123457, 123458, 123459]
+    assert df["pop"].tolist() == [400000, 100000, 2000, pd.NA]
+
+    # The stages after the load get Arrow strings (see pipeline._read_artifact)
+    names = get_name_spelling(df.convert_dtypes(dtype_backend=dtype_backend))
+    pd.testing.assert_series_equal(names, get_name_spelling(expected_df))
+    assert names.tolist() == [
+        "Oakland",
+        "Berkeley city",
+        # No place type, which is <NA> rather than None with Arrow strings
+        "Berkeley",
+        "Unincorporated Santa Clara County",
+    ]
@@ -0,0 +1,77 @@
+from pathlib import Path
+
+import pandas as pd
+from housing_data import california_hcd_data
+
+
+def test_roll_up_keeps_projects_without_names() -> None:
+    projects_df = pd.DataFrame(
+        {
+            "JURIS_NAME": ["OAKLAND", "OAKLAND", "OAKLAND", None, None],
+            "CNTY_NAME": ["Alameda", "Alameda", "Alameda", "Alameda", None],
+            "year": ["2020"] * 5,
+            "building_type": [
+                "5_plus_units",
+                "2_units",
+                "3_to_4_units",
+                "1_unit",
+                "adu",
+            ],
+            "units": [100, 2, 4, 1, 1],
+        }
+    )
+    wide_df = california_hcd_data._pivot_to_jurisdictions(projects_df)
+
+    state_df = california_hcd_data._roll_up(wide_df, ["year"])
+    assert state_df["total_units_hcd"].tolist() == [108]
+    assert state_df["total_bldgs_hcd"].tolist() == [5]
+
+    counties_df = california_hcd_data._roll_up(wide_df, ["CNTY_NAME", "year"])
+    assert counties_df["CNTY_NAME"].tolist() == ["Alameda"]
+    assert counties_df["total_units_hcd"].tolist() == [107]
+
+
+def test_project_store_round_trip(tmp_path: Path) -> None:
+    projects_df = pd.DataFrame(
+        {
+            "JURIS_NAME": [
+                "OAKLAND",
+                "LA CAÑADA FLINTRIDGE",
+                "OAKLAND",
+                "ST. HELENA",
+                "OAKLAND",
+                None,
+            ],
+            "CNTY_NAME": ["Alameda", "Los Angeles", "Alameda", "Napa", "Alameda", None],
+            "year": ["2023", "2021", "2022", "2020", "2023", "2023"],
+            "building_type": [
+                "5_plus_units",
+                "adu",
+                "adu",
+                "1_unit",
+                "adu",
+                "adu",
+            ],
+            "units": [100, 1, 1, 1, 2, 1],
+        }
+    )
+    path = tmp_path / "projects"
+    california_hcd_data.write_project_store(projects_df, path)
+    # Rewriting replaces the store
+    california_hcd_data.write_project_store(projects_df, path)
+
+    columns = ["JURIS_NAME", "CNTY_NAME", "year", "building_type", "units"]
+    for juris_name in ["OAKLAND", "LA CAÑADA FLINTRIDGE", "ST. HELENA"]:
+        expected = (
+            projects_df[projects_df["JURIS_NAME"] == juris_name]
+            .sort_values("year", kind="stable")
+            .reset_index(drop=True)
+        )
+        df = california_hcd_data.load_jurisdiction_projects(path, juris_name)
+        pd.testing.assert_frame_equal(df[columns], expected)
+
+    df = california_hcd_data.load_jurisdiction_projects(
+        path, "OAKLAND", "2023", "5_plus_units"
+    )
+    assert df["units"].tolist() == [100]
+    assert california_hcd_data.load_jurisdiction_projects(path, "BERKELEY").empty
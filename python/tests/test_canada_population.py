@@ -0,0 +1,37 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from housing_data import file_cache
+from housing_data.canada_population import CSD_DGUID_PREFIX, read_csd_populations
+
+# The start of 17100142.csv, with rows for Canada, a province, a census division and
+# census subdivisions (one without a population, and one row without a DGUID)
+POPULATION_CSV = """\
+"REF_DATE","GEO","DGUID","UOM","UOM_ID","SCALAR_FACTOR","SCALAR_ID","VECTOR","COORDINATE","VALUE","STATUS","SYMBOL","TERMINATED","DECIMALS"
+2001,"Canada","2016A000011124","Persons","249","units","0","v1","1","31020902","","","","0"
+2001,"British Columbia","2016A000259","Persons","249","units","0","v2","2","4076264","","","","0"
+2001,"Greater Vancouver, British Columbia","2016A00035915","Persons","249","units","0","v3","3","2076000","","","","0"
+2001,"Vancouver, City (CY), BC","2016A00055915022","Persons","249","units","0","v4","4","569232","","","","0"
+2002,"Vancouver, City (CY), BC","2016A00055915022","Persons","249","units","0","v4","5","574311","","","","0"
+2001,"Bowen Island (IM), BC","2016A00055915062","Persons","249","units","0","v5","6","","..","","","0"
+2001,"Unknown","","Persons","249","units","0","v6","7","12","","","","0"
+"""
+
+
+def test_read_csd_populations(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(file_cache, "CACHE_DIR", tmp_path / "cache")
+    path = tmp_path / "17100142.csv"
+    path.write_text(POPULATION_CSV)
+
+    # The previous read: the whole table with pandas, then the CSD rows
+    expected_df = pd.read_csv(path)[["REF_DATE", "DGUID", "VALUE"]]
+    expected_df = expected_df[
+        expected_df["DGUID"].str.startswith(CSD_DGUID_PREFIX, na=False)
+    ].reset_index(drop=True)
+    assert len(expected_df) == 3
+
+    # Parsed, then from the cache
+    for _ in range(2):
+        pd.testing.assert_frame_equal(read_csd_populations(path), expected_df)
+    assert len(list((tmp_path / "cache" / "statcan").iterdir())) == 1
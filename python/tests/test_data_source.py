@@ -0,0 +1,99 @@
+import gzip
+import io
+import os
+import tarfile
+import zipfile
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+from housing_data import data_source
+from housing_data.data_loading_helpers import get_url_text
+from housing_data.pipeline import data_signature
+
+FILES = {
+    "data/population/county/99c8_00.txt": "Line 1\r\nCaf\xe9\r\n".encode("latin_1"),
+    "data/crosswalk/crosswalk.csv": b"fips,name\n1,Alabama\n2,Alaska\n",
+}
+# Stored as tablea2.csv.gz, read as tablea2.csv
+COMPRESSED_FILES = {"data/apr/tablea2.csv": b"YEAR,UNITS\n2020,5\n2021,7\n"}
+
+
+def write_data_repo(path: Path) -> None:
+    for name, contents in FILES.items():
+        (path / name).parent.mkdir(parents=True, exist_ok=True)
+        (path / name).write_bytes(contents)
+    for name, contents in COMPRESSED_FILES.items():
+        (path / name).parent.mkdir(parents=True, exist_ok=True)
+        (path / f"{name}.gz").write_bytes(gzip.compress(contents))
+
+
+@pytest.fixture(params=["directory", "zip", "tar.zst", "tar.zst without filters"])
+def data_repo(
+    request: pytest.FixtureRequest, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> data_source.DataPath:
+    monkeypatch.setattr(data_source, "DATA_REPO_CACHE_DIR", tmp_path / "cache")
+
+    # Like GitHub's archives, with all the files in a top-level directory
+    repo_path = tmp_path / "housing-data-data-main"
+    write_data_repo(repo_path)
+    files = sorted(path for path in repo_path.rglob("*") if path.is_file())
+
+    if request.param == "directory":
+        return data_source.open_data_repo(repo_path)
+    elif request.param == "zip":
+        archive_path = tmp_path / "housing-data-data.zip"
+        with zipfile.ZipFile(archive_path, "w", zipfile.ZIP_DEFLATED) as zip_file:
+            for path in files:
+                zip_file.write(path, path.relative_to(tmp_path).as_posix())
+        return data_source.open_data_repo(archive_path)
+    else:
+        if request.param == "tar.zst without filters":
+            # Like Python < 3.11.4
+            monkeypatch.delattr(tarfile, "data_filter")
+        archive_path = tmp_path / "housing-data-data.tar.zst"
+        tar_bytes = io.BytesIO()
+        with tarfile.open(fileobj=tar_bytes, mode="w") as tar:
+            tar.add(repo_path, repo_path.name)
+        with pa.CompressedOutputStream(str(archive_path), "zstd") as f:
+            f.write(tar_bytes.getvalue())
+        return data_source.open_data_repo(archive_path)
+
+
+def test_read(data_repo: data_source.DataPath) -> None:
+    county_path = data_repo / "data/population/county"
+    assert county_path.is_dir()
+    assert (county_path / "99c8_00.txt").read_text(
+        encoding="latin_1"
+    ) == "Line 1\nCafé\n"
+    assert (
+        get_url_text(
+            ("https://www2.census.gov", "99c8_00.txt"), county_path, encoding="latin_1"
+        )
+        == "Line 1\nCafé\n"
+    )
+
+    for name, contents in {**FILES, **COMPRESSED_FILES}.items():
+        path = data_repo / name
+        assert path.exists() and path.is_file()
+        assert path.read_bytes() == contents
+        assert Path(os.fspath(path)).read_bytes() == contents
+
+    pd.testing.assert_frame_equal(
+        pd.read_csv(data_repo / "data/apr/tablea2.csv"),
+        pd.DataFrame({"YEAR": [2020, 2021], "UNITS": [5, 7]}),
+    )
+
+    assert not (data_repo / "data/missing.csv").exists()
+    with pytest.raises(FileNotFoundError):
+        (data_repo / "data/missing.csv").read_bytes()
+
+
+def test_data_signature(data_repo: data_source.DataPath) -> None:
+    signature = data_signature(data_repo, [Path("data/apr"), Path("data/missing")])
+    assert [entry[0] for entry in signature] == [
+        "data/apr/tablea2.csv.gz",
+        "data/missing",
+    ]
+    assert signature[1][1:] == [None, None]
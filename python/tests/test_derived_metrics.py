@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+from housing_data.derived_metrics import with_derived_metrics
+
+
+def test_with_derived_metrics() -> None:
+    rng = np.random.default_rng(0)
+    rows = [
+        (path_1, f"Place_{i}", str(year))
+        for path_1 in ["CA", None]
+        for i in range(5)
+        for year in range(1995, 2027)
+        # Some places are missing some years
+        if (i + year) % 11 != 0
+    ]
+    df = pd.DataFrame(rows, columns=["path_1", "path_2", "year"])
+    df["total_units"] = rng.integers(0, 100, len(df)).astype(float) * 2
+    df["5_plus_units_units"] = df["total_units"] / 2
+    df["projected_units"] = np.where(df["year"] == "2026", 50.0, np.nan)
+    df["total_units_hcd"] = rng.integers(0, 100, len(df)).astype(float)
+    df["population"] = rng.integers(0, 1_000, len(df)).astype(float)
+    df = df.sample(frac=1, random_state=0).reset_index(drop=True)
+
+    df = with_derived_metrics(df)
+
+    # The current year is projected, except for the CA HCD units
+    projected_units = df["projected_units"].fillna(0)
+    expected_units = {
+        "total_units": df["total_units"] + projected_units,
+        "5_plus_units_units": df["5_plus_units_units"] + projected_units / 2,
+        "total_units_hcd": df["total_units_hcd"],
+    }
+    for col, units in expected_units.items():
+        # Same metrics with a groupby over the places, on a frame with a row for every year
+        wide_df = pd.DataFrame(
+            {
+                "key": df["path_1"].fillna("") + "/" + df["path_2"],
+                "year": df["year"].astype(int),
+                "units": units,
+            }
+        ).pivot(index="year", columns="key", values="units")
+        wide_df = wide_df.reindex(range(1995, 2027))
+        expected = {
+            f"{col}_yoy_change": wide_df.diff(),
+            f"{col}_rolling_3y": wide_df.rolling(3).mean(),
+            f"{col}_rolling_5y": wide_df.rolling(5).mean(),
+            f"{col}_cumulative_since_2000": wide_df.loc[2000:].fillna(0).cumsum(),
+        }
+
+        for name, expected_df in expected.items():
+            long_df = expected_df.stack(dropna=False).rename("expected").reset_index()
+            merged_df = df.assign(
+                key=df["path_1"].fillna("") + "/" + df["path_2"],
+                year=df["year"].astype(int),
+            ).merge(long_df, on=["key", "year"], how="left")
+            np.testing.assert_allclose(merged_df[name], merged_df["expected"])
+            np.testing.assert_allclose(
+                merged_df[f"{name}_per_capita"],
+                merged_df["expected"] / merged_df["population"].replace({0: np.nan}),
+            )
+
+
+def test_with_derived_metrics_duplicate_paths() -> None:
+    # Two places with the same path, e.g. a city and a town with the same name
+    df = pd.DataFrame(
+        {
+            "path_1": ["CA", "CA", "CA", "CA", "CA"],
+            "path_2": ["Place", "Place", "Place", "Place", "Other"],
+            "year": ["2000", "2001", "2000", "2001", "2001"],
+            "total_units": [1.0, 2.0, 10.0, 20.0, 5.0],
+            "population": [10.0, 10.0, 100.0, 100.0, 50.0],
+        }
+    )
+
+    df = with_derived_metrics(df)
+
+    # The rows of the same path and year are added up
+    np.testing.assert_allclose(
+        df["total_units_yoy_change"], [np.nan, 11.0, np.nan, 11.0, np.nan]
+    )
+    np.testing.assert_allclose(
+        df["total_units_cumulative_since_2000"], [11.0, 33.0, 11.0, 33.0, 5.0]
+    )
+    np.testing.assert_allclose(
+        df["total_units_yoy_change_per_capita"],
+        [np.nan, 1.1, np.nan, 0.11, np.nan],
+    )
@@ -0,0 +1,127 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from housing_data.build_counties import impute_pre_1990_counties
+from housing_data.build_data_utils import (
+    DataSource,
+    get_numerical_columns,
+    write_json_outputs,
+)
+from housing_data.build_metros import get_aggregate_functions, load_metros
+from housing_data.rollup import rollup
+
+duckdb_engine = pytest.importorskip("housing_data.duckdb_engine")
+
+NUMERICAL_COLUMNS = sorted(
+    set(
+        get_numerical_columns(DataSource.BPS, totals=True, projected=True)
+        + get_numerical_columns(DataSource.CA_HCD, totals=True, projected=True)
+    )
+)
+
+
+def make_counties_df(rng: np.random.Generator, num_counties: int) -> pd.DataFrame:
+    rows = [
+        (1 + i % 2, i, str(year), f"County {i}, ST")
+        for i in range(num_counties)
+        for year in range(1988, 2025)
+        # Some counties aren't observed in 2021
+        if not (year == 2021 and i % 7 == 0)
+    ]
+    df = pd.DataFrame(
+        rows, columns=["fips_state", "fips_county", "year", "name"]
+    ).astype({"fips_state": "Int64", "fips_county": "Int64"})
+
+    for col in NUMERICAL_COLUMNS:
+        df[col] = rng.integers(0, 100, len(df)).astype(float)
+        df.loc[rng.random(len(df)) < 0.1, col] = np.nan
+    df["population"] = rng.integers(0, 100_000, len(df)).astype(float)
+    df["has_ca_hcd_data"] = rng.random(len(df)) < 0.3
+    df["path_1"] = "ST"
+    df["path_2"] = df["name"].str.replace(" ", "_")
+    df["alt_name"] = None
+
+    return df
+
+
+def test_rollup() -> None:
+    rng = np.random.default_rng(0)
+    df = make_counties_df(rng, 30)
+    df["msa_name"] = [f"M{i % 11}" for i in range(len(df))]
+    df["csa_name"] = [None if i % 4 == 0 else f"C{i % 5}" for i in range(len(df))]
+
+    levels = {"msa": ["msa_name", "year"], "csa": ["csa_name", "year"]}
+    aggregations = get_aggregate_functions()
+
+    expected = rollup(df, levels, aggregations)
+    actual = duckdb_engine.rollup(df, levels, aggregations)
+    for name in levels:
+        pd.testing.assert_frame_equal(actual[name], expected[name])
+
+
+def test_impute_pre_1990_counties() -> None:
+    rng = np.random.default_rng(0)
+    num_rows = 10_000
+    places_df = pd.DataFrame(
+        {
+            col: rng.integers(0, 100, num_rows).astype(float)
+            for col in get_numerical_columns(DataSource.BPS, totals=True)
+        }
+    )
+    places_df["county_code"] = rng.choice([1.0, 3.0, 5.0, np.nan], num_rows)
+    places_df["state_code"] = rng.choice([1, 2], num_rows)
+    places_df["year"] = rng.integers(1980, 2000, num_rows).astype(str)
+
+    pd.testing.assert_frame_equal(
+        impute_pre_1990_counties(None, places_df, engine="duckdb"),
+        impute_pre_1990_counties(None, places_df),
+    )
+
+
+def test_load_metros(tmp_path: Path) -> None:
+    rng = np.random.default_rng(0)
+    num_counties = 60
+    counties_df = make_counties_df(rng, num_counties - 3)
+
+    crosswalk_path = tmp_path / "data/crosswalk/cbsa2fipsxw_2023.csv"
+    crosswalk_path.parent.mkdir(parents=True)
+    pd.DataFrame(
+        {
+            "fipsstatecode": [1 + i % 2 for i in range(num_counties)],
+            "fipscountycode": range(num_counties),
+            "csatitle": [
+                None if i % 4 == 0 else f"C{i % 5}, ST" for i in range(num_counties)
+            ],
+            "cbsatitle": [f"M{i % 11}, ST" for i in range(num_counties)],
+            "metropolitanmicropolitanstatis": "Metropolitan Statistical Area",
+        }
+    ).to_csv(crosswalk_path, index=False)
+
+    expected = load_metros(tmp_path, counties_df)
+    actual = load_metros(tmp_path, counties_df, engine="duckdb")
+    pd.testing.assert_frame_equal(
+        actual.reset_index(drop=True), expected.reset_index(drop=True)
+    )
+
+
+def test_write_json_outputs(tmp_path: Path) -> None:
+    rng = np.random.default_rng(0)
+    # Shuffle the rows, so that the latest year isn't always the last row
+    counties_df = make_counties_df(rng, 20).sample(frac=1, random_state=0)
+
+    list_dfs = {
+        engine: write_json_outputs(
+            [counties_df],
+            tmp_path / f"{engine}_list.json",
+            tmp_path / f"{engine}_data",
+            engine=engine,
+        )
+        for engine in ["pandas", "duckdb"]
+    }
+
+    pd.testing.assert_frame_equal(list_dfs["duckdb"], list_dfs["pandas"])
+    assert (tmp_path / "duckdb_list.json").read_text() == (
+        tmp_path / "pandas_list.json"
+    ).read_text()
@@ -0,0 +1,77 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from housing_data import file_cache
+from housing_data.file_cache import read_excel_cached
+
+
+@pytest.fixture
+def excel_reads(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> list[dict]:
+    """
+    Caches in tmp_path, and records the kwargs of each (uncached) pd.read_excel call.
+    """
+    monkeypatch.setattr(file_cache, "CACHE_DIR", tmp_path / "cache")
+
+    reads = []
+    read_excel = pd.read_excel
+
+    def recording_read_excel(*args: object, **kwargs: object) -> pd.DataFrame:
+        reads.append(kwargs)
+        return read_excel(*args, **kwargs)
+
+    monkeypatch.setattr(pd, "read_excel", recording_read_excel)
+    return reads
+
+
+def write_workbook(path: Path, populations: list[int]) -> None:
+    pd.DataFrame(
+        {
+            "name": ["Oakland", None, "Berkeley"],
+            "population": populations,
+            "share": [0.5, np.nan, 0.25],
+        }
+    ).to_excel(path, index=False)
+
+
+def test_read_excel_cached(tmp_path: Path, excel_reads: list[dict]) -> None:
+    path = tmp_path / "populations.xlsx"
+    write_workbook(path, [440_000, 0, 120_000])
+
+    first_df = read_excel_cached(path)
+    cached_df = read_excel_cached(path)
+
+    assert len(excel_reads) == 1
+    pd.testing.assert_frame_equal(cached_df, first_df)
+    pd.testing.assert_frame_equal(cached_df, pd.read_excel(path))
+
+
+def test_read_excel_cached_file_changed(
+    tmp_path: Path, excel_reads: list[dict]
+) -> None:
+    path = tmp_path / "populations.xlsx"
+    write_workbook(path, [440_000, 0, 120_000])
+    read_excel_cached(path)
+
+    write_workbook(path, [430_000, 0, 125_000])
+    df = read_excel_cached(path)
+
+    assert len(excel_reads) == 2
+    assert df["population"].tolist() == [430_000, 0, 125_000]
+
+
+def test_read_excel_cached_kwargs_changed(
+    tmp_path: Path, excel_reads: list[dict]
+) -> None:
+    path = tmp_path / "populations.xlsx"
+    write_workbook(path, [440_000, 0, 120_000])
+    read_excel_cached(path)
+
+    df = read_excel_cached(path, usecols=["name", "population"])
+    read_excel_cached(path, usecols=["name", "population"])
+
+    assert excel_reads == [{}, {"usecols": ["name", "population"]}]
+    pd.testing.assert_frame_equal(
+        df, pd.read_excel(path, usecols=["name", "population"])
+    )
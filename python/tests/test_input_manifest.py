@@ -0,0 +1,118 @@
+import ast
+import inspect
+import re
+from pathlib import Path
+
+import pytest
+from housing_data import (
+    build_metros,
+    california_hcd_data,
+    canada_bper,
+    canada_crosswalk,
+    canada_population,
+    county_population,
+    fips_crosswalk,
+    place_population,
+    state_population,
+)
+from housing_data.build_data import LOAD_STAGES
+from housing_data.input_manifest import (
+    STAGE_INPUT_PATHS,
+    get_input_paths,
+    get_sparse_checkout_patterns,
+)
+
+# The modules that read the files of STAGE_INPUT_PATHS (other than the BPS files)
+LOADER_MODULES = [
+    state_population,
+    county_population,
+    place_population,
+    fips_crosswalk,
+    build_metros,
+    california_hcd_data,
+    canada_bper,
+    canada_crosswalk,
+    canada_population,
+]
+
+FILE_NAME_REGEX = re.compile(r".*\.(csv|txt|xls|xlsx|gz|zst)$")
+
+
+def _get_file_name_patterns(module: object) -> list[str]:
+    """
+    Returns a regex for each file name in the source of module: its string literals that end in
+    a file extension, and its f-strings, with the placeholders matching anything (e.g.
+    f"stch-icen{year}.txt" -> "stch\\-icen.+\\.txt"). Skips the files in raw_data/ in this repo
+    (RAW_DATA_DIR / "..."), which aren't in the data repo.
+    """
+    tree = ast.parse(inspect.getsource(module))
+    skipped_ids = {
+        id(value)
+        for node in ast.walk(tree)
+        if isinstance(node, ast.JoinedStr)
+        for value in node.values
+    } | {
+        id(node.right)
+        for node in ast.walk(tree)
+        if isinstance(node, ast.BinOp)
+        and isinstance(node.left, ast.Name)
+        and node.left.id == "RAW_DATA_DIR"
+    }
+
+    patterns = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.JoinedStr):
+            pattern = "".join(
+                (re.escape(value.value) if isinstance(value, ast.Constant) else ".+")
+                for value in node.values
+            )
+            if FILE_NAME_REGEX.match(pattern.replace("\\", "")):
+                patterns.append(pattern)
+        elif (
+            isinstance(node, ast.Constant)
+            and isinstance(node.value, str)
+            and id(node) not in skipped_ids
+            and FILE_NAME_REGEX.match(node.value)
+        ):
+            patterns.append(re.escape(node.value))
+    return patterns
+
+
+@pytest.mark.parametrize("module", LOADER_MODULES, ids=lambda m: m.__name__)
+def test_input_paths_cover_loader_files(module: object) -> None:
+    input_paths = [path.as_posix() for path in get_input_paths()]
+
+    patterns = _get_file_name_patterns(module)
+    assert patterns
+    for pattern in patterns:
+        # Either a file name, or a path relative to the data repo
+        assert any(
+            re.fullmatch(f"(.*/)?{pattern}", path) for path in input_paths
+        ), f"{pattern} isn't in the manifest"
+
+
+def test_stage_input_paths() -> None:
+    for stage in LOAD_STAGES:
+        if not stage.data_paths:
+            assert stage.name not in STAGE_INPUT_PATHS
+            continue
+
+        # Every stage that reads the data repo lists its files, in the directories it
+        # fingerprints (see pipeline.Stage.data_paths)
+        paths = STAGE_INPUT_PATHS[stage.name]()
+        assert paths, stage.name
+        for path in paths:
+            assert any(
+                path.is_relative_to(data_path) for data_path in stage.data_paths
+            ), f"{path} isn't in the data_paths of {stage.name}"
+
+
+def test_sparse_checkout_patterns() -> None:
+    assert get_sparse_checkout_patterns(Path("data/crosswalk/CSD.csv")) == [
+        "/data/crosswalk/CSD.csv",
+        "/data/crosswalk/CSD.csv.gz",
+        "/data/crosswalk/CSD.csv.zst",
+    ]
+    assert get_sparse_checkout_patterns(california_hcd_data.get_input_paths()[0]) == [
+        "/data/apr/tablea2.csv.gz"
+    ]
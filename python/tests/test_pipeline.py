@@ -0,0 +1,215 @@
+import json
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import pytest
+from housing_data import build_data, pipeline
+from housing_data.build_data_utils import DataSource, get_numerical_columns
+from housing_data.pipeline import Stage, run_pipeline
+
+# The stages that ran, in order
+CALLS: list[str] = []
+
+FACTOR = 2
+
+
+def load_numbers() -> pd.DataFrame:
+    CALLS.append("numbers")
+    return pd.DataFrame({"x": [1, 2, 3]})
+
+
+def double(numbers_df: pd.DataFrame) -> pd.DataFrame:
+    CALLS.append("doubled")
+    return numbers_df.assign(x=numbers_df["x"] * FACTOR)
+
+
+def write_total(doubled_df: pd.DataFrame, *, output_path: Path) -> None:
+    CALLS.append("write_total")
+    output_path.write_text(str(doubled_df["x"].sum()))
+
+
+@pytest.fixture
+def options(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> dict:
+    monkeypatch.setattr(pipeline, "STAGE_CACHE_DIR", tmp_path / "stages")
+    CALLS.clear()
+    return {"output_path": tmp_path / "total.txt"}
+
+
+def get_stages(options: dict, modules: list[str] = []) -> list[Stage]:
+    return [
+        Stage("numbers", load_numbers, modules=modules),
+        Stage("doubled", double, inputs=["numbers"]),
+        Stage(
+            "write_total",
+            write_total,
+            inputs=["doubled"],
+            options=["output_path"],
+            output=True,
+            files=[options["output_path"]],
+        ),
+    ]
+
+
+def run(stages: list[Stage], options: dict, **kwargs) -> list[str]:
+    CALLS.clear()
+    run_pipeline(stages, options, max_workers=1, **kwargs)
+    return list(CALLS)
+
+
+def test_cache(options: dict) -> None:
+    stages = get_stages(options)
+    assert run(stages, options) == ["numbers", "doubled", "write_total"]
+    assert options["output_path"].read_text() == "12"
+
+    assert run(stages, options) == []
+    assert run(stages, options, use_cache=False) == [
+        "numbers",
+        "doubled",
+        "write_total",
+    ]
+
+    # The output stage re-runs if its output was deleted, from the cached artifacts
+    options["output_path"].unlink()
+    assert run(stages, options) == ["write_total"]
+    assert options["output_path"].read_text() == "12"
+
+
+def test_cache_invalidation(
+    options: dict, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    package_dir = tmp_path / "housing_data"
+    package_dir.mkdir()
+    (package_dir / "loader.py").write_text("from housing_data.helpers import f\n")
+    (package_dir / "helpers.py").write_text("def f(): return 1\n")
+    monkeypatch.setattr(pipeline, "PACKAGE_DIR", package_dir)
+    pipeline._module_imports.cache_clear()
+
+    stages = get_stages(options, modules=["loader"])
+    assert run(stages, options) == ["numbers", "doubled", "write_total"]
+
+    # A module imported by a stage's module changed
+    (package_dir / "helpers.py").write_text("def f(): return 2\n")
+    assert run(stages, options) == ["numbers", "doubled", "write_total"]
+
+    # A constant that a stage function refers to changed
+    monkeypatch.setattr(f"{__name__}.FACTOR", 3)
+    assert run(stages, options) == ["doubled", "write_total"]
+    assert options["output_path"].read_text() == "18"
+
+    # An option changed: only the stage that uses it re-runs
+    options["output_path"] = tmp_path / "other_total.txt"
+    stages = get_stages(options, modules=["loader"])
+    assert run(stages, options) == ["write_total"]
+
+    pipeline._module_imports.cache_clear()
+
+
+def test_targets(options: dict) -> None:
+    stages = get_stages(options)
+    assert run(stages, options, targets=["doubled"]) == ["numbers", "doubled"]
+    assert run(stages, options) == ["write_total"]
+
+
+def test_get_targets() -> None:
+    assert build_data.get_targets(None, []) == [
+        stage for stages in build_data.TARGET_STAGES.values() for stage in stages
+    ]
+    assert build_data.get_targets(["places"], []) == [
+        "write_places",
+        "write_places_without_population",
+    ]
+    assert build_data.get_targets(["metros"], []) == ["write_metros"]
+    # The JSON files of every geography have the Canada rows
+    assert build_data.get_targets(["canada"], ["places"]) == [
+        "write_canada",
+        "write_counties",
+        "write_metros",
+        "write_states",
+    ]
+    assert "write_canada" not in build_data.get_targets(None, ["canada"])
+    assert build_data.get_reuse_stages(["canada"]) == ["canada"]
+    assert build_data.get_targets(["metros"], ["metros"]) == []
+
+
+def test_reuse_stages(options: dict, monkeypatch: pytest.MonkeyPatch) -> None:
+    stages = get_stages(options)
+    with pytest.raises(ValueError, match="no cached numbers"):
+        run(stages, options, reuse_stages=["numbers"])
+
+    assert run(stages, options) == ["numbers", "doubled", "write_total"]
+
+    # The cached numbers are used even though the stage changed
+    monkeypatch.setattr(f"{__name__}.FACTOR", 3)
+    stages[0] = Stage("numbers", lambda: pd.DataFrame({"x": [0]}))
+    assert run(stages, options, reuse_stages=["numbers"]) == ["doubled", "write_total"]
+    assert options["output_path"].read_text() == "18"
+
+
+def make_places_df(n_places: int = 6) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    rows = [
+        {
+            "name": f"Place {i}, {state}",
+            "alt_name": f"Alt {i}" if i % 3 == 0 else None,
+            "path_1": state,
+            "path_2": f"Place_{i}",
+            "year": str(year),
+            "population": float(rng.integers(1, 100_000)) if i != 1 else np.nan,
+            "has_ca_hcd_data": True if state == "CA" else np.nan,
+        }
+        for i in range(n_places)
+        for state in [["CA", "NY"][i % 2]]
+        for year in range(2015 + i % 3, 2025)
+    ]
+    df = pd.DataFrame(rows)
+    for source in [DataSource.BPS, DataSource.CA_HCD]:
+        for col in get_numerical_columns(source, totals=True, projected=True):
+            df[col] = rng.integers(0, 100, len(df)).astype(float)
+    return df
+
+
+def read_outputs(public_dir: Path) -> dict[str, object]:
+    outputs = {}
+    for path in sorted(public_dir.rglob("*")):
+        if path.suffix == ".json":
+            outputs[str(path.relative_to(public_dir))] = json.loads(path.read_text())
+        elif path.suffix == ".parquet":
+            # The Parquet types depend on the backend (e.g. int64 rather than double), not the values
+            df = pd.read_parquet(path).astype(object)
+            outputs[str(path.relative_to(public_dir))] = df.where(
+                df.notnull(), None
+            ).to_dict(orient="list")
+    return outputs
+
+
+@pytest.mark.parametrize("dtype_backend", ["numpy_nullable", "pyarrow"])
+def test_write_outputs_dtype_backends(
+    dtype_backend: str, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    artifact = tmp_path / "places.arrow"
+    pipeline._write_artifact(make_places_df(), artifact)
+
+    def write(public_dir: Path, dtype_backend: Optional[str]) -> dict[str, object]:
+        public_dir.mkdir()
+        monkeypatch.setattr(build_data, "PUBLIC_DIR", public_dir)
+        df = pipeline._read_artifact(artifact, dtype_backend)
+        input_df = df.copy()
+        build_data.write_outputs(
+            "places",
+            df,
+            lazy_per_capita=False,
+            partition_parquet_by_state=False,
+            arrow_payloads=False,
+            engine="pandas",
+        )
+        # The stage's input is left as it was, for the other stages that read it
+        pd.testing.assert_frame_equal(df, input_df)
+        return read_outputs(public_dir)
+
+    expected = write(tmp_path / "default", None)
+    outputs = write(tmp_path / dtype_backend, dtype_backend)
+    assert outputs.keys() == expected.keys()
+    for name in expected:
+        assert outputs[name] == expected[name], name
@@ -0,0 +1,93 @@
+import json
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from housing_data import rankings
+
+
+def make_places_df() -> pd.DataFrame:
+    rows = [
+        # name, path_1, path_2, year, total_units, population
+        ("A, CA", "CA", "A", "2023", 100, 50_000),
+        ("B, CA", "CA", "B", "2023", 300, 20_000),
+        ("C, CA", "CA", "C", "2023", 50, 500),
+        ("D, NY", "NY", "D", "2023", 200, 10_000),
+        ("A, CA", "CA", "A", "2024", 10, 50_000),
+        ("D, NY", "NY", "D", "2024", 20, 10_000),
+    ]
+    df = pd.DataFrame(
+        rows,
+        columns=["name", "path_1", "path_2", "year", "total_units", "population"],
+    )
+    df["total_bldgs"] = df["total_units"] / 10
+    df["total_value"] = df["total_units"] * 1000
+    df["5_plus_units_units"] = df["total_units"] * 0.5
+    df["1_unit_units"] = df["total_units"] * 0.3
+    df["2_units_units"] = df["total_units"] * 0.1
+    df["3_to_4_units_units"] = df["total_units"] * 0.1
+    # E.g. the 5+ unit permits of D
+    df.loc[3, "5_plus_units_units"] = 0
+    return df
+
+
+def test_get_rank_columns() -> None:
+    df = rankings.get_rank_columns(make_places_df())
+
+    assert df["total_units_rank"].tolist() == [3, 1, 4, 2, 2, 1]
+    assert df["total_units_percentile"].tolist() == [0.5, 1.0, 0.25, 0.75, 0.5, 1.0]
+    # C is below the population threshold of the per capita ranks
+    assert df["total_units_per_capita_rank"].tolist() == [3, 2, pd.NA, 1, 2, 1]
+    assert df["5_plus_units_units_rank"].tolist() == [2, 1, 3, 4, 2, 1]
+
+    assert df["total_units_state_rank"].tolist() == [2, 1, 3, 1, 1, 1]
+    assert df["total_units_state_percentile"].tolist() == [
+        2 / 3,
+        1.0,
+        1 / 3,
+        1.0,
+        1.0,
+        1.0,
+    ]
+    assert df["total_units_per_capita_state_rank"].tolist() == [2, 1, pd.NA, 1, 1, 1]
+
+
+def test_get_rank_columns_states() -> None:
+    # The states don't have a path_1, so they're only ranked nationally
+    df = rankings.get_rank_columns(make_places_df().assign(path_1=None))
+
+    assert "total_units_rank" in df.columns
+    assert "total_units_state_rank" not in df.columns
+
+
+def test_write_ranking_tables(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(rankings, "TOP_N", 2)
+    rankings.write_ranking_tables(make_places_df(), tmp_path)
+
+    table = json.loads((tmp_path / "2023/total_units.json").read_text())
+    assert table["national"] == [
+        {"name": "B, CA", "path": "CA/B", "value": 300.0, "rank": 1},
+        {"name": "D, NY", "path": "NY/D", "value": 200.0, "rank": 2},
+    ]
+    assert [row["path"] for row in table["by_state"]["CA"]] == ["CA/B", "CA/A"]
+    assert [row["path"] for row in table["by_state"]["NY"]] == ["NY/D"]
+
+    per_capita_table = json.loads(
+        (tmp_path / "2023/total_units_per_capita.json").read_text()
+    )
+    assert [row["path"] for row in per_capita_table["national"]] == ["NY/D", "CA/B"]
+
+    unit_type_table = json.loads(
+        (tmp_path / "2023/5_plus_units_units_per_capita.json").read_text()
+    )
+    assert [row["path"] for row in unit_type_table["national"]] == ["CA/B", "CA/A"]
+
+    ranks_table = json.loads((tmp_path / "2023/ranks.json").read_text())
+    columns = ranks_table["columns"]
+    assert set(ranks_table["ranks"]) == {"CA/A", "CA/B", "CA/C", "NY/D"}
+    c_ranks = dict(zip(columns, ranks_table["ranks"]["CA/C"]))
+    assert c_ranks["total_units_rank"] == 4
+    assert c_ranks["total_units_percentile"] == 0.25
+    assert c_ranks["total_units_state_rank"] == 3
+    assert c_ranks["total_units_state_percentile"] == 0.3333
+    assert c_ranks["total_units_per_capita_rank"] is None
@@ -0,0 +1,65 @@
+import json
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from housing_data import search_index
+
+
+def make_list_df() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "name": [
+                "San Jose, CA",
+                "Santa Ana, CA",
+                "Sacramento, CA",
+                "Sa, CA",
+                "Montréal",
+            ],
+            "alt_name": [None, None, None, None, "Montreal, QC"],
+            "path": [
+                "CA/San Jose",
+                "CA/Santa Ana",
+                "CA/Sacramento",
+                "CA/Sa",
+                "QC/Montreal",
+            ],
+            "population": [1000, 300, 500, 10, 2000],
+        }
+    )
+
+
+def test_write_search_index(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(search_index, "MAX_SHARD_ROWS", 2)
+    search_index.write_search_index(make_list_df(), tmp_path)
+
+    def shard_paths(shard: str) -> list[str]:
+        return [
+            row["path"] for row in json.loads((tmp_path / f"{shard}.json").read_text())
+        ]
+
+    index = json.loads((tmp_path / "index.json").read_text())
+    assert index == {
+        "an": True,
+        "jo": True,
+        "mo": True,
+        "qc": True,
+        "sa": False,
+        "sac": True,
+        "san": True,
+    }
+
+    # The split shard keeps its most populous rows, and the exact match "Sa"
+    assert shard_paths("sa") == ["CA/San Jose", "CA/Sacramento", "CA/Sa"]
+    assert shard_paths("sac") == ["CA/Sacramento"]
+    assert shard_paths("san") == ["CA/San Jose", "CA/Santa Ana"]
+    # Accents are stripped, and alt_names are indexed
+    assert shard_paths("mo") == ["QC/Montreal"]
+    assert shard_paths("qc") == ["QC/Montreal"]
+
+    assert [row["path"] for row in json.loads((tmp_path / "top.json").read_text())][
+        :2
+    ] == [
+        "QC/Montreal",
+        "CA/San Jose",
+    ]